@@ -0,0 +1,160 @@
+"""Extract stage: HAR files and Performance Logs to GA events"""
+import json
+import os
+import shutil
+
+import gaunit
+from gaunit.har import get_events_from_har
+from gaunit.json_backend import BACKENDS, get_json_backend
+from gaunit.perf_log import get_events_from_perf_log
+from gaunit.watch import Watcher
+
+from . import synthetic
+
+
+def _capture_paths(size, hit_type):
+    return "har_%s_%s.har" % (size, hit_type), "perf_log_%s_%s.jsonl" % (size, hit_type)
+
+
+class ExtractSuite:
+    params = (synthetic.SIZES, synthetic.HIT_TYPES)
+    param_names = ["entries", "hit_type"]
+    timeout = 300
+
+    def setup_cache(self):
+        # captures are written once, in asv cache directory
+        for size in synthetic.SIZES:
+            for hit_type in synthetic.HIT_TYPES:
+                har_path, perf_log_path = _capture_paths(size, hit_type)
+                with open(har_path, "w", encoding="utf8") as f:
+                    json.dump(synthetic.har(size, hit_type), f)
+                with open(perf_log_path, "w", encoding="utf8") as f:
+                    for entry in synthetic.perf_log(size, hit_type):
+                        f.write(json.dumps(entry) + "\n")
+        return os.getcwd()
+
+    def setup(self, directory, size, hit_type):
+        har_path, perf_log_path = _capture_paths(size, hit_type)
+        self.har_path = os.path.join(directory, har_path)
+        self.perf_log_path = os.path.join(directory, perf_log_path)
+        with open(self.har_path, encoding="utf8") as f:
+            self.har = json.load(f)
+        self.perf_log = synthetic.perf_log(size, hit_type)
+
+    def time_har_file(self, directory, size, hit_type):
+        get_events_from_har(har_path=self.har_path)
+
+    def peakmem_har_file(self, directory, size, hit_type):
+        get_events_from_har(har_path=self.har_path)
+
+    def time_har_mmap(self, directory, size, hit_type):
+        get_events_from_har(har_path=self.har_path, use_mmap=True)
+
+    def time_har_dict(self, directory, size, hit_type):
+        get_events_from_har(har=self.har)
+
+    def time_perf_log(self, directory, size, hit_type):
+        get_events_from_perf_log(perf_log=self.perf_log)
+
+    def time_perf_log_file(self, directory, size, hit_type):
+        get_events_from_perf_log(perf_log_path=self.perf_log_path)
+
+
+class SparseHarSuite:
+    """big HARs with few GA requests (one entry out of 1000)"""
+
+    params = [10000, 100000]
+    param_names = ["entries"]
+    timeout = 300
+
+    def setup_cache(self):
+        for size in self.params:
+            with open("sparse_%s.har" % size, "w", encoding="utf8") as f:
+                json.dump(synthetic.har(size, "ga4", ga_ratio=1000), f)
+        return os.getcwd()
+
+    def setup(self, directory, size):
+        self.har_path = os.path.join(directory, "sparse_%s.har" % size)
+
+    def time_har_file(self, directory, size):
+        get_events_from_har(har_path=self.har_path)
+
+    def time_har_mmap(self, directory, size):
+        get_events_from_har(har_path=self.har_path, use_mmap=True)
+
+    def peakmem_har_mmap(self, directory, size):
+        get_events_from_har(har_path=self.har_path, use_mmap=True)
+
+
+class JsonBackendSuite:
+    params = (list(BACKENDS), [10000, 100000])
+    param_names = ["json_backend", "entries"]
+    timeout = 300
+
+    def setup_cache(self):
+        for size in self.params[1]:
+            har_path, perf_log_path = _capture_paths(size, "ga4")
+            with open(har_path, "w", encoding="utf8") as f:
+                json.dump(synthetic.har(size, "ga4"), f)
+            with open(perf_log_path, "w", encoding="utf8") as f:
+                for entry in synthetic.perf_log(size, "ga4"):
+                    f.write(json.dumps(entry) + "\n")
+        return os.getcwd()
+
+    def setup(self, directory, name, size):
+        try:
+            self.backend = get_json_backend(name)
+        except ImportError:
+            raise NotImplementedError()  # skipped by asv
+        har_path, perf_log_path = _capture_paths(size, "ga4")
+        self.har_path = os.path.join(directory, har_path)
+        self.perf_log_path = os.path.join(directory, perf_log_path)
+
+    def time_load(self, directory, name, size):
+        self.backend.load(self.har_path)
+
+    def time_har_file(self, directory, name, size):
+        get_events_from_har(har_path=self.har_path, json_backend=self.backend)
+
+    def time_perf_log_file(self, directory, name, size):
+        get_events_from_perf_log(
+            perf_log_path=self.perf_log_path, json_backend=self.backend
+        )
+
+
+class WatchSuite:
+    """ga watch: update after 100 entries were appended to a HAR of N entries"""
+
+    params = [10000, 100000]
+    param_names = ["entries"]
+    number = 1  # each update needs a new setup
+    timeout = 300
+    appended = 100
+
+    def setup_cache(self):
+        for size in self.params:
+            har = synthetic.har(size, "ga4")
+            with open("watch_%s.har" % size, "w", encoding="utf8") as f:
+                json.dump(har, f)
+            del har["log"]["entries"][-self.appended :]
+            with open("watch_%s_start.har" % size, "w", encoding="utf8") as f:
+                json.dump(har, f)
+        return os.getcwd()
+
+    def setup(self, directory, size):
+        self.har_path = os.path.join(directory, "watch_%s.har" % size)
+        self.path = "watched.har"
+        shutil.copy(os.path.join(directory, "watch_%s_start.har" % size), self.path)
+        tp = gaunit.TrackingPlan.from_events(
+            "watch", [{"en": "page_view"}, {"en": "never_sent"}]
+        )
+        self.watcher = Watcher(self.path, tp)
+        self.watcher.update()
+        shutil.copy(self.har_path, self.path)
+
+    def time_update(self, directory, size):
+        self.watcher.update()
+
+    def time_first_update(self, directory, size):
+        self.watcher.reset()
+        self.watcher.update()
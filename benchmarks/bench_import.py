@@ -0,0 +1,9 @@
+"""Startup: import time of gaunit and of the `ga` command (in a fresh interpreter)"""
+
+
+def timeraw_import_gaunit():
+    return "import gaunit"
+
+
+def timeraw_import_cli():
+    return "import gaunit.cli"
@@ -0,0 +1,104 @@
+"""Match stage: expected events against actual events"""
+from gaunit.api import check_events_all
+from gaunit.events import compact_events, partition_events
+from gaunit.matching import ENGINE_INDEX, ENGINE_SCAN
+from gaunit.models import TestCase, TrackingPlan
+
+from . import synthetic
+
+
+class CheckSuite:
+    params = (synthetic.SIZES, synthetic.HIT_TYPES, synthetic.PLANS)
+    param_names = ["entries", "hit_type", "tracking_plan"]
+    timeout = 300
+
+    def setup(self, size, hit_type, plan):
+        self.events = synthetic.events(size, hit_type)
+        expected = synthetic.expected_events(self.events, plan, hit_type)
+        self.tracking_plan = TrackingPlan.from_events("bench", expected)
+        self.tc = TestCase("bench", self.tracking_plan)
+        self.tc.load_events(self.events)
+
+    def time_check_index(self, size, hit_type, plan):
+        self.tc.load_events(self.events)  # index is built again
+        self.tc.check(engine=ENGINE_INDEX)
+
+    def time_check_scan(self, size, hit_type, plan):
+        self.tc.check(engine=ENGINE_SCAN)
+
+    def time_check_unordered(self, size, hit_type, plan):
+        self.tc.load_events(self.events)
+        self.tc.check(ordered=False)
+
+    def time_check_unordered_scan(self, size, hit_type, plan):
+        self.tc.check(ordered=False, engine=ENGINE_SCAN)
+
+    def time_feed(self, size, hit_type, plan):
+        tc = TestCase("bench", self.tracking_plan)
+        for event in self.events:
+            tc.feed(event)
+        tc.check()
+
+
+class RepeatedEventsSuite:
+    """GA4 sessions: long runs of near-identical page_view/scroll events, and expected events
+    whose params are all in the session but never in the same event"""
+
+    params = [1000, 10000, 100000]
+    param_names = ["entries"]
+    timeout = 300
+
+    def setup(self, size):
+        self.events = [
+            {"en": "page_view", "dl": "/p%s" % (i // 20)}
+            if i % 2 == 0
+            else {"en": "scroll", "epn.percent_scrolled": "90"}
+            for i in range(size)
+        ]
+        expected = []
+        for event in self.events[:: max(1, size // 500)]:
+            expected.append(event)
+            expected.append({"en": "scroll", "dl": event.get("dl", "/p0")})
+        self.tc = TestCase("bench", TrackingPlan.from_events("bench", expected))
+        self.tc.load_events(self.events)
+
+    def time_check(self, size):
+        self.tc.load_events(self.events)
+        self.tc.check()
+
+    def time_check_not_strict(self, size):
+        self.tc.load_events(self.events)
+        self.tc.check(strict=False)
+
+    def time_check_scan(self, size):
+        self.tc.check(engine=ENGINE_SCAN)
+
+
+class PropertiesSuite:
+    """one capture sending hits to 4 GA4 properties, test cases for some of them (only their
+    events are indexed)"""
+
+    params = ([10000, 100000], [1, 4])
+    param_names = ["entries", "tested_properties"]
+    timeout = 300
+    properties = ("G-AAAAAAAAAA", "G-BBBBBBBBBB", "G-CCCCCCCCCC", "G-DDDDDDDDDD")
+
+    def setup(self, size, tested):
+        self.events = compact_events(
+            dict(e, tid=self.properties[i % 4])
+            for i, e in enumerate(synthetic.events(size, "ga4"))
+        )
+        partitions = partition_events(self.events)
+        self.tracking_plan = TrackingPlan()
+        self.without_properties = TrackingPlan()
+        for p in self.properties[:tested]:
+            expected = synthetic.expected_events(partitions[p], "large", "ga4")
+            expected = [dict(e, tid=p) for e in expected]
+            self.tracking_plan.add_test_case(p, expected, p)
+            self.without_properties.add_test_case(p, expected)
+
+    def time_check_events_all(self, size, tested):
+        check_events_all(self.tracking_plan, self.events)
+
+    def time_check_events_all_without_properties(self, size, tested):
+        check_events_all(self.without_properties, self.events)
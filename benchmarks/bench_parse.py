@@ -0,0 +1,69 @@
+"""Parse stage: GA requests to events params"""
+from gaunit.events import compact_events
+from gaunit.utils import (
+    format_events,
+    parse_ga_request,
+    parse_ga_url,
+    parse_postdata_events,
+)
+
+from . import synthetic
+
+
+class ParseSuite:
+    params = ([1000, 10000], synthetic.HIT_TYPES)
+    param_names = ["requests", "hit_type"]
+
+    def setup(self, requests, hit_type):
+        self.requests = [synthetic.ga_request(i, hit_type) for i in range(requests)]
+        self.urls = [r["url"] for r in self.requests]
+
+    def time_parse_ga_url(self, requests, hit_type):
+        for url in self.urls:
+            parse_ga_url(url)
+
+    def time_parse_ga_request(self, requests, hit_type):
+        for r in self.requests:
+            parse_ga_request(r)
+
+
+class PostDataSuite:
+    params = [1000, 10000]
+    param_names = ["requests"]
+
+    def setup(self, requests):
+        self.post_data = [synthetic.ga4_post_data(i) for i in range(requests)]
+
+    def time_parse_postdata_events(self, requests):
+        for data in self.post_data:
+            parse_postdata_events(data)
+
+
+class BatchSuite:
+    """GA4 requests batching several events, parsed and compacted"""
+
+    params = [5, 30]
+    param_names = ["batch_size"]
+
+    def setup(self, batch_size):
+        batch_size, synthetic.GA4_BATCH_SIZE = synthetic.GA4_BATCH_SIZE, batch_size
+        self.requests = [synthetic.ga_request(i, "ga4") for i in range(1000)]
+        synthetic.GA4_BATCH_SIZE = batch_size
+
+    def time_parse_and_compact(self, batch_size):
+        for r in self.requests:
+            compact_events(parse_ga_request(r))
+
+
+class FormatEventsSuite:
+    params = [100, 1000, 10000]
+    param_names = ["events"]
+
+    def setup(self, events):
+        self.events = [
+            {"t": "event", "ea": "add_to_cart", "ev": i, "pr1pr": i + 0.5, "dl": "%2F"}
+            for i in range(events)
+        ]
+
+    def time_format_events(self, events):
+        format_events(self.events)
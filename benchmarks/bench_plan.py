@@ -0,0 +1,36 @@
+"""Load stage: JSON and compiled tracking plans"""
+import json
+import os
+
+from gaunit.models import TrackingPlan
+
+from . import synthetic
+
+
+class TrackingPlanLoadSuite:
+    params = ([10, 100, 1000],)
+    param_names = ["test_cases"]
+    timeout = 300
+
+    def setup_cache(self):
+        for test_cases in self.params[0]:
+            path = "tracking_plan_%s.json" % test_cases
+            with open(path, "w", encoding="utf8") as f:
+                json.dump(synthetic.tracking_plan(test_cases, "ga4"), f)
+            TrackingPlan.compile(path)
+        return os.getcwd()
+
+    def setup(self, directory, test_cases):
+        self.json_path = os.path.join(directory, "tracking_plan_%s.json" % test_cases)
+        self.compiled_path = os.path.join(
+            directory, "tracking_plan_%s.gaplan" % test_cases
+        )
+
+    def time_from_json(self, directory, test_cases):
+        TrackingPlan.from_json(self.json_path)
+
+    def time_load_compiled(self, directory, test_cases):
+        TrackingPlan.load_compiled(self.compiled_path)
+
+    def time_load_compiled_one_test_case(self, directory, test_cases):
+        TrackingPlan.load_compiled(self.compiled_path, ["test_case_0"])
@@ -0,0 +1,83 @@
+"""Report stage: printing results"""
+import contextlib
+import io
+
+from gaunit.models import TestCase, TrackingPlan
+from gaunit.render import get_renderer
+
+from . import synthetic
+
+
+class ReportSuite:
+    params = ([1000, 10000], synthetic.PLANS)
+    param_names = ["entries", "tracking_plan"]
+
+    def setup(self, size, plan):
+        events = synthetic.events(size, "ua")
+        expected = synthetic.expected_events(events, plan, "ua")
+        tc = TestCase("bench", TrackingPlan.from_events("bench", expected))
+        tc.load_events(events)
+        self.result = tc.result()
+
+    def time_print_result(self, size, plan):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.result.print_result(display_ok=True)
+
+    def time_print_actual_events(self, size, plan):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.result.print_actual_events()
+
+    def time_render_json(self, size, plan):
+        get_renderer("json", io.StringIO()).result(self.result, "bench")
+
+    def time_render_ndjson(self, size, plan):
+        get_renderer("ndjson", io.StringIO()).result(self.result, "bench")
+
+    def time_get_status(self, size, plan):
+        self.result.get_status_expected_events()
+        self.result.get_status_actual_events()
+
+
+class NearestMissesSuite:
+    """closest actual events of missing expected events (one in 4 has a wrong value)"""
+
+    params = ([1000, 10000, 50000], ["ua", "ga4"])
+    param_names = ["entries", "hit_type"]
+
+    def setup(self, size, hit_type):
+        events = synthetic.events(size, hit_type)
+        expected = [
+            dict(e, **{list(e)[-1]: "wrong"}) if i % 4 == 0 else e
+            for i, e in enumerate(synthetic.expected_events(events, "large", hit_type))
+        ]
+        tc = TestCase("bench", TrackingPlan.from_events("bench", expected))
+        tc.load_events(events)
+        self.result = tc.result()
+
+    def time_nearest_misses(self, size, hit_type):
+        self.result._nearest = {}  # not cached between runs
+        self.result.nearest_misses()
+
+
+class NearestMissesCommonPairsSuite:
+    """same, expected events also hold pairs shared by most hits (``v``, ``tid``)"""
+
+    params = ([10000, 50000], ["ua", "ga4"])
+    param_names = ["entries", "hit_type"]
+
+    def setup(self, size, hit_type):
+        events = synthetic.events(size, hit_type)
+        common = {k: events[0][k] for k in ("v", "tid")}
+        expected = []
+        for i, e in enumerate(synthetic.expected_events(events, "large", hit_type)):
+            e = dict(common, **e)
+            if i % 4 == 0:
+                e[list(e)[-1]] = "wrong"
+            expected.append(e)
+        tc = TestCase("bench", TrackingPlan.from_events("bench", expected))
+        tc.load_events(events)
+        self.result = tc.result()
+
+    def time_nearest_misses(self, size, hit_type):
+        self.result._nearest = {}  # not cached between runs
+        self.result.nearest_misses()
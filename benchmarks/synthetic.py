@@ -0,0 +1,178 @@
+"""
+Synthetic GA captures used by benchmarks: HARs, Performance Logs and tracking plans.
+
+Captures are deterministic, so that results of two commits can be compared.
+"""
+import json
+from urllib.parse import quote
+
+GA_URL = "https://www.google-analytics.com"
+
+HIT_TYPES = ("ua", "ga4")
+SIZES = (1000, 10000, 100000)  # number of entries (requests) in capture
+PLANS = ("small", "large")
+PLAN_SIZES = {"small": 5, "large": 200}  # number of expected events
+
+# one entry out of GA_RATIO is a GA request, others are noise (pages, assets, APIs)
+GA_RATIO = 3
+# GA4 requests are POST batches of several events
+GA4_BATCH_SIZE = 5
+
+_ACTIONS = ("view_item", "view_item_list", "select_content", "add_to_cart", "purchase")
+
+
+def ua_url(i: int) -> str:
+    page = "/product/%d" % (i % 50)
+    params = [
+        ("v", "1"),
+        ("_v", "j96"),
+        ("a", str(100000 + i)),
+        ("t", "pageview" if i % 4 == 0 else "event"),
+        ("_s", str(i)),
+        ("dl", "https://shop.example.com" + page),
+        ("dp", page),
+        ("dt", "Product %d" % (i % 50)),
+        ("ul", "fr-fr"),
+        ("de", "UTF-8"),
+        ("sd", "24-bit"),
+        ("sr", "1920x1080"),
+        ("ec", "ecommerce"),
+        ("ea", _ACTIONS[i % len(_ACTIONS)]),
+        ("pr1nm", "T-Shirt %d" % (i % 20)),
+        ("pr1pr", "%d.00" % (10 + i % 40)),
+        ("cid", "1234567890.1600000000"),
+        ("tid", "UA-12345678-1"),
+        ("z", str(987654321 + i)),
+    ]
+    return GA_URL + "/collect?" + "&".join("%s=%s" % (k, quote(v)) for k, v in params)
+
+
+def ga4_url(i: int) -> str:
+    params = [
+        ("v", "2"),
+        ("tid", "G-ABCDEF1234"),
+        ("gtm", "2oe5v0"),
+        ("_p", str(1500000000 + i)),
+        ("cid", "1234567890.1600000000"),
+        ("ul", "fr-fr"),
+        ("sr", "1920x1080"),
+        ("_s", str(i)),
+        ("sid", "1600000000"),
+        ("dl", "https://shop.example.com/product/%d" % (i % 50)),
+        ("dt", "Product %d" % (i % 50)),
+    ]
+    return GA_URL + "/g/collect?" + "&".join("%s=%s" % (k, quote(v)) for k, v in params)
+
+
+def ga4_post_data(i: int) -> str:
+    events = []
+    for j in range(GA4_BATCH_SIZE):
+        k = i * GA4_BATCH_SIZE + j
+        events.append(
+            "en=%s&_et=%d&ep.item_list=list_%d&epn.value=%d"
+            % (_ACTIONS[k % len(_ACTIONS)], 100 + k % 900, k % 7, k % 100)
+        )
+    return "\r\n".join(events)
+
+
+def ga_request(i: int, hit_type: str) -> dict:
+    """HAR request of i-th GA hit"""
+    if hit_type == "ua":
+        return {"method": "GET", "url": ua_url(i), "headers": []}
+    return {
+        "method": "POST",
+        "url": ga4_url(i),
+        "headers": [],
+        "postData": {"mimeType": "text/plain", "text": ga4_post_data(i)},
+    }
+
+
+def noise_request(i: int) -> dict:
+    return {
+        "method": "GET",
+        "url": "https://shop.example.com/static/asset_%d.js?v=%d" % (i % 100, i),
+        "headers": [{"name": "Accept", "value": "*/*"}],
+    }
+
+
+def har(size: int, hit_type: str, ga_ratio: int = GA_RATIO) -> dict:
+    """HAR with ``size`` entries, one out of ``ga_ratio`` sent to GA"""
+    entries = []
+    for i in range(size):
+        if i % ga_ratio == 0:
+            request = ga_request(i // ga_ratio, hit_type)
+        else:
+            request = noise_request(i)
+        entries.append(
+            {
+                "startedDateTime": "2021-01-01T00:00:00.000Z",
+                "time": 12.5,
+                "request": request,
+                "response": {
+                    "status": 200,
+                    "headers": [{"name": "Content-Type", "value": "text/javascript"}],
+                    "content": {"size": 180, "text": "/* asset */" + "x" * 160},
+                },
+                "timings": {"send": 0.1, "wait": 10.2, "receive": 2.2},
+            }
+        )
+    return {"log": {"version": "1.2", "pages": [], "entries": entries}}
+
+
+def perf_log(size: int, hit_type: str) -> list:
+    """Performance Log with ``size`` entries (GET hits only: POST data are not logged)"""
+    log = []
+    for i in range(size):
+        request_id = "1000.%d" % i
+        if i % GA_RATIO == 0:
+            n = i // GA_RATIO
+            url = ua_url(n) if hit_type == "ua" else ga4_url(n) + "&en=page_view"
+            method = "Network.requestWillBeSent"
+            params = {"requestId": request_id, "request": {"url": url}}
+        elif i % GA_RATIO == 1:
+            method = "Network.dataReceived"
+            params = {"requestId": request_id, "dataLength": 1024}
+        else:
+            method = "Page.frameNavigated"
+            params = {"frame": {"url": "https://shop.example.com/product/%d" % i}}
+        message = {"message": {"method": method, "params": params}}
+        log.append({"level": "INFO", "message": json.dumps(message)})
+    return log
+
+
+def events(size: int, hit_type: str) -> list:
+    """GA events found in a capture of ``size`` entries"""
+    from gaunit.events import compact_events
+    from gaunit.utils import parse_ga_request
+
+    found = []
+    for n in range(len(range(0, size, GA_RATIO))):
+        found.extend(compact_events(parse_ga_request(ga_request(n, hit_type))))
+    return found
+
+
+def expected_events(actual: list, plan: str, hit_type: str) -> list:
+    """expected events picked in order across actual events, the last one is missing"""
+    count = PLAN_SIZES[plan]
+    keys = ("t", "dp", "ea") if hit_type == "ua" else ("en", "dl", "ep.item_list")
+    step = max(len(actual) // count, 1)
+    expected = [{k: e[k] for k in keys if k in e} for e in actual[::step][: count - 1]]
+    expected.append({keys[0]: "missing_event"})
+    return expected
+
+
+def tracking_plan(test_cases: int, hit_type: str) -> dict:
+    """JSON tracking plan with ``test_cases`` test cases of 200 expected events"""
+    actual = events(1000, hit_type)
+    return {
+        "test_cases": {
+            "test_case_%s"
+            % i: {
+                "events": [
+                    dict(e, tc=str(i))
+                    for e in expected_events(actual, "large", hit_type)
+                ]
+            }
+            for i in range(test_cases)
+        }
+    }
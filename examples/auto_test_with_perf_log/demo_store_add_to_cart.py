@@ -6,9 +6,9 @@ automatically test tracking on Google online store demo.
 Warning : this method will not work with GA4
 """
 from os.path import abspath, dirname, join
-from time import sleep
 
 import gaunit
+from gaunit.utils import get_ga_requests_from_browser_perf_log
 from selenium import webdriver
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 
@@ -19,31 +19,26 @@ def run():
     capabilities["goog:loggingPrefs"] = {"performance": "ALL"}  # chromedriver 75+
     driver = webdriver.Chrome(desired_capabilities=capabilities)
 
+    # load tracking plan
+    path = join(abspath(dirname(__file__)), "tracking_plan.json")
+    tracking_plan = gaunit.TrackingPlan.from_json(path)
+    tc = gaunit.TestCase("ga_demo_store_add_to_cart", tracking_plan)
+
+    def new_ga_requests():
+        # Performance Log only returns entries logged since last call
+        return get_ga_requests_from_browser_perf_log(driver.get_log("performance"))
+
     # start test case
     driver.implicitly_wait(10)
     driver.get("https://enhancedecommerce.appspot.com/")
-    sleep(2)
     driver.find_element_by_id("homepage-9bdd2-1").click()
-    sleep(2)
     driver.find_element_by_id("addToCart").click()
-    sleep(2)
-    # Get Performance Log and close all
-    log = driver.get_log("performance")
+    # check hits as they are sent, stop as soon as all expected events are found
+    tc.wait_until_satisfied(new_ga_requests, timeout=10)
     driver.quit()
 
-    # # Uncomment if you want to store log in json file
-    # with open("perf_log.json", "w", encoding="utf8") as f:
-    #     json.dump(log, f, indent=2)
-
-    # # Uncomment if you want to parse existing log file before check
-    # with open("perf_log.json", encoding="utf8") as f:
-    #     log = json.load(f)
-
-    # check hits against tracking plan and print results
-    path = join(abspath(dirname(__file__)), "tracking_plan.json")
-    tracking_plan = gaunit.TrackingPlan.from_json(path)
-    r = gaunit.check_perf_log("ga_demo_store_add_to_cart", tracking_plan, log)
-
+    # print results
+    r = tc.result()
     r.print_result(display_ok=True)
 
 
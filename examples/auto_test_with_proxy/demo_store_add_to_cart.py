@@ -6,7 +6,6 @@ tracking on Google online store demo.
 """
 import json
 from os.path import abspath, dirname, join
-from time import sleep
 
 import gaunit
 from browsermobproxy import Server
@@ -37,14 +36,25 @@ def run():
     # start test case
     driver.implicitly_wait(10)
     test_case = "ga_demo_store_add_to_cart"
+    path = join(abspath(dirname(__file__)), "tracking_plan.json")
+    tracking_plan = gaunit.TrackingPlan.from_json(path)
+    tc = gaunit.TestCase(test_case, tracking_plan)
     # 'captureContent' for POST requests
     proxy.new_har(test_case, options={"captureContent": True})
     driver.get("https://enhancedecommerce.appspot.com/")
-    sleep(2)
     driver.find_element_by_id("homepage-9bdd2-1").click()
-    sleep(2)
     driver.find_element_by_id("addToCart").click()
-    sleep(2)
+    # check hits as they are sent, stop as soon as all expected events are found
+    seen = 0
+
+    def new_requests():
+        nonlocal seen
+        entries = proxy.har["log"]["entries"]
+        requests = [e["request"] for e in entries[seen:]]
+        seen = len(entries)
+        return requests
+
+    tc.wait_until_satisfied(new_requests, timeout=10)
 
     # export har and close all
     har = proxy.har
@@ -57,10 +67,8 @@ def run():
     # ) as f:
     #     json.dump(har, f)
 
-    # check hits against tracking plan and print results
-    path = join(abspath(dirname(__file__)), "tracking_plan.json")
-    tracking_plan = gaunit.TrackingPlan.from_json(path)
-    r = gaunit.check_har(test_case, tracking_plan, har=har)
+    # print results
+    r = tc.result()
 
     r.print_result(display_ok=True)
 
@@ -1,10 +1,18 @@
 from .__about__ import __version__
-from .api import check_har, check_perf_log
+from .api import (
+    check_events_all,
+    check_har,
+    check_har_all,
+    check_perf_log,
+    check_perf_log_all,
+)
 from .models import Result, TestCase, TrackingPlan
+from .utils import GAUrlMatcher
 
 from .exceptions import (
     GAUnitException,
     TrackingPlanError,
+    StaleTrackingPlanError,
     DictXORJsonPathError,
     TestCaseCheckError,
 )
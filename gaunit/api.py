@@ -3,7 +3,15 @@ gaunit.api
 
 This modules makes gaunit nicer to use
 """
+from typing import Dict, List
+
+from .cache import extract_har_events, extract_perf_log_events
+from .events import partition_events
+from .matching import EventIndex
 from .models import Result, TestCase, TrackingPlan
+from .stats import STAGE_EXTRACT, Stats
+
+_ALL_PROPERTIES = object()  # events of test cases without property
 
 
 def check_har(
@@ -12,6 +20,11 @@ def check_har(
     har=None,
     har_path=None,
     transport_url="https://www.google-analytics.com",
+    cache=None,
+    json_backend=None,
+    use_mmap=False,
+    ordered=True,
+    strict=True,
 ) -> Result:
     """Performs checks of a har dict or HAR JSON file against a :class:`~gaunit.TrackingPlan`.
 
@@ -31,8 +44,20 @@ def check_har(
             test case. Defaults to None
         har (dict): actual har for this test case in dict format. Defaults to None
         har_path (str) : path to HAR file for this test case (standard HAR JSON). Defaults to None
-        transport_url (str): custom transport URL for server side GTM.
-            Defaults to 'https://www.google-analytics.com'
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        cache (str): cache directory (or :class:`~gaunit.cache.EventCache`) for events extracted
+            from HAR files and Performance Logs. Defaults to None
+        json_backend (str): JSON backend decoding HAR files and Performance Logs (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None
+        use_mmap (bool): find GA requests in HAR file with a raw scan and decode them only,
+            much faster for big HAR files (see :func:`gaunit.har.get_ga_requests_from_har_mmap`).
+            Defaults to False
+        ordered (bool): True if hits must respect tracking plan order. Unordered checks are
+            one-to-one (see :func:`TestCase.check`). Defaults to True
+        strict (bool): ordered: an actual event satisfies one expected event at most. False
+            lets following expected events be satisfied by the same event (see
+            :func:`TestCase.check`). Defaults to True
 
     Note:
         One and one only argument must be given: ``har`` or ``har_path``
@@ -46,15 +71,23 @@ def check_har(
         har=har,
         har_path=har_path,
         transport_url=transport_url,
+        cache=cache,
+        json_backend=json_backend,
+        use_mmap=use_mmap,
     )
-    return tc.result()
+    return tc.result(ordered, strict)
 
 
 def check_perf_log(
     test_case_id: str,
     tracking_plan: TrackingPlan,
-    perf_log: list,
+    perf_log: list = None,
     transport_url="https://www.google-analytics.com",
+    cache=None,
+    perf_log_path: str = None,
+    json_backend=None,
+    ordered=True,
+    strict=True,
 ) -> Result:
     """Performs checks of a Performance log against a :class:`~gaunit.TrackingPlan`.
 
@@ -72,9 +105,20 @@ def check_perf_log(
         test_case_id (str): test case id (same id used to match with tracking plan)
         tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events for this
             test case. Defaults to None
-        perf_log (list): log entries from driver
-        transport_url (str): custom transport URL for server side GTM.
-            Defaults to 'https://www.google-analytics.com'
+        perf_log (list): log entries from driver. Defaults to None
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        cache (str): cache directory (or :class:`~gaunit.cache.EventCache`) for events extracted
+            from HAR files and Performance Logs. Defaults to None
+        perf_log_path (str) : path to a Performance Log file (JSONL, one entry per line, or
+            JSON list of entries), streamed whatever its size. Defaults to None
+        json_backend (str): JSON backend decoding HAR files and Performance Logs (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None
+        ordered (bool): True if hits must respect tracking plan order. Unordered checks are
+            one-to-one (see :func:`TestCase.check`). Defaults to True
+        strict (bool): ordered: an actual event satisfies one expected event at most. False
+            lets following expected events be satisfied by the same event (see
+            :func:`TestCase.check`). Defaults to True
 
     Returns:
         :class:`gaunit.Result`: complete results of your test case.
@@ -84,5 +128,173 @@ def check_perf_log(
         tracking_plan=tracking_plan,
         perf_log=perf_log,
         transport_url=transport_url,
+        cache=cache,
+        perf_log_path=perf_log_path,
+        json_backend=json_backend,
+    )
+    return tc.result(ordered, strict)
+
+
+def check_events_all(
+    tracking_plan: TrackingPlan,
+    events: list,
+    test_case_ids: List[str] = None,
+    ordered: bool = True,
+    strict: bool = True,
+) -> Dict[str, Result]:
+    """Performs checks of already extracted GA events against several or all test cases of a
+    :class:`~gaunit.TrackingPlan`.
+
+    Events are indexed once and the index is shared by all test cases. If test cases target
+    properties (see :func:`TrackingPlan.get_property`), events are split by property in one
+    pass and each test case is only checked against the events of its property, indexed once
+    for all test cases of this property.
+
+    Args:
+        tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events
+        events (list): actual GA events. Example: ``[{"t":"pageview","dt":"home"},...]``
+        test_case_ids (List[str], optional): test cases to check. Defaults to None (all test
+            cases in tracking plan).
+        ordered (bool, optional): True if hits must respect tracking plan order. Unordered
+            checks are one-to-one (see :func:`TestCase.check`). Defaults to True.
+        strict (bool, optional): ordered: an actual event satisfies one expected event at
+            most (see :func:`TestCase.check`). Defaults to True.
+
+    Raises:
+        :exception:`gaunit.TrackingPlanError`: if a test case is not found in tracking plan
+
+    Returns:
+        Dict[str, :class:`gaunit.Result`]: results by test case id
+    """
+    if test_case_ids is None:
+        test_case_ids = list(tracking_plan.content)
+    partitions = (
+        None  # events of each property, split on first test case with a property
     )
-    return tc.result()
+    indexes = {}  # {property: EventIndex}, built on first test case of this property
+    results = {}
+    for test_case_id in test_case_ids:
+        tc = TestCase(test_case_id, tracking_plan=tracking_plan)
+        if tc.property_id is None:
+            key, selected = _ALL_PROPERTIES, events
+        else:
+            if partitions is None:
+                partitions = partition_events(events)
+            key, selected = tc.property_id, partitions.get(tc.property_id, [])
+        if key not in indexes:
+            indexes[key] = EventIndex(selected)
+        tc.load_events(selected, index=indexes[key])
+        results[test_case_id] = tc.result(ordered, strict)
+    return results
+
+
+def check_har_all(
+    tracking_plan: TrackingPlan,
+    har=None,
+    har_path=None,
+    test_case_ids: List[str] = None,
+    transport_url="https://www.google-analytics.com",
+    cache=None,
+    json_backend=None,
+    use_mmap=False,
+    ordered=True,
+    strict=True,
+) -> Dict[str, Result]:
+    """Performs checks of a har dict or HAR JSON file against several or all test cases of a
+    :class:`~gaunit.TrackingPlan`.
+
+    The HAR is read and parsed only once, whatever the number of test cases.
+
+    Example:
+        >>> tracking_plan = gaunit.TrackingPlan.from_json("tracking_plan.json")
+        >>> results = gaunit.check_har_all(tracking_plan, har_path="session.har")
+        >>> {test_case_id: r.was_successful() for test_case_id, r in results.items()}
+        {'home': True, 'add_to_cart': False}
+
+    Args:
+        tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events
+        har (dict): actual har in dict format. Defaults to None
+        har_path (str) : path to HAR file (standard HAR JSON). Defaults to None
+        test_case_ids (List[str], optional): test cases to check. Defaults to None (all test
+            cases in tracking plan).
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        cache (str): cache directory (or :class:`~gaunit.cache.EventCache`) for events extracted
+            from HAR files and Performance Logs. Defaults to None
+        json_backend (str): JSON backend decoding HAR files and Performance Logs (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None
+        use_mmap (bool): find GA requests in HAR file with a raw scan and decode them only,
+            much faster for big HAR files (see :func:`gaunit.har.get_ga_requests_from_har_mmap`).
+            Defaults to False
+        ordered (bool): True if hits must respect tracking plan order. Unordered checks are
+            one-to-one (see :func:`TestCase.check`). Defaults to True
+        strict (bool): ordered: an actual event satisfies one expected event at most. False
+            lets following expected events be satisfied by the same event (see
+            :func:`TestCase.check`). Defaults to True
+
+    Note:
+        One and one only argument must be given: ``har`` or ``har_path``
+
+    Returns:
+        Dict[str, :class:`gaunit.Result`]: results by test case id
+    """
+    stats = Stats()
+    with stats.stage(STAGE_EXTRACT):
+        events = extract_har_events(
+            har, har_path, transport_url, stats, json_backend, use_mmap, cache
+        )
+    return _add_stats(
+        check_events_all(tracking_plan, events, test_case_ids, ordered, strict), stats
+    )
+
+
+def check_perf_log_all(
+    tracking_plan: TrackingPlan,
+    perf_log: list = None,
+    test_case_ids: List[str] = None,
+    transport_url="https://www.google-analytics.com",
+    cache=None,
+    perf_log_path: str = None,
+    json_backend=None,
+    ordered=True,
+    strict=True,
+) -> Dict[str, Result]:
+    """Performs checks of a Performance log against several or all test cases of a
+    :class:`~gaunit.TrackingPlan`.
+
+    Args:
+        tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events
+        perf_log (list): log entries from driver. Defaults to None
+        test_case_ids (List[str], optional): test cases to check. Defaults to None (all test
+            cases in tracking plan).
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        cache (str): cache directory (or :class:`~gaunit.cache.EventCache`) for events extracted
+            from HAR files and Performance Logs. Defaults to None
+        perf_log_path (str) : path to a Performance Log file. Defaults to None
+        json_backend (str): JSON backend decoding HAR files and Performance Logs (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None
+        ordered (bool): True if hits must respect tracking plan order. Unordered checks are
+            one-to-one (see :func:`TestCase.check`). Defaults to True
+        strict (bool): ordered: an actual event satisfies one expected event at most. False
+            lets following expected events be satisfied by the same event (see
+            :func:`TestCase.check`). Defaults to True
+
+    Returns:
+        Dict[str, :class:`gaunit.Result`]: results by test case id
+    """
+    stats = Stats()
+    with stats.stage(STAGE_EXTRACT):
+        events = extract_perf_log_events(
+            perf_log, perf_log_path, transport_url, stats, json_backend, cache
+        )
+    return _add_stats(
+        check_events_all(tracking_plan, events, test_case_ids, ordered, strict), stats
+    )
+
+
+def _add_stats(results: Dict[str, Result], stats: Stats) -> Dict[str, Result]:
+    """adds stats of shared extraction to stats of each result"""
+    for r in results.values():
+        r.stats.update(stats)
+    return results
@@ -0,0 +1,207 @@
+"""
+gaunit.batch
+
+This module implements batch checks and extractions of directories of HAR files, spread
+across a pool of processes.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Union
+
+from .cache import extract_har_events
+from .exceptions import TrackingPlanError
+from .models import Result, TestCase, TrackingPlan
+
+# tracking plan sent once to each worker process (see _init_worker)
+_worker_tracking_plan = None
+
+
+class FileResult(object):
+    """Result of a check or an extraction for one HAR file of a batch.
+
+    Attributes:
+        path (str): path to HAR file
+        test_case_id (str): test case id used for the check (``None`` for extractions)
+        result (:class:`~gaunit.Result`): result of the check (``None`` for extractions
+            or if an error occurred)
+        events (list): GA events extracted from file (only for extractions)
+        error (Exception): error raised while processing the file, ``None`` if successful
+    """
+
+    def __init__(
+        self,
+        path: str,
+        test_case_id: str = None,
+        result: Result = None,
+        events: list = None,
+        error: Exception = None,
+    ):
+        self.path = path
+        self.test_case_id = test_case_id
+        self.result = result
+        self.events = events
+        self.error = error
+
+    def was_successful(self) -> bool:
+        """True if file was processed without error and, for checks, test case was successful"""
+        if self.error is not None:
+            return False
+        return self.result is None or self.result.was_successful()
+
+
+def find_har_files(path: str) -> List[str]:
+    """list HAR files from a directory (``*.har`` files) or a glob pattern
+
+    Args:
+        path (str): directory or glob pattern (``**`` is supported)
+
+    Returns:
+        List[str]: sorted list of paths
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, "*.har")
+    return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+
+
+def get_test_case_id(path: str, test_case_ids: Dict[str, str] = None) -> str:
+    """returns test case id for a HAR file
+
+    Test case id is looked up in ``test_case_ids`` by path, then by file name.
+    Defaults to file name without extension.
+
+    Args:
+        path (str): path to HAR file
+        test_case_ids (Dict[str, str], optional): mapping from HAR file to test case id.
+            Defaults to None.
+    """
+    test_case_ids = test_case_ids or {}
+    name = os.path.basename(path)
+    for key in (path, os.path.normpath(path), name):
+        if key in test_case_ids:
+            return test_case_ids[key]
+    return os.path.splitext(name)[0]
+
+
+def _init_worker(tracking_plan: TrackingPlan):
+    global _worker_tracking_plan
+    _worker_tracking_plan = tracking_plan
+
+
+def _check_file(path: str, test_case_id: str, transport_url, cache: str) -> Result:
+    tc = TestCase(
+        test_case_id,
+        tracking_plan=_worker_tracking_plan,
+        har_path=path,
+        transport_url=transport_url,
+        cache=cache,
+    )
+    return tc.result()
+
+
+def _extract_file(path: str, transport_url, cache: str) -> list:
+    return extract_har_events(har_path=path, transport_url=transport_url, cache=cache)
+
+
+def iter_check_har_files(
+    har_files: List[str],
+    tracking_plan: Union[str, TrackingPlan],
+    test_case_ids: Dict[str, str] = None,
+    transport_url="https://www.google-analytics.com",
+    max_workers: int = None,
+    cache: str = None,
+) -> Iterator[FileResult]:
+    """Checks HAR files in parallel and yields results as soon as they are available.
+
+    The tracking plan is loaded once, before starting worker processes, and sent once to
+    each of them. Files whose test case is not in the tracking plan are not checked.
+
+    Example:
+        >>> from gaunit.batch import find_har_files, iter_check_har_files
+        >>> for r in iter_check_har_files(find_har_files("hars/"), "tracking_plan.json"):
+        ...     print(r.path, r.was_successful())
+
+    Args:
+        har_files (List[str]): paths to HAR files
+        tracking_plan (Union[str, :class:`~gaunit.TrackingPlan`]): tracking plan, or path to
+            a JSON or compiled tracking plan
+        test_case_ids (Dict[str, str], optional): mapping from HAR file (path or file name)
+            to test case id. Files not in mapping are checked against the test case named
+            after the file (without extension). Defaults to None.
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        max_workers (int, optional): number of processes. Defaults to None (CPU count).
+        cache (str, optional): cache directory for extracted events (see
+            :class:`~gaunit.cache.EventCache`). Defaults to None.
+
+    Yields:
+        :class:`FileResult`: result for each file, in order of completion
+
+    Raises:
+        :exception:`gaunit.TrackingPlanError`: if tracking plan format is not valid
+    """
+    if not har_files:
+        return
+    if not isinstance(tracking_plan, TrackingPlan):
+        tracking_plan = TrackingPlan.from_file(tracking_plan)
+    checked = []
+    for path in har_files:
+        test_case_id = get_test_case_id(path, test_case_ids)
+        try:
+            tracking_plan.get_expected_events(test_case_id)
+        except TrackingPlanError as e:
+            yield FileResult(path, test_case_id, error=e)
+        else:
+            checked.append((path, test_case_id))
+    if not checked:
+        return
+    max_workers = min(max_workers or os.cpu_count() or 1, len(checked))
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(tracking_plan,),
+    ) as executor:
+        futures = {}
+        for path, test_case_id in checked:
+            f = executor.submit(_check_file, path, test_case_id, transport_url, cache)
+            futures[f] = (path, test_case_id)
+        for f in as_completed(futures):
+            path, test_case_id = futures[f]
+            error = f.exception()
+            result = f.result() if error is None else None
+            yield FileResult(path, test_case_id, result=result, error=error)
+
+
+def iter_extract_har_files(
+    har_files: List[str],
+    transport_url="https://www.google-analytics.com",
+    max_workers: int = None,
+    cache: str = None,
+) -> Iterator[FileResult]:
+    """Extracts GA events from HAR files in parallel and yields them as soon as they are
+    available.
+
+    Args:
+        har_files (List[str]): paths to HAR files
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        max_workers (int, optional): number of processes. Defaults to None (CPU count).
+        cache (str, optional): cache directory for extracted events (see
+            :class:`~gaunit.cache.EventCache`). Defaults to None.
+
+    Yields:
+        :class:`FileResult`: events for each file, in order of completion
+    """
+    if not har_files:
+        return
+    max_workers = min(max_workers or os.cpu_count() or 1, len(har_files))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_extract_file, path, transport_url, cache): path
+            for path in har_files
+        }
+        for f in as_completed(futures):
+            path = futures[f]
+            error = f.exception()
+            events = f.result() if error is None else None
+            yield FileResult(path, events=events, error=error)
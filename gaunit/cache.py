@@ -0,0 +1,339 @@
+"""
+gaunit.cache
+
+This module implements an on-disk cache of GA events extracted from HAR files and
+Performance Logs, so that checking the same captures again (with a new tracking plan for
+instance) does not decode them again.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Optional, Tuple, Union
+
+from .har import get_events_from_har
+from .perf_log import get_events_from_perf_log
+from .stats import CACHE_HITS, CACHE_MISSES, EVENTS, STEP_CACHE, Stats
+from .utils import get_ga_url_matcher
+
+# bump this version when extraction or parsing changes extracted events
+PARSER_VERSION = 3
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+class EventCache(object):
+    """On-disk cache of extracted GA events.
+
+    Entries are keyed by the content hash of the capture, the transport URLs and the
+    parser version. For files, a size + modification time fast path avoids hashing files
+    already seen.
+
+    Example:
+        >>> from gaunit.cache import EventCache
+        >>> cache = EventCache(".gaunit_cache")
+        >>> events = cache.get_events_from_har("session.har")  # decoded and stored
+        >>> events = cache.get_events_from_har("session.har")  # read from cache
+        >>> cache.prune(max_age=7 * 24 * 3600)
+
+    Args:
+        directory (str): cache directory (created if needed)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._events_dir = os.path.join(directory, "events")
+        self._stat_dir = os.path.join(directory, "stat")
+        os.makedirs(self._events_dir, exist_ok=True)
+        os.makedirs(self._stat_dir, exist_ok=True)
+
+    def key(self, content_hash: str, transport_url) -> str:
+        """returns the cache key of a capture
+
+        Args:
+            content_hash (str): hash of the capture content
+            transport_url (str): transport URL(s) or :class:`~gaunit.GAUrlMatcher` used for
+                extraction
+        """
+        transport_urls = sorted(get_ga_url_matcher(transport_url).transport_urls)
+        k = "\0".join([str(PARSER_VERSION), content_hash] + transport_urls)
+        return hashlib.sha256(k.encode("utf8")).hexdigest()
+
+    def file_hash(self, path: str) -> str:
+        """returns sha256 of file content, or the hash stored for the same path, size and
+        modification time"""
+        st = os.stat(path)
+        stat_key = "\0".join(
+            [os.path.abspath(path), str(st.st_size), str(st.st_mtime_ns)]
+        )
+        stat_path = os.path.join(
+            self._stat_dir, hashlib.sha256(stat_key.encode("utf8")).hexdigest()
+        )
+        try:
+            with open(stat_path, "r", encoding="utf8") as f:
+                return f.read()
+        except OSError:
+            pass
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                h.update(chunk)
+        content_hash = h.hexdigest()
+        self._write(stat_path, content_hash.encode("utf8"))
+        return content_hash
+
+    def get(self, key: str) -> Optional[list]:
+        """returns cached events (``None`` if not in cache)"""
+        path = os.path.join(self._events_dir, key)
+        try:
+            with open(path, "rb") as f:
+                events = pickle.load(f)
+        except Exception:  # missing, corrupt or written by another version: a miss
+            return None
+        try:
+            os.utime(path)  # last use, for pruning
+        except OSError:  # read-only cache
+            pass
+        return events
+
+    def set(self, key: str, events: list):
+        """stores events in cache"""
+        path = os.path.join(self._events_dir, key)
+        self._write(path, pickle.dumps(events, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_or_extract(
+        self,
+        content_hash: str,
+        transport_url,
+        extract: Callable[[], list],
+        stats: Stats = None,
+    ) -> list:
+        """returns cached events, or extracts and stores them
+
+        Args:
+            content_hash (str): hash of the capture content
+            transport_url (str): transport URL(s) used for extraction
+            extract (Callable[[], list]): function extracting events (on cache miss)
+            stats (:class:`~gaunit.stats.Stats`, optional): record of timings and counters
+                to update: time spent in cache (``"cache"``), hits and misses. Defaults to
+                None.
+        """
+        with _timed(stats):
+            key = self.key(content_hash, transport_url)
+            events = self.get(key)
+        if events is None:
+            events = extract()
+            with _timed(stats):
+                self.set(key, events)
+            if stats is not None:
+                stats.count(CACHE_MISSES)
+        elif stats is not None:
+            stats.count(CACHE_HITS)
+            stats.count(EVENTS, len(events))
+        return events
+
+    def get_events_from_har(
+        self,
+        har_path: str,
+        transport_url="https://www.google-analytics.com",
+        json_backend=None,
+        use_mmap=False,
+        stats: Stats = None,
+    ) -> list:
+        """Cached equivalent of :func:`gaunit.har.get_events_from_har` for HAR files"""
+        with _timed(stats):
+            content_hash = self.file_hash(har_path)
+        return self.get_or_extract(
+            content_hash,
+            transport_url,
+            lambda: get_events_from_har(
+                har_path=har_path,
+                transport_url=transport_url,
+                stats=stats,
+                json_backend=json_backend,
+                use_mmap=use_mmap,
+            ),
+            stats,
+        )
+
+    def get_events_from_browser_perf_log(
+        self,
+        perf_log: list,
+        transport_url="https://www.google-analytics.com",
+        json_backend=None,
+        stats: Stats = None,
+    ) -> list:
+        """Cached equivalent of :func:`gaunit.perf_log.get_events_from_perf_log` for log
+        entries from ``driver.get_log("performance")``"""
+        with _timed(stats):
+            h = hashlib.sha256()
+            for entry in perf_log:
+                h.update(entry["message"].encode("utf8"))
+                h.update(b"\0")
+        return self.get_or_extract(
+            h.hexdigest(),
+            transport_url,
+            lambda: get_events_from_perf_log(
+                perf_log,
+                transport_url=transport_url,
+                stats=stats,
+                json_backend=json_backend,
+            ),
+            stats,
+        )
+
+    def get_events_from_perf_log_file(
+        self,
+        perf_log_path: str,
+        transport_url="https://www.google-analytics.com",
+        json_backend=None,
+        stats: Stats = None,
+    ) -> list:
+        """Cached equivalent of :func:`gaunit.perf_log.get_events_from_perf_log` for
+        Performance Log files"""
+        with _timed(stats):
+            content_hash = self.file_hash(perf_log_path)
+        return self.get_or_extract(
+            content_hash,
+            transport_url,
+            lambda: get_events_from_perf_log(
+                perf_log_path=perf_log_path,
+                transport_url=transport_url,
+                stats=stats,
+                json_backend=json_backend,
+            ),
+            stats,
+        )
+
+    def prune(self, max_age: float = None, max_size: int = None) -> Tuple[int, int]:
+        """Evicts cache entries not used for ``max_age`` seconds, then least recently used
+        entries until cache size is below ``max_size`` bytes.
+
+        Args:
+            max_age (float, optional): maximum age in seconds. Defaults to None.
+            max_size (int, optional): maximum cache size in bytes. Defaults to None.
+
+        Returns:
+            Tuple[int, int]: number of entries removed and bytes freed
+        """
+        entries = []
+        for d in (self._events_dir, self._stat_dir):
+            for name in os.listdir(d):
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()  # least recently used first
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for mtime, size, path in entries:
+            too_old = max_age is not None and now - mtime > max_age
+            too_big = max_size is not None and total > max_size
+            if not (too_old or too_big):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def _write(self, path: str, data: bytes):
+        """atomic write, so that concurrent processes never read partial entries"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+@contextmanager
+def _timed(stats: Optional[Stats]):
+    """adds time spent in block to ``"cache"`` timing"""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.add_time(STEP_CACHE, perf_counter() - start)
+
+
+def get_event_cache(cache: Union[str, EventCache, None]) -> Optional[EventCache]:
+    """returns an :class:`EventCache` from a cache directory (or ``None`` if no cache)"""
+    if cache is None or isinstance(cache, EventCache):
+        return cache
+    return EventCache(cache)
+
+
+def extract_har_events(
+    har: dict = None,
+    har_path: str = None,
+    transport_url="https://www.google-analytics.com",
+    stats=None,
+    json_backend=None,
+    use_mmap=False,
+    cache: Union[str, EventCache, None] = None,
+) -> list:
+    """Extracts GA events with :func:`gaunit.har.get_events_from_har`. With a ``cache``,
+    events of HAR files are read from it (or extracted and stored).
+
+    Args:
+        cache (Union[str, EventCache], optional): cache directory (or :class:`EventCache`).
+            Defaults to None.
+
+    Other arguments are those of :func:`gaunit.har.get_events_from_har`.
+    """
+    cache = get_event_cache(cache)
+    if cache is not None and har_path and not har:
+        return cache.get_events_from_har(
+            har_path, transport_url, json_backend, use_mmap, stats
+        )
+    return get_events_from_har(
+        har, har_path, transport_url, stats, json_backend, use_mmap
+    )
+
+
+def extract_perf_log_events(
+    perf_log: list = None,
+    perf_log_path: str = None,
+    transport_url="https://www.google-analytics.com",
+    stats=None,
+    json_backend=None,
+    cache: Union[str, EventCache, None] = None,
+) -> list:
+    """Extracts GA events with :func:`gaunit.perf_log.get_events_from_perf_log`. With a
+    ``cache``, events are read from it (or extracted and stored).
+
+    Args:
+        cache (Union[str, EventCache], optional): cache directory (or :class:`EventCache`).
+            Defaults to None.
+
+    Other arguments are those of :func:`gaunit.perf_log.get_events_from_perf_log`.
+    """
+    cache = get_event_cache(cache)
+    if cache is not None and perf_log_path and not perf_log:
+        return cache.get_events_from_perf_log_file(
+            perf_log_path, transport_url, json_backend, stats
+        )
+    if cache is not None and perf_log and not perf_log_path:
+        return cache.get_events_from_browser_perf_log(
+            perf_log, transport_url, json_backend, stats
+        )
+    return get_events_from_perf_log(
+        perf_log, perf_log_path, transport_url, stats, json_backend
+    )
@@ -1,15 +1,11 @@
-import pprint
 import sys
 
 import click
 
 import gaunit
-from gaunit.utils import (
-    filter_keys,
-    get_ga_requests_from_har,
-    open_json,
-    parse_ga_request,
-)
+from gaunit.cache import EventCache, extract_har_events
+from gaunit.render import FORMAT_TEXT, FORMATS, get_renderer
+from gaunit.utils import filter_keys, get_py_version, open_json
 
 from .__about__ import __version__
 
@@ -31,7 +27,7 @@ def help():
 
 @click.command("check", help="Check events against an existing tracking plan")
 @click.argument("har_file", type=click.Path())
-@click.argument("test_case")
+@click.argument("test_case", required=False)
 @click.option(
     "-t",
     "--tracking_plan",
@@ -44,13 +40,75 @@ def help():
     is_flag=True,
     help="print all expected events (missing and found)",
 )
+@click.option(
+    "-A",
+    "--all-test-cases",
+    is_flag=True,
+    help="check all test cases of tracking plan (HAR file is parsed only once)",
+)
 @click.option(
     "-tu",
     "--transport_url",
-    help="custom transport URL for server side GTM",
-    default="https://www.google-analytics.com",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
 )
-def check(test_case, har_file, tracking_plan, all, transport_url):
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    help="cache directory for events extracted from HAR files (env: GAUNIT_CACHE_DIR)",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="print timings of each stage (extract, match, report) and counters",
+)
+@click.option(
+    "--mmap",
+    is_flag=True,
+    help="find GA requests with a raw scan of the HAR file, decoding them only (faster on big HAR files)",
+)
+@click.option(
+    "--unordered",
+    is_flag=True,
+    help="do not check that events respect tracking plan order (an event satisfies one expected event at most)",
+)
+@click.option(
+    "--strict/--no-strict",
+    default=True,
+    help="ordered checks: an event satisfies one expected event at most (--no-strict lets following expected events be satisfied by the same event)",
+)
+@click.option(
+    "--nearest",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="number of closest events printed under each missing event, with the params which differ",
+)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(FORMATS),
+    default=FORMAT_TEXT,
+    show_default=True,
+    help="output format: text for humans, json or ndjson (one record per line) for other tools",
+)
+def check(
+    test_case,
+    har_file,
+    tracking_plan,
+    all,
+    all_test_cases,
+    transport_url,
+    cache_dir,
+    stats,
+    mmap,
+    unordered,
+    strict,
+    nearest,
+    format_,
+):
     # TODO : test_case should be optionnal if tracking plan has only one test_case
     # if args.tracking_plan:
     #  ..
@@ -63,16 +121,172 @@ def check(test_case, har_file, tracking_plan, all, transport_url):
     #     # print("error: more than one test case in tracking plan, please specify a '--test-case' parameter ")
     #     # pass
 
-    tp = gaunit.TrackingPlan.from_json(tracking_plan)
+    if all_test_cases == bool(test_case):
+        raise click.UsageError(
+            "one and only one of TEST_CASE or '--all-test-cases' must be given"
+        )
+
+    tp = gaunit.TrackingPlan.from_file(
+        tracking_plan, None if all_test_cases else [test_case]
+    )
+    if all_test_cases:
+        results = gaunit.check_har_all(
+            tp,
+            har_path=har_file,
+            transport_url=transport_url,
+            cache=cache_dir,
+            use_mmap=mmap,
+            ordered=not unordered,
+            strict=strict,
+        )
+        _render_results(results, format_, all, stats, nearest)
+        return
+
     r = gaunit.check_har(
-        test_case, tracking_plan=tp, har_path=har_file, transport_url=transport_url
+        test_case,
+        tracking_plan=tp,
+        har_path=har_file,
+        transport_url=transport_url,
+        cache=cache_dir,
+        use_mmap=mmap,
+        ordered=not unordered,
+        strict=strict,
     )
 
-    r.print_result(display_ok=all)
+    # text output has no test case header, as before
+    test_case_id = None if format_ == FORMAT_TEXT else test_case
+    get_renderer(format_).result(r, test_case_id, all, stats, nearest)
     if False in r.checklist_expected_events:
         sys.exit(1)  # end with return code 1 if check failed
 
 
+@click.command(
+    "check-perf-log",
+    help="Check events from a Performance Log file (JSONL or JSON) against an existing tracking plan",
+)
+@click.argument("perf_log_file", type=click.Path())
+@click.argument("test_case", required=False)
+@click.option(
+    "-t",
+    "--tracking_plan",
+    type=click.Path(),
+    default="./tracking_plan.json",
+)
+@click.option(
+    "-a",
+    "--all",
+    is_flag=True,
+    help="print all expected events (missing and found)",
+)
+@click.option(
+    "-A",
+    "--all-test-cases",
+    is_flag=True,
+    help="check all test cases of tracking plan (log file is parsed only once)",
+)
+@click.option(
+    "-tu",
+    "--transport_url",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    help="cache directory for events extracted from log files (env: GAUNIT_CACHE_DIR)",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="print timings of each stage (extract, match, report) and counters",
+)
+@click.option(
+    "--unordered",
+    is_flag=True,
+    help="do not check that events respect tracking plan order (an event satisfies one expected event at most)",
+)
+@click.option(
+    "--strict/--no-strict",
+    default=True,
+    help="ordered checks: an event satisfies one expected event at most (--no-strict lets following expected events be satisfied by the same event)",
+)
+@click.option(
+    "--nearest",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="number of closest events printed under each missing event, with the params which differ",
+)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(FORMATS),
+    default=FORMAT_TEXT,
+    show_default=True,
+    help="output format: text for humans, json or ndjson (one record per line) for other tools",
+)
+def check_perf_log(
+    test_case,
+    perf_log_file,
+    tracking_plan,
+    all,
+    all_test_cases,
+    transport_url,
+    cache_dir,
+    stats,
+    unordered,
+    strict,
+    nearest,
+    format_,
+):
+    if all_test_cases == bool(test_case):
+        raise click.UsageError(
+            "one and only one of TEST_CASE or '--all-test-cases' must be given"
+        )
+
+    tp = gaunit.TrackingPlan.from_file(
+        tracking_plan, None if all_test_cases else [test_case]
+    )
+    if all_test_cases:
+        results = gaunit.check_perf_log_all(
+            tp,
+            perf_log_path=perf_log_file,
+            transport_url=transport_url,
+            cache=cache_dir,
+            ordered=not unordered,
+            strict=strict,
+        )
+        _render_results(results, format_, all, stats, nearest)
+        return
+
+    r = gaunit.check_perf_log(
+        test_case,
+        tracking_plan=tp,
+        perf_log_path=perf_log_file,
+        transport_url=transport_url,
+        cache=cache_dir,
+        ordered=not unordered,
+        strict=strict,
+    )
+
+    # text output has no test case header, as before
+    test_case_id = None if format_ == FORMAT_TEXT else test_case
+    get_renderer(format_).result(r, test_case_id, all, stats, nearest)
+    if False in r.checklist_expected_events:
+        sys.exit(1)  # end with return code 1 if check failed
+
+
+def _render_results(
+    results: dict, format_: str, display_ok: bool, stats: bool, nearest: int
+):
+    """render results of several test cases and exit with code 1 if one failed"""
+    get_renderer(format_).results(results, display_ok, stats, nearest)
+    if not all(r.was_successful() for r in results.values()):
+        sys.exit(1)  # end with return code 1 if one check failed
+
+
 @click.command("extract", help="From a HAR file, extract and print GA events")
 @click.argument("har_file")
 @click.option(
@@ -80,28 +294,383 @@ def check(test_case, har_file, tracking_plan, all, transport_url):
     "--filter",
     help="list of specific events parameters to extract seperated by `,` (other params are filtered out). Example: '--filter a,b,c'",
 )
+@click.option(
+    "-w",
+    "--where",
+    multiple=True,
+    help="only extract events with this param value (can be repeated). Example: '--where t=event' (requires NumPy)",
+)
+@click.option(
+    "-c",
+    "--value-counts",
+    help="print number of events for each value of this param instead of events (requires NumPy)",
+)
+@click.option(
+    "-tu",
+    "--transport_url",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    help="cache directory for events extracted from HAR files (env: GAUNIT_CACHE_DIR)",
+)
+@click.option(
+    "--mmap",
+    is_flag=True,
+    help="find GA requests with a raw scan of the HAR file, decoding them only (faster on big HAR files)",
+)
+def extract(har_file, filter, where, value_counts, transport_url, cache_dir, mmap):
+    import pprint
+
+    from gaunit.table import EventTable
+
+    events = extract_har_events(
+        har_path=har_file, transport_url=transport_url, use_mmap=mmap, cache=cache_dir
+    )
+
+    param_filter = filter.split(",") if filter else None
+    try:
+        table = EventTable.from_events(events)
+    except ImportError as e:
+        if where or value_counts:
+            raise click.UsageError(str(e))
+        # no NumPy, simple filtering
+        if param_filter:
+            events = [filter_keys(e, param_filter) for e in events]
+        pprint.pprint([dict(e) for e in events])
+        return
+
+    predicates = {}
+    for w in where:
+        param, sep, value = w.partition("=")
+        if not sep:
+            raise click.BadParameter(
+                "'%s' is not 'param=value'" % w, param_hint="where"
+            )
+        predicates[param] = value
+    table = table.where(**predicates)
+    if value_counts:
+        args = (
+            {"sort_dicts": False} if get_py_version() >= (3, 8) else {}
+        )  # keep most frequent values first (only for Python>=3.8)
+        pprint.pprint(table.value_counts(value_counts), **args)
+        return
+    if param_filter:
+        table = table.select(param_filter)
+    pprint.pprint(table.to_events())
+
+
+@click.command(
+    "check-dir",
+    help="Check a directory (or glob pattern) of HAR files against a tracking plan, in parallel",
+)
+@click.argument("har_files")
+@click.option(
+    "-t",
+    "--tracking_plan",
+    type=click.Path(),
+    default="./tracking_plan.json",
+)
+@click.option(
+    "-m",
+    "--mapping",
+    type=click.Path(),
+    help="JSON file mapping HAR files (path or file name) to test case ids. "
+    "Defaults to HAR file name without extension",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    help="number of parallel processes (defaults to CPU count)",
+)
+@click.option(
+    "-a",
+    "--all",
+    is_flag=True,
+    help="print all expected events (missing and found) of failed test cases",
+)
+@click.option(
+    "-tu",
+    "--transport_url",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    help="cache directory for events extracted from HAR files (env: GAUNIT_CACHE_DIR)",
+)
+def check_dir(har_files, tracking_plan, mapping, jobs, all, transport_url, cache_dir):
+    from gaunit.batch import find_har_files, iter_check_har_files
+
+    paths = find_har_files(har_files)
+    if not paths:
+        raise click.UsageError("no HAR files found: '%s'" % har_files)
+    test_case_ids = open_json(mapping) if mapping else None
+    try:
+        tp = gaunit.TrackingPlan.from_file(tracking_plan)
+    except (OSError, ValueError, gaunit.TrackingPlanError) as e:
+        raise click.BadParameter(str(e), param_hint="'--tracking_plan'")
+
+    failed = errors = 0
+    for r in iter_check_har_files(
+        paths,
+        tp,
+        test_case_ids,
+        transport_url,
+        max_workers=jobs,
+        cache=cache_dir,
+    ):
+        if r.error is not None:
+            errors += 1
+            print("ERROR  %s [%s]: %s" % (r.path, r.test_case_id, r.error))
+        elif r.result.was_successful():
+            print("OK     %s [%s]" % (r.path, r.test_case_id))
+        else:
+            failed += 1
+            print("FAILED %s [%s]" % (r.path, r.test_case_id))
+            r.result.print_result(display_ok=all)
+        sys.stdout.flush()  # stream results as they come
+    print(80 * "=")
+    print(
+        "HAR files: %s / ok: %s / failed: %s / errors: %s"
+        % (len(paths), len(paths) - failed - errors, failed, errors)
+    )
+    if failed or errors:
+        sys.exit(1)  # end with return code 1 if one check failed
+
+
+@click.command(
+    "extract-dir",
+    help="From a directory (or glob pattern) of HAR files, extract and print GA events, in parallel",
+)
+@click.argument("har_files")
+@click.option(
+    "-f",
+    "--filter",
+    help="list of specific events parameters to extract seperated by `,` (other params are filtered out). Example: '--filter a,b,c'",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    help="number of parallel processes (defaults to CPU count)",
+)
 @click.option(
     "-tu",
     "--transport_url",
-    help="custom transport URL for server side GTM",
-    default="https://www.google-analytics.com",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
 )
-def extract(har_file, filter, transport_url):
-    har = open_json(har_file)
-    requests = get_ga_requests_from_har(har, transport_url)
-    events = []
-    for r in requests:
-        events.extend(parse_ga_request(r))
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    help="cache directory for events extracted from HAR files (env: GAUNIT_CACHE_DIR)",
+)
+def extract_dir(har_files, filter, jobs, transport_url, cache_dir):
+    import pprint
+
+    from gaunit.batch import find_har_files, iter_extract_har_files
+
+    paths = find_har_files(har_files)
+    if not paths:
+        raise click.UsageError("no HAR files found: '%s'" % har_files)
+
+    errors = 0
+    for r in iter_extract_har_files(
+        paths, transport_url, max_workers=jobs, cache=cache_dir
+    ):
+        print("==> %s" % r.path)
+        if r.error is not None:
+            errors += 1
+            print("ERROR: %s" % r.error)
+            continue
+        events = r.events
+        if filter:
+            param_filter = filter.split(",")
+            events = [filter_keys(e, param_filter) for e in events]
+        else:
+            events = [dict(e) for e in events]
+        pprint.pprint(events)
+        sys.stdout.flush()  # stream results as they come
+    if errors:
+        sys.exit(1)
+
 
-    if filter:
-        param_filter = filter.split(",")
-        events = [filter_keys(e, param_filter) for e in events]
-    pprint.pprint(events)
+@click.command(
+    "collect-server",
+    help="Run a local GA collect endpoint checking hits against a tracking plan as they arrive",
+)
+@click.option(
+    "-t",
+    "--tracking_plan",
+    type=click.Path(),
+    default="./tracking_plan.json",
+)
+@click.option(
+    "-c",
+    "--test_case",
+    multiple=True,
+    help="test case to check (can be repeated). Defaults to all test cases of tracking plan",
+)
+@click.option("--host", default="127.0.0.1", help="listening address")
+@click.option("-p", "--port", type=int, default=8080, help="listening port")
+@click.option(
+    "--unordered",
+    is_flag=True,
+    help="do not check that hits respect tracking plan order",
+)
+def collect_server(tracking_plan, test_case, host, port, unordered):
+    from gaunit.server import CollectServer
+
+    tp = gaunit.TrackingPlan.from_file(tracking_plan, list(test_case) or None)
+    server = CollectServer(
+        tp,
+        test_case_ids=list(test_case) or None,
+        host=host,
+        port=port,
+        ordered=not unordered,
+        verbose=True,
+    )
+    print("GAUnit collect server listening on http://%s:%s" % (host, port))
+    print("test cases status: http://%s:%s/_gaunit/status" % (host, port))
+    server.run()
+
+
+@click.command(
+    "watch",
+    help="Follow a HAR file or a Performance Log file as it is written and show the status of a test case, updated as new events arrive",
+)
+@click.argument("file", type=click.Path(dir_okay=False))
+@click.argument("test_case")
+@click.option(
+    "-t",
+    "--tracking_plan",
+    type=click.Path(),
+    default="./tracking_plan.json",
+)
+@click.option(
+    "--perf-log",
+    is_flag=True,
+    help="FILE is a Performance Log (JSONL or JSON), not a HAR file",
+)
+@click.option(
+    "-tu",
+    "--transport_url",
+    help="custom transport URL for server side GTM (can be repeated for several endpoints)",
+    multiple=True,
+    default=["https://www.google-analytics.com"],
+)
+@click.option(
+    "--unordered",
+    is_flag=True,
+    help="do not check that events respect tracking plan order (an event satisfies one expected event at most)",
+)
+@click.option(
+    "--strict/--no-strict",
+    default=True,
+    help="ordered checks: an event satisfies one expected event at most (--no-strict lets following expected events be satisfied by the same event)",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.01),
+    default=0.5,
+    show_default=True,
+    help="seconds between two checks of FILE, when it cannot be watched with inotify",
+)
+def watch(
+    file, test_case, tracking_plan, perf_log, transport_url, unordered, strict, interval
+):
+    from gaunit.watch import Watcher
+
+    tp = gaunit.TrackingPlan.from_file(tracking_plan, [test_case])
+    watcher = Watcher(
+        file,
+        tp,
+        [test_case],
+        perf_log=perf_log,
+        transport_url=transport_url,
+        ordered=not unordered,
+        strict=strict,
+    )
+    watcher.run(interval=interval)  # until interrupted
+    if not watcher.satisfied:
+        sys.exit(1)
+
+
+@click.group("cache", help="Manage the cache of events extracted from HAR files")
+def cache():
+    pass
+
+
+@cache.command("prune", help="Evict cache entries by age and/or total size")
+@click.option(
+    "--cache-dir",
+    type=click.Path(),
+    envvar="GAUNIT_CACHE_DIR",
+    required=True,
+    help="cache directory (env: GAUNIT_CACHE_DIR)",
+)
+@click.option(
+    "--max-age",
+    type=float,
+    help="remove entries not used for more than this number of days",
+)
+@click.option(
+    "--max-size",
+    type=float,
+    help="remove least recently used entries until cache is below this size (MB)",
+)
+def cache_prune(cache_dir, max_age, max_size):
+    if max_age is None and max_size is None:
+        raise click.UsageError("'--max-age' and/or '--max-size' must be given")
+    removed, freed = EventCache(cache_dir).prune(
+        max_age=None if max_age is None else max_age * 24 * 3600,
+        max_size=None if max_size is None else int(max_size * 1024 * 1024),
+    )
+    print("cache entries removed: %s (%.1f MB freed)" % (removed, freed / 1024 / 1024))
+
+
+@click.group("plan", help="Manage tracking plans")
+def plan():
+    pass
+
+
+@plan.command(
+    "compile",
+    help="Compile a JSON tracking plan into a binary file, faster to load (can be given to '-t' instead of the JSON file)",
+)
+@click.argument("tracking_plan", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="compiled tracking plan. Defaults to TRACKING_PLAN with a '.gaplan' extension",
+)
+def plan_compile(tracking_plan, output):
+    path = gaunit.TrackingPlan.compile(tracking_plan, output)
+    print("compiled tracking plan: %s" % path)
 
 
 cli.add_command(help)
 cli.add_command(check)
+cli.add_command(check_perf_log)
 cli.add_command(extract)
+cli.add_command(check_dir)
+cli.add_command(extract_dir)
+cli.add_command(collect_server)
+cli.add_command(watch)
+cli.add_command(cache)
+cli.add_command(plan)
 
 if __name__ == "__main__":
     cli()  # pylint: disable=no-value-for-parameter
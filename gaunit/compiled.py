@@ -0,0 +1,199 @@
+"""
+gaunit.compiled
+
+This module implements compiled tracking plans: a binary artifact holding test cases with
+their expected events already normalized (see :func:`gaunit.TrackingPlan.load_compiled`),
+so that loading a big tracking plan does not decode and format its JSON source again.
+
+Artifact layout: magic bytes and format version, a pickled header (content hash of the
+JSON source, its size and modification time, index of test case ids) and then one pickled
+entry per test case, so that a test case can be loaded without reading the others.
+Like any pickle, only load artifacts you compiled yourself.
+"""
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+from typing import Dict, List
+
+from .events import Event, compact_events, get_schema
+from .exceptions import StaleTrackingPlanError, TrackingPlanError
+
+MAGIC = b"GAUNIT-PLAN\0"
+# bump this version when the artifact layout or its entries change
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".gaplan"
+
+_VERSION = struct.Struct(">H")
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def compiled_path(source: str) -> str:
+    """default path of the artifact compiled from a JSON tracking plan
+    (``tracking_plan.json`` -> ``tracking_plan.gaplan``)"""
+    return os.path.splitext(source)[0] + COMPILED_SUFFIX
+
+
+def is_compiled(path: str) -> bool:
+    """``True`` if file is a compiled tracking plan (whatever its version)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def source_hash(path: str) -> str:
+    """sha256 of a tracking plan source file"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_compiled(
+    content: Dict[str, dict], path: str, source: str = None, content_hash: str = None
+):
+    """Writes test cases of a tracking plan into a compiled artifact.
+
+    Args:
+        content (Dict[str, dict]): test cases, as in :attr:`TrackingPlan.content`, with
+            formatted events
+        path (str): target file
+        source (str, optional): JSON source of the tracking plan, used to detect stale
+            artifacts. Defaults to None.
+        content_hash (str, optional): hash of the source, computed before it was read.
+            Defaults to None (source is hashed now).
+    """
+    header = {"content_hash": None, "source": None, "test_cases": {}}
+    if source is not None:
+        st = os.stat(source)
+        header["content_hash"] = content_hash or source_hash(source)
+        header["source"] = os.path.abspath(source)
+        header["source_size"] = st.st_size
+        header["source_mtime_ns"] = st.st_mtime_ns
+
+    entries = []
+    offset = 0
+    for test_case_id, test_case in content.items():
+        data = pickle.dumps(_pack(test_case), protocol=pickle.HIGHEST_PROTOCOL)
+        header["test_cases"][test_case_id] = (offset, len(data))
+        entries.append(data)
+        offset += len(data)
+
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + _VERSION.pack(FORMAT_VERSION))
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for data in entries:
+                f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_compiled(
+    path: str,
+    test_cases: List[str] = None,
+    source: str = None,
+    check_stale: bool = True,
+) -> Dict[str, dict]:
+    """Reads test cases from a compiled artifact.
+
+    Args:
+        path (str): compiled tracking plan
+        test_cases (List[str], optional): ids of test cases to read. Defaults to None (all
+            test cases).
+        source (str, optional): JSON source to check the artifact against. Defaults to None
+            (source the artifact was compiled from, if it still exists).
+        check_stale (bool, optional): check that the source did not change since
+            compilation. Defaults to True.
+
+    Raises:
+        :exception:`gaunit.TrackingPlanError`: if file is not a compiled tracking plan of
+            this version, or if a test case is not found
+        :exception:`gaunit.StaleTrackingPlanError`: if the source changed
+
+    Returns:
+        Dict[str, dict]: test cases, in tracking plan order
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + _VERSION.size)
+        if head[: len(MAGIC)] != MAGIC:
+            raise TrackingPlanError("not a compiled tracking plan: '%s'" % path)
+        (version,) = _VERSION.unpack(head[len(MAGIC) :])
+        if version != FORMAT_VERSION:
+            raise TrackingPlanError(
+                "compiled tracking plan '%s' has format version %s (expected %s), "
+                "please compile it again" % (path, version, FORMAT_VERSION)
+            )
+        header = pickle.load(f)
+        if check_stale and is_stale(header, source):
+            source = source or header["source"]
+            raise StaleTrackingPlanError(
+                "compiled tracking plan '%s' is out of date with '%s', please compile it "
+                "again: ga plan compile %s" % (path, source, source)
+            )
+
+        index = header["test_cases"]
+        wanted = set(index if test_cases is None else test_cases)
+        unknown = [i for i in wanted if i not in index]
+        if unknown:
+            raise TrackingPlanError(
+                "test case not found in tracking plan: '%s'"
+                % "', '".join(sorted(unknown))
+            )
+        data_start = f.tell()
+        content = {}
+        for test_case_id, (offset, length) in index.items():
+            if test_case_id in wanted:
+                f.seek(data_start + offset)
+                content[test_case_id] = _unpack(pickle.loads(f.read(length)))
+    return content
+
+
+def is_stale(header: dict, source: str = None) -> bool:
+    """``True`` if the source of a compiled tracking plan changed since compilation.
+
+    Files of same size and modification time are not hashed. An artifact without source,
+    or whose source does not exist anymore, is never stale.
+    """
+    if header["content_hash"] is None and source is None:
+        return False
+    source = source or header["source"]
+    try:
+        st = os.stat(source)
+    except OSError:
+        return False
+    if os.path.abspath(source) == header["source"] and (
+        st.st_size,
+        st.st_mtime_ns,
+    ) == (header.get("source_size"), header.get("source_mtime_ns")):
+        return False
+    return source_hash(source) != header["content_hash"]
+
+
+def _pack(test_case: dict) -> dict:
+    """events as a shared list of keys and a tuple of values per event (events with the
+    same keys share one schema, unpickling does not go through each event)"""
+    schemas = {}
+    events = []
+    for e in compact_events(test_case["events"]):
+        keys = tuple(e)
+        events.append((schemas.setdefault(keys, len(schemas)), tuple(e.values())))
+    return dict(test_case, events=(list(schemas), events))
+
+
+def _unpack(test_case: dict) -> dict:
+    keys, events = test_case["events"]
+    schemas = [get_schema(k) for k in keys]
+    return dict(test_case, events=[Event(schemas[i], values) for i, values in events])
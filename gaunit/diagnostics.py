@@ -0,0 +1,140 @@
+"""
+gaunit.diagnostics
+
+This module implements nearest-miss diagnostics: for an expected event reported missing, the
+actual events holding most of its params, and the params which differ (see
+:func:`gaunit.Result.nearest_misses`).
+
+Similarity is the number of ``(param, value)`` pairs of the expected event held by an actual
+event. Candidates are found from the posting lists of an :class:`~gaunit.matching.EventIndex`:
+only events sharing at least one pair are looked at, never all pairs of events. Pairs held by
+most events of a session (``v=1``, ``tid=...``) do not tell events apart (like terms with a
+low IDF): they are checked on candidates found with other pairs, and their posting lists are
+only walked when events holding common pairs only may still be among the nearest ones.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .matching import EventIndex
+
+NEAREST_MISSES = 3  # default number of nearest misses reported for a missing event
+# pairs held by more than this share of actual events (and by more than COMMON_MIN events)
+# are too common to find candidates
+COMMON_RATIO = 0.2
+COMMON_MIN = 1000
+
+_MISSING = object()
+
+
+class NearMiss(object):
+    """An actual event close to a missing expected event.
+
+    Attributes:
+        position (int): position of the event in actual events
+        event (Mapping): actual event
+        matched (int): number of params of expected event found with the same value
+        diff (Dict[str, Tuple[str, Optional[str]]]): params of expected event not found:
+            expected value and actual value (``None`` if param is absent)
+    """
+
+    def __init__(
+        self,
+        position: int,
+        event: Mapping,
+        matched: int,
+        diff: Dict[str, Tuple[str, Optional[str]]],
+    ):
+        self.position = position
+        self.event = event
+        self.matched = matched
+        self.diff = diff
+
+    def __repr__(self):
+        return "NearMiss(position=%r, matched=%r, diff=%r)" % (
+            self.position,
+            self.matched,
+            self.diff,
+        )
+
+    def as_dict(self) -> dict:
+        """near miss as a JSON serializable dict"""
+        return {
+            "position": self.position,
+            "event": dict(self.event),
+            "matched": self.matched,
+            "diff": {
+                k: {"expected": expected, "actual": actual}
+                for k, (expected, actual) in self.diff.items()
+            },
+        }
+
+
+def nearest_misses(
+    expected: Mapping, index: EventIndex, k: int = NEAREST_MISSES
+) -> List[NearMiss]:
+    """Returns the ``k`` actual events holding most params of an expected event.
+
+    Events holding no param of the expected event are never returned. Ties are broken by
+    position (first events first). An event holding all params (found out of order, or
+    already used by another expected event) has an empty :attr:`NearMiss.diff`.
+
+    Example:
+        >>> index = EventIndex([{"t": "event", "ea": "add"}, {"t": "pageview"}])
+        >>> nearest_misses({"t": "event", "ea": "add_to_cart"}, index)
+        [NearMiss(position=0, matched=1, diff={'ea': ('add_to_cart', 'add')})]
+
+    Args:
+        expected (Mapping): expected event
+        index (:class:`~gaunit.matching.EventIndex`): index over actual events
+        k (int, optional): maximum number of events returned. Defaults to 3.
+    """
+    if k <= 0:
+        return []
+    size = len(index.events)
+    counts = Counter()  # candidates: number of uncommon pairs held
+    common = []  # pairs held by most events
+    for item in expected.items():
+        positions = index.postings.get(item)
+        if not positions:
+            continue
+        if len(positions) > max(COMMON_RATIO * size, COMMON_MIN):
+            common.append(item)
+        else:
+            counts.update(positions)
+    levels = defaultdict(list)
+    for position, n in counts.items():
+        levels[n].append(position)
+    # best counts first, common pairs held are added to counts: stop when a level cannot
+    # reach the k-th best similarity anymore
+    nearest = []  # (-matched, position)
+    events = index.events
+    for n in sorted(levels, reverse=True):
+        if len(nearest) == k and n + len(common) < -nearest[-1][0]:
+            break
+        for position in levels[n]:
+            event = events[position]
+            matched = n + sum(1 for p, v in common if event.get(p, _MISSING) == v)
+            nearest.append((-matched, position))
+        nearest.sort()
+        del nearest[k:]
+    if common and (len(nearest) < k or len(common) >= -nearest[-1][0]):
+        # events holding common pairs only may be as close as candidates
+        common_counts = Counter()
+        for item in common:
+            common_counts.update(index.postings[item])
+        for position, matched in common_counts.items():
+            if position not in counts:
+                nearest.append((-matched, position))
+        nearest.sort()
+        del nearest[k:]
+    nearest = [(position, -matched) for matched, position in nearest]
+    misses = []
+    for position, matched in nearest:
+        event = index.events[position]
+        diff = {}
+        for param, value in expected.items():
+            actual = event.get(param, _MISSING)
+            if actual != value:
+                diff[param] = (value, None if actual is _MISSING else actual)
+        misses.append(NearMiss(position, event, matched, diff))
+    return misses
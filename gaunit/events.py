@@ -0,0 +1,233 @@
+"""
+gaunit.events
+
+This module implements :class:`Event`, a compact and read-only representation of GA events
+used for actual events. Events with the same parameters share one key schema, keys and
+short values are interned, so that long sessions with tens of thousands of hits do not hold
+as many dicts and duplicated strings.
+"""
+import sys
+import weakref
+from collections.abc import ItemsView, Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# values longer than that are not worth interning (unique ids, long urls,...)
+INTERN_MAX_LENGTH = 128
+
+# param holding the property of an event: UA tracking id or GA4 measurement id
+PROPERTY_PARAM = "tid"
+
+_MISSING = object()
+
+
+class EventSchema(object):
+    """Ordered keys shared by all events having the same parameters (in the same order)."""
+
+    __slots__ = ("keys", "positions", "__weakref__")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.positions = {k: i for i, k in enumerate(keys)}  # type: Dict[str, int]
+
+
+# schemas are kept while events use them, so that the table does not grow with every new
+# set of parameters seen by a long running process
+_schemas = weakref.WeakValueDictionary()  # type: Dict[Tuple[str, ...], EventSchema]
+
+
+def get_schema(keys: Iterable[str]) -> EventSchema:
+    """returns the shared schema for these keys"""
+    keys = tuple(keys)
+    schema = _schemas.get(keys)
+    if schema is None:
+        schema = EventSchema(tuple(sys.intern(k) for k in keys))
+        _schemas[keys] = schema
+    return schema
+
+
+class _EventItemsView(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        e = self._mapping
+        return zip(e._schema.keys, e._values)
+
+
+class Event(Mapping):
+    """Compact read-only GA event, usable as a dict of params.
+
+    Example:
+        >>> from gaunit.events import compact_event
+        >>> e = compact_event({"v": "1", "t": "pageview", "dp": "home"})
+        >>> e["t"]
+        'pageview'
+        >>> e == {"v": "1", "t": "pageview", "dp": "home"}
+        True
+        >>> dict(e)
+        {'v': '1', 't': 'pageview', 'dp': 'home'}
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, schema: EventSchema, values: tuple):
+        self._schema = schema
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._schema.positions[key]]
+
+    def get(self, key, default=None):
+        i = self._schema.positions.get(key, _MISSING)
+        if i is _MISSING:
+            return default
+        return self._values[i]
+
+    def __contains__(self, key):
+        return key in self._schema.positions
+
+    def __iter__(self):
+        return iter(self._schema.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def items(self):
+        return _EventItemsView(self)
+
+    def __eq__(self, other):
+        if isinstance(other, Event) and other._schema is self._schema:
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(zip(self._schema.keys, self._values)))
+
+    def __reduce__(self):
+        return (_make_event, (self._schema.keys, self._values))
+
+
+class LayeredParams(Mapping):
+    """Read-only params of an event over params shared with other events, without copying
+    them: URL params of a batched GA4 request are shared by all events of its payload.
+
+    Shared params take precedence, keys are in the same order as after
+    ``params.update(shared)``.
+
+    Example:
+        >>> shared = {"v": "2", "tid": "G-XYZ"}
+        >>> e = LayeredParams({"en": "scroll"}, shared)
+        >>> e == {"en": "scroll", "v": "2", "tid": "G-XYZ"}
+        True
+
+    Args:
+        params (dict): params of event
+        shared (Mapping): params shared with other events
+    """
+
+    __slots__ = ("params", "shared")
+
+    def __init__(self, params: dict, shared: Mapping):
+        self.params = params
+        self.shared = shared
+
+    def __getitem__(self, key):
+        if key in self.shared:
+            return self.shared[key]
+        return self.params[key]
+
+    def __contains__(self, key):
+        return key in self.shared or key in self.params
+
+    def __iter__(self):
+        params = self.params
+        yield from params
+        for k in self.shared:
+            if k not in params:
+                yield k
+
+    def __len__(self):
+        return len(self.params) + sum(1 for k in self.shared if k not in self.params)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _intern(value):
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _make_event(keys: Tuple[str, ...], values: tuple) -> Event:
+    return Event(get_schema(keys), tuple(_intern(v) for v in values))
+
+
+def compact_event(event: Mapping) -> Event:
+    """returns a compact :class:`Event` from a dict of params"""
+    if isinstance(event, Event):
+        return event
+    if type(event) is LayeredParams:
+        params, shared = event.params, event.shared
+        if params.keys().isdisjoint(shared):
+            # usual case, no param is overridden: no merged dict
+            return _make_event(
+                tuple(params) + tuple(shared),
+                tuple(params.values()) + tuple(shared.values()),
+            )
+        event = dict(params, **shared)
+    return _make_event(tuple(event), tuple(event.values()))
+
+
+def compact_events(events: Iterable[Mapping]) -> List[Event]:
+    """returns a list of compact :class:`Event` from dicts of params
+
+    Params shared by :class:`LayeredParams` events (ex: a batch of GA4 events) are interned
+    once for all of them.
+    """
+    compacted = []
+    shared = None
+    for e in events:
+        if type(e) is not LayeredParams or not e.params.keys().isdisjoint(e.shared):
+            compacted.append(compact_event(e))
+            continue
+        if e.shared is not shared:
+            shared = e.shared
+            shared_keys = tuple(shared)
+            shared_values = tuple([_intern(v) for v in shared.values()])
+        params = e.params
+        schema = get_schema(tuple(params) + shared_keys)
+        values = tuple([_intern(v) for v in params.values()]) + shared_values
+        compacted.append(Event(schema, values))
+    return compacted
+
+
+def partition_events(
+    events: Iterable[Mapping], param: str = PROPERTY_PARAM
+) -> Dict[Optional[str], List[Mapping]]:
+    """Splits events by property in one pass.
+
+    Example:
+        >>> partition_events([{"tid": "UA-1-1", "t": "pageview"}, {"tid": "G-XYZ"}, {}])
+        {'UA-1-1': [{'tid': 'UA-1-1', 't': 'pageview'}], 'G-XYZ': [{'tid': 'G-XYZ'}], None: [{}]}
+
+    Args:
+        events (Iterable[Mapping]): events
+        param (str, optional): param holding the property. Defaults to "tid" (UA tracking
+            id or GA4 measurement id).
+
+    Returns:
+        Dict[Optional[str], List[Mapping]]: events of each property, in the same order
+        (events without property under ``None``)
+    """
+    partitions = {}
+    for event in events:
+        key = event.get(param)
+        try:
+            partitions[key].append(event)
+        except KeyError:
+            partitions[key] = [event]
+    return partitions
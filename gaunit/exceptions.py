@@ -15,3 +15,7 @@ class DictXORJsonPathError(GAUnitException):
 
 class TestCaseCheckError(GAUnitException):
     """Something is missing in Test Case to make a proper check"""
+
+
+class StaleTrackingPlanError(TrackingPlanError):
+    """Compiled tracking plan is out of date with its JSON source"""
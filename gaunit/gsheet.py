@@ -0,0 +1,125 @@
+"""
+gaunit.gsheet
+
+This module implements the download of tracking plans from Google Sheets (see
+:func:`gaunit.TrackingPlan.from_spreadsheet`): all worksheets are fetched with one batched
+values request, and can be cached on disk by spreadsheet revision.
+"""
+import hashlib
+from typing import Dict, List, Optional, Union
+
+from .cache import EventCache, get_event_cache
+from .exceptions import TrackingPlanError
+
+# bump this version when records built from worksheet values change
+RECORDS_VERSION = 1
+
+
+def get_worksheets_records(
+    sheet, titles: List[str] = None, cache: Union[str, EventCache] = None
+) -> Dict[str, List[dict]]:
+    """returns records of worksheets, as ``gspread.Worksheet.get_all_records()`` would
+
+    Values of all worksheets are fetched in one batched request (instead of one request per
+    worksheet). With a cache, values are stored by spreadsheet revision (last update time):
+    if the spreadsheet did not change, only its revision is requested.
+
+    Args:
+        sheet (gspread.Spreadsheet): spreadsheet
+        titles (List[str], optional): titles of worksheets to fetch. Defaults to None (all
+            worksheets).
+        cache (Union[str, EventCache], optional): cache directory or cache. Defaults to None.
+
+    Raises:
+        TrackingPlanError: if a worksheet is not found or has duplicate headers
+
+    Returns:
+        Dict[str, List[dict]]: records by worksheet title, in spreadsheet order
+    """
+    cache = get_event_cache(cache)
+    revision = _get_revision(sheet) if cache is not None else None
+    if revision is None:
+        cache = None  # changes cannot be detected
+
+    all_titles = None
+    if cache is not None:
+        all_titles = cache.get(_key(sheet.id, revision))
+    if all_titles is None:
+        all_titles = [w.title for w in sheet.worksheets()]
+        if cache is not None:
+            cache.set(_key(sheet.id, revision), all_titles)
+
+    if titles is None:
+        titles = all_titles
+    else:
+        unknown = [t for t in titles if t not in all_titles]
+        if unknown:
+            raise TrackingPlanError("worksheets not found in spreadsheet: %s" % unknown)
+        titles = [t for t in all_titles if t in titles]
+
+    values = {}
+    if cache is not None:
+        for t in titles:
+            v = cache.get(_key(sheet.id, revision, t))
+            if v is not None:
+                values[t] = v
+    missing = [t for t in titles if t not in values]
+    if missing:
+        ranges = [_absolute_range_name(t) for t in missing]
+        response = sheet.values_batch_get(ranges)
+        for t, value_range in zip(missing, response["valueRanges"]):
+            values[t] = value_range.get("values", [])
+            if cache is not None:
+                cache.set(_key(sheet.id, revision, t), values[t])
+
+    return {t: _to_records(values[t], t) for t in titles}
+
+
+def _get_revision(sheet) -> Optional[str]:
+    """last update time of spreadsheet (``None`` if not available)"""
+    get_last_update_time = getattr(sheet, "get_lastUpdateTime", None)
+    if get_last_update_time is not None:
+        return get_last_update_time()
+    return getattr(sheet, "lastUpdateTime", None)
+
+
+def _key(spreadsheet_id: str, revision: str, title: str = None) -> str:
+    k = "\0".join(["gsheet", str(RECORDS_VERSION), spreadsheet_id, revision])
+    if title is not None:
+        k += "\0values\0" + title
+    return hashlib.sha256(k.encode("utf8")).hexdigest()
+
+
+def _absolute_range_name(title: str) -> str:
+    """A1 notation of a whole worksheet"""
+    return "'%s'" % title.replace("'", "''")
+
+
+def _to_records(values: List[list], title: str) -> List[dict]:
+    """first row as keys and following rows as values, numericised and padded like
+    ``gspread.Worksheet.get_all_records()``"""
+    if not values:
+        return []
+    width = max(len(row) for row in values)
+    rows = [list(row) + [""] * (width - len(row)) for row in values]
+    keys, rows = rows[0], rows[1:]
+    duplicates = sorted({k for k in keys if keys.count(k) > 1})
+    if duplicates:
+        raise TrackingPlanError(
+            "header row of worksheet '%s' contains duplicates: %s" % (title, duplicates)
+        )
+    return [dict(zip(keys, [_numericise(v) for v in row])) for row in rows]
+
+
+def _numericise(value):
+    """same as ``gspread.utils.numericise()``: ints and floats are converted"""
+    if not isinstance(value, str) or "_" in value:
+        return value
+    cleaned = value.replace(",", "")
+    try:
+        return int(cleaned)
+    except ValueError:
+        try:
+            return float(cleaned)
+        except ValueError:
+            return value
@@ -0,0 +1,485 @@
+"""
+gaunit.har
+
+This module implements an incremental HAR reader. Entries are read one at a time from
+``log.entries`` and only the ``request`` object of each entry is decoded: responses
+(and their base64 encoded bodies) are skipped without being turned into Python objects.
+
+It also implements an opt-in raw scan of memory-mapped HAR files, decoding GA requests only.
+"""
+import json
+import mmap
+import re
+from time import perf_counter
+from typing import Iterable, Iterator
+
+from .events import compact_events
+from .exceptions import DictXORJsonPathError
+from .json_backend import JsonBackend, get_json_backend
+from .stats import (
+    ENTRIES,
+    EVENTS,
+    REQUESTS,
+    STEP_DECODE,
+    STEP_FILTER,
+    STEP_PARSE,
+    Stats,
+)
+from .utils import get_ga_requests_from_har, get_ga_url_matcher, parse_ga_request
+
+CHUNK_SIZE = 1 << 20  # bytes read from file at each refill
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING_STOP = re.compile(rb'["\\]')
+# whole strings (when they are complete in buffer) are consumed in one regex jump
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_CONTAINER_STOP = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]', re.DOTALL)
+_KEY = re.compile(rb'"([^"\\]*)"[ \t\n\r]*:')
+
+
+def _nested_container_pattern(depth: int) -> bytes:
+    """regex matching a whole container nested up to ``depth`` levels (``re`` has no
+    recursion), unrolled so that it never backtracks"""
+    other = rb'[^"\[\]{}]*'
+    string = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+    inner = other + rb"(?:" + string + other + rb")*"
+    for _ in range(depth - 1):
+        inner = (
+            other
+            + rb"(?:(?:"
+            + string
+            + rb"|[\[{]"
+            + inner
+            + rb"[\]}])"
+            + other
+            + rb")*"
+        )
+    return rb"[\[{]" + inner + rb"[\]}]"
+
+
+# containers complete in buffer are skipped in one regex jump
+_CONTAINER = re.compile(_nested_container_pattern(8), re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+
+
+class _JsonStream(object):
+    """Minimal pull parser over a binary file, just enough to walk through a HAR.
+
+    Values we are not interested in are skipped with regex jumps (no Python objects are built,
+    bytes are not even decoded to ``str``), values we need are captured as raw bytes and
+    decoded by a :class:`~gaunit.json_backend.JsonBackend`.
+    """
+
+    def __init__(self, f, chunk_size: int = None, json_backend: JsonBackend = None):
+        self.f = f
+        self.chunk_size = CHUNK_SIZE if chunk_size is None else chunk_size
+        self.loads = get_json_backend(json_backend).loads
+        self.buf = b""
+        self.pos = 0
+        self.mark = None  # start of a value being captured, must stay in buffer
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """read next chunk and drop what was already consumed (or captured)"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        start = self.pos if self.mark is None else self.mark
+        self.buf = self.buf[start:] + chunk
+        self.pos -= start
+        if self.mark is not None:
+            self.mark = 0
+        return True
+
+    def tell(self) -> int:
+        """file offset of current position"""
+        return self.f.tell() - len(self.buf) + self.pos
+
+    def _error(self, msg: str):
+        doc = self.buf[: self.pos].decode("utf8", "replace")
+        raise json.JSONDecodeError(msg, doc, len(doc))
+
+    def peek(self) -> bytes:
+        """skip whitespaces and return next char without consuming it (b"" at EOF)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos : self.pos + 1]
+            if not self._fill():
+                return b""
+
+    def expect(self, char: bytes):
+        if self.peek() != char:
+            self._error("Expecting '%s'" % char.decode())
+        self.pos += 1
+
+    def next_item(self, closing: bytes) -> bool:
+        """move to next item of current object or array, returns False when container ends"""
+        c = self.peek()
+        if c == b",":
+            self.pos += 1
+            c = self.peek()
+        if c == closing:
+            self.pos += 1
+            return False
+        if not c:
+            self._error("Unterminated container")
+        return True
+
+    def read_key(self) -> str:
+        """read an object key and the following colon"""
+        if self.peek() != b'"':
+            self._error("Expecting property name enclosed in double quotes")
+        m = _KEY.match(self.buf, self.pos)
+        if m is not None:
+            # key without escaped chars
+            self.pos = m.end()
+            return m.group(1).decode("utf8")
+        start = self.pos
+        self.mark = start
+        self._skip_string()
+        key = self.loads(self.buf[self.mark : self.pos])
+        self.mark = None
+        self.expect(b":")
+        return key
+
+    def read_value(self):
+        """decode next value"""
+        self.peek()
+        self.mark = self.pos
+        self.skip_value()
+        value = self.loads(self.buf[self.mark : self.pos])
+        self.mark = None
+        return value
+
+    def skip_value(self):
+        """move after next value without decoding it"""
+        c = self.peek()
+        if not c:
+            self._error("Expecting value")
+        elif c == b'"':
+            self._skip_string()
+        elif c in b"[{":
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def _skip_string(self):
+        m = _STRING.match(self.buf, self.pos)
+        if m is not None:
+            self.pos = m.end()
+            return
+        self.pos += 1  # opening quote
+        while True:
+            m = _STRING_STOP.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    self._error("Unterminated string")
+                continue
+            if m.group() == b'"':
+                self.pos = m.end()
+                return
+            # escaped char: make sure it is in buffer before jumping over it
+            self.pos = m.start()
+            if self.pos + 1 >= len(self.buf) and not self._fill():
+                self._error("Unterminated string")
+            self.pos += 2
+
+    def _skip_container(self):
+        m = _CONTAINER.match(self.buf, self.pos)
+        if m is not None:
+            self.pos = m.end()
+            return
+        # container ends in next chunks (or is nested deeper): token by token
+        depth = 0
+        while True:
+            m = _CONTAINER_STOP.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    self._error("Unterminated container")
+                continue
+            c = m.group()
+            if len(c) > 1:
+                self.pos = m.end()  # whole string
+                continue
+            self.pos = m.start()
+            if c == b'"':
+                self._skip_string()  # string ends in next chunks
+                continue
+            self.pos += 1
+            depth += 1 if c in b"[{" else -1
+            if depth == 0:
+                return
+
+    def _skip_scalar(self):
+        while True:
+            m = _SCALAR.match(self.buf, self.pos)
+            if m.end() < len(self.buf) or not self._fill():
+                self.pos = m.end()
+                return
+
+
+def iter_har_entries(har_path: str, json_backend: JsonBackend = None) -> Iterator[dict]:
+    """yield HAR entries one by one from a HAR file, with their ``request`` only
+
+    Every other entry field (``response``, ``timings``, ...) is skipped without being decoded.
+
+    Args:
+        har_path (str): path to HAR file (standard HAR JSON)
+        json_backend (Union[str, JsonBackend], optional): JSON backend decoding requests
+            (see :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+    Raises:
+        ValueError: if file is not a valid HAR JSON
+
+    Yields:
+        dict: entry with its request, ex: ``{"request": {"method": "GET", "url": ...}}``
+    """
+    with open(har_path, "rb") as f:
+        s = _JsonStream(f, json_backend=json_backend)
+        s.expect(b"{")
+        while s.next_item(b"}"):
+            if s.read_key() != "log":
+                s.skip_value()
+                continue
+            s.expect(b"{")
+            while s.next_item(b"}"):
+                if s.read_key() != "entries":
+                    s.skip_value()
+                    continue
+                s.expect(b"[")
+                while s.next_item(b"]"):
+                    yield _read_entry(s)
+
+
+def _read_entry(s: _JsonStream) -> dict:
+    """read next HAR entry, with its request only"""
+    s.expect(b"{")
+    entry = {}
+    while s.next_item(b"}"):
+        if s.read_key() == "request":
+            entry["request"] = s.read_value()
+        else:
+            s.skip_value()
+    return entry
+
+
+def iter_ga_requests_from_har_file(
+    har_path: str,
+    transport_url: str = "https://www.google-analytics.com",
+    json_backend: JsonBackend = None,
+) -> Iterator[dict]:
+    """yield GA requests from a HAR file without loading the whole HAR in memory
+
+    Streaming equivalent of :func:`gaunit.utils.get_ga_requests_from_har`.
+
+    Args:
+        har_path (str): path to HAR file (standard HAR JSON)
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+    Yields:
+        dict: GA requests (located in ``har["log"]["entries"]``)
+    """
+    matcher = get_ga_url_matcher(transport_url)
+    for entry in iter_har_entries(har_path, json_backend):
+        r = entry.get("request")
+        if r is not None and matcher(r["url"]):
+            yield r
+
+
+class _LayoutError(Exception):
+    """HAR file layout is not the one expected by raw scan"""
+
+
+_URL_FIELD = re.compile(
+    rb'"url"[ \t\n\r]*:[ \t\n\r]*"[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL
+)
+_REQUEST_KEY = re.compile(rb'"request"[ \t\n\r]*:[ \t\n\r]*(?={)')
+
+
+def get_ga_requests_from_har_mmap(
+    har_path: str,
+    transport_url: str = "https://www.google-analytics.com",
+    json_backend: JsonBackend = None,
+) -> list:
+    """returns GA requests from a HAR file, decoding GA requests only
+
+    The file is memory-mapped and searched (as raw bytes) for transport URL hosts. Only the
+    ``request`` object enclosing each ``"url"`` field holding one of them is decoded, the
+    rest of the file is never decoded. Much faster than :func:`iter_ga_requests_from_har_file`
+    when GA requests are a small part of a big HAR. Hosts are searched in lower case, as
+    written by browsers.
+
+    Falls back to :func:`iter_ga_requests_from_har_file` if the file layout is not the
+    expected one (not a HAR object, ``request`` objects which cannot be found...).
+
+    Args:
+        har_path (str): path to HAR file (standard HAR JSON)
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+    Returns:
+        list: GA requests (located in ``har["log"]["entries"]``)
+    """
+    matcher = get_ga_url_matcher(transport_url)
+    backend = get_json_backend(json_backend)
+    try:
+        with open(har_path, "rb") as f:
+            try:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                raise _LayoutError("file cannot be mapped (empty file...)")
+            with m:
+                return _scan_ga_requests(m, matcher, backend.loads)
+    except _LayoutError:
+        return list(iter_ga_requests_from_har_file(har_path, matcher, backend))
+
+
+def _scan_ga_requests(buf, matcher, loads) -> list:
+    """find and decode GA requests in a HAR buffer (see get_ga_requests_from_har_mmap)"""
+    start = _WHITESPACE.match(buf).end()
+    if buf[start : start + 1] != b"{" or buf.find(b'"entries"') == -1:
+        raise _LayoutError("not a HAR object")
+    if _REQUEST_KEY.search(buf) is None:
+        raise _LayoutError("no request object")
+    # case sensitive: much faster, browsers write lower case hosts
+    hosts = re.compile(b"|".join(re.escape(h.encode("utf8")) for h in matcher.hosts))
+    requests = []
+    end = 0  # end of last decoded request
+    for m in hosts.finditer(buf):
+        pos = m.start()
+        if pos < end:
+            continue  # in last decoded request (headers, postData...)
+        # host must be in a "url" field value...
+        url_start = buf.rfind(b'"url"', end, pos)
+        if url_start == -1:
+            continue
+        field = _URL_FIELD.match(buf, url_start)
+        if field is None or field.end() <= pos:
+            continue
+        # ... of a request object
+        key_start = buf.rfind(b'"request"', 0, url_start)
+        if key_start == -1:
+            continue  # before first request object (ex: "_initiator" of Chrome)
+        key = _REQUEST_KEY.match(buf, key_start)
+        if key is None:
+            raise _LayoutError("no request object before url at %d" % url_start)
+        container = _CONTAINER.match(buf, key.end())
+        if container is None:
+            raise _LayoutError("request object at %d cannot be skipped" % key.end())
+        if container.end() <= pos:
+            continue  # "url" field after request object (ex: "_initiator")
+        try:
+            request = loads(buf[key.end() : container.end()])
+            url = request["url"]
+        except (ValueError, KeyError, TypeError):
+            raise _LayoutError("invalid request object at %d" % key.end())
+        end = container.end()
+        if matcher(url):
+            requests.append(request)
+    return requests
+
+
+def get_events_from_har(
+    har: dict = None,
+    har_path: str = None,
+    transport_url: str = "https://www.google-analytics.com",
+    stats: Stats = None,
+    json_backend: JsonBackend = None,
+    use_mmap: bool = False,
+) -> list:
+    """extract GA events from a har dict or a HAR file
+
+    Takes one and one only argument : dict or path to a json file. HAR files are read
+    incrementally (see :func:`iter_ga_requests_from_har_file`).
+
+    Args:
+        har (dict, optional): har in dict format. Defaults to None.
+        har_path (str, optional): path to HAR file. Defaults to None.
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        stats (:class:`~gaunit.stats.Stats`, optional): record of timings and counters to
+            update. Defaults to None.
+        json_backend (Union[str, JsonBackend], optional): JSON backend used to read HAR file
+            (see :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+        use_mmap (bool, optional): find GA requests in HAR file with a raw scan and decode
+            them only (see :func:`get_ga_requests_from_har_mmap`). Only GA requests are
+            counted as entries in ``stats``. Defaults to False.
+
+    Raises:
+        DictXORJsonPathError: if zero or two arguments are given
+
+    Returns:
+        list: list of GA events parameters (compact read-only :class:`~gaunit.events.Event`)
+    """
+    if har and har_path:
+        raise DictXORJsonPathError(
+            "too many arguments (dict and json_path). only one argument must be given"
+        )
+    elif stats is not None and (har or har_path):
+        if har:
+            entries = har["log"]["entries"]
+        elif use_mmap:
+            entries = stats.timed(
+                _iter_mmap_entries(har_path, transport_url, json_backend), STEP_DECODE
+            )
+        else:
+            entries = stats.timed(iter_har_entries(har_path, json_backend), STEP_DECODE)
+        return _get_events_from_entries(entries, transport_url, stats)
+    elif har:
+        requests = get_ga_requests_from_har(har, transport_url)
+    elif har_path and use_mmap:
+        requests = get_ga_requests_from_har_mmap(har_path, transport_url, json_backend)
+    elif har_path:
+        requests = iter_ga_requests_from_har_file(har_path, transport_url, json_backend)
+    else:
+        raise DictXORJsonPathError(
+            "arguments given are both empty (dict or JSON file path)"
+        )
+    events = []
+    for r in requests:
+        events.extend(compact_events(parse_ga_request(r)))
+    return events
+
+
+def _iter_mmap_entries(har_path: str, transport_url, json_backend) -> Iterator[dict]:
+    """GA requests found by raw scan, as HAR entries"""
+    for r in get_ga_requests_from_har_mmap(har_path, transport_url, json_backend):
+        yield {"request": r}
+
+
+def _get_events_from_entries(
+    entries: Iterable[dict], transport_url, stats: Stats
+) -> list:
+    """extract GA events from HAR entries, timing filtering and parsing"""
+    matcher = get_ga_url_matcher(transport_url)
+    events = []
+    filter_time = parse_time = 0.0
+    entries_count = requests_count = 0
+    for entry in entries:
+        start = perf_counter()
+        r = entry.get("request")
+        keep = r is not None and matcher(r["url"])
+        filtered = perf_counter()
+        filter_time += filtered - start
+        entries_count += 1
+        if keep:
+            requests_count += 1
+            events.extend(compact_events(parse_ga_request(r)))
+            parse_time += perf_counter() - filtered
+    stats.add_time(STEP_FILTER, filter_time)
+    stats.add_time(STEP_PARSE, parse_time)
+    stats.count(ENTRIES, entries_count)
+    stats.count(REQUESTS, requests_count)
+    stats.count(EVENTS, len(events))
+    return events
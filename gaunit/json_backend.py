@@ -0,0 +1,122 @@
+"""
+gaunit.json_backend
+
+This module implements the JSON backends used to decode HAR files, Performance Logs and
+tracking plans. Fast decoders (orjson, pysimdjson, ujson) are used when installed, the
+standard library ``json`` module otherwise. Files are read and decoded as bytes, without an
+intermediate ``str``.
+
+A backend can be selected with the ``json_backend`` argument of most functions, or with the
+``GAUNIT_JSON_BACKEND`` environment variable (``"auto"`` by default).
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Callable, Union
+
+ENV_VAR = "GAUNIT_JSON_BACKEND"
+AUTO = "auto"
+
+
+class JsonBackend(object):
+    """JSON decoder.
+
+    Example:
+        >>> from gaunit.json_backend import get_json_backend
+        >>> backend = get_json_backend()  # "auto": fastest backend installed
+        >>> backend.name
+        'orjson'
+        >>> backend.loads(b'{"t": "pageview"}')
+        {'t': 'pageview'}
+
+    Args:
+        name (str): backend name
+        loads (Callable[[Union[bytes, str]], object]): decodes JSON from bytes or str, raises
+            a ``ValueError`` if data is not valid JSON
+    """
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], object]):
+        self.name = name
+        self.loads = loads
+
+    def load(self, path: str):
+        """decodes a JSON file"""
+        with open(path, "rb") as f:
+            return self.loads(f.read())
+
+    def __repr__(self):
+        return "JsonBackend(%r)" % self.name
+
+
+def _orjson() -> JsonBackend:
+    import orjson
+
+    return JsonBackend("orjson", orjson.loads)
+
+
+def _simdjson() -> JsonBackend:
+    import simdjson
+
+    return JsonBackend("simdjson", simdjson.loads)
+
+
+def _ujson() -> JsonBackend:
+    import ujson
+
+    return JsonBackend("ujson", ujson.loads)
+
+
+def _stdlib() -> JsonBackend:
+    return JsonBackend("json", json.loads)
+
+
+# in order of preference for "auto"
+BACKENDS = {
+    "orjson": _orjson,
+    "simdjson": _simdjson,
+    "ujson": _ujson,
+    "json": _stdlib,
+}
+
+
+@lru_cache(maxsize=None)
+def _load_backend(name: str) -> JsonBackend:
+    if name == AUTO:
+        for factory in BACKENDS.values():
+            try:
+                return factory()
+            except ImportError:
+                continue
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            "Unknown JSON backend: '%s'. Valid backends are: %s"
+            % (name, (AUTO,) + tuple(BACKENDS))
+        )
+    try:
+        return factory()
+    except ImportError:
+        raise ImportError(
+            "JSON backend '%s' is not installed. Please install it: 'pip install %s'"
+            % (name, "pysimdjson" if name == "simdjson" else name)
+        )
+
+
+def get_json_backend(backend: Union[str, JsonBackend] = None) -> JsonBackend:
+    """returns a :class:`JsonBackend`
+
+    Args:
+        backend (Union[str, JsonBackend], optional): backend name (``"auto"``, ``"orjson"``,
+            ``"simdjson"``, ``"ujson"`` or ``"json"``) or backend (returned as is). Defaults to
+            None (``GAUNIT_JSON_BACKEND`` environment variable, or ``"auto"``).
+
+    Raises:
+        ValueError: if backend is unknown
+        ImportError: if backend is not installed
+    """
+    if isinstance(backend, JsonBackend):
+        return backend
+    if backend is None:
+        backend = os.environ.get(ENV_VAR) or AUTO
+    return _load_backend(backend.lower())
@@ -0,0 +1,609 @@
+"""
+gaunit.matching
+
+This module implements the engines used by :func:`gaunit.TestCase.check` to match expected
+events with actual events.
+
+Ordered checks are strict by default: an actual event satisfies one expected event at most,
+and the next expected event is looked for after it (see :func:`check_ordered`).
+
+Unordered checks are one-to-one: an actual event satisfies one expected event at most, and
+the number of expected events found is maximum (see :func:`check_matching`).
+"""
+from bisect import bisect_left
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .stats import COMPARISONS, Stats
+
+ENGINE_INDEX = "index"
+ENGINE_SCAN = "scan"
+ENGINES = (ENGINE_INDEX, ENGINE_SCAN)
+
+_MISSING = object()
+
+
+class EventIndex(object):
+    """Inverted index over actual events: maps each ``(param, value)`` pair to the sorted
+    positions of the events holding it.
+
+    Built once for a list of events, it is used to find the first event holding all params
+    of an expected event without scanning every event.
+
+    Args:
+        events (List[Mapping]): actual events
+    """
+
+    def __init__(self, events: List[Mapping]):
+        self.events = events
+        postings = {}
+        for position, event in enumerate(events):
+            for item in event.items():
+                try:
+                    postings[item].append(position)
+                except KeyError:
+                    postings[item] = [position]
+        self.postings = postings  # type: Dict[Tuple[str, str], List[int]]
+        self._sets = {}  # type: Dict[Tuple[str, str], set]
+        self.comparisons = 0  # candidate events tested by find()
+
+    def __len__(self):
+        return len(self.events)
+
+    def find(self, expected: Mapping, start: int = 0) -> Optional[int]:
+        """Returns position of first event at or after ``start`` containing all params of
+        ``expected`` (``None`` if there is none).
+
+        Args:
+            expected (Mapping): expected event
+            start (int, optional): first position to look at. Defaults to 0.
+        """
+        if not expected:
+            # empty expected event matches any event
+            self.comparisons += 1
+            return start if start < len(self.events) else None
+        lists = []
+        for item in expected.items():
+            positions = self.postings.get(item)
+            if positions is None:
+                return None  # no event holds this param
+            lists.append(positions)
+        lists.sort(key=len)
+        shortest, others = lists[0], lists[1:]
+        first = bisect_left(shortest, start)
+        for i in range(first, len(shortest)):
+            position = shortest[i]
+            for positions in others:
+                j = bisect_left(positions, position)
+                if j == len(positions) or positions[j] != position:
+                    break
+            else:
+                self.comparisons += i - first + 1
+                return position
+        self.comparisons += len(shortest) - first
+        return None
+
+    def find_all(self, expected: Mapping, limit: int = None) -> List[int]:
+        """Returns positions of events containing all params of ``expected``.
+
+        Args:
+            expected (Mapping): expected event
+            limit (int, optional): maximum number of positions (first ones). Defaults to None.
+        """
+        if limit is None:
+            limit = len(self.events)
+        if not expected:
+            found = list(range(min(limit, len(self.events))))
+            self.comparisons += len(found)
+            return found
+        items = []
+        for item in expected.items():
+            if item not in self.postings:
+                return []
+            items.append(item)
+        items.sort(key=lambda item: len(self.postings[item]))
+        shortest = self.postings[items[0]]
+        self.comparisons += len(shortest)
+        found = shortest
+        for item in items[1:]:
+            s = self._positions_set(item)
+            found = [p for p in found if p in s]
+        return found[:limit]
+
+    def _positions_set(self, item: Tuple[str, str]) -> set:
+        """positions of events holding ``item``, as a set (built once)"""
+        positions = self._sets.get(item)
+        if positions is None:
+            positions = self._sets[item] = set(self.postings[item])
+        return positions
+
+
+def check_index(
+    expected: List[Mapping],
+    actual: List[Mapping],
+    ordered: bool = True,
+    index: EventIndex = None,
+    stats: Stats = None,
+    strict: bool = True,
+) -> Tuple[list, list]:
+    """Compares expected and actual events using an :class:`EventIndex` over actual events.
+
+    Returns the same checklists as :func:`check_scan`. Ordered checks are done by
+    :func:`check_ordered`.
+
+    Args:
+        expected (List[Mapping]): expected events
+        actual (List[Mapping]): actual events
+        ordered (bool, optional): True if hits must respect expected events order.
+            Defaults to True.
+        index (EventIndex, optional): index already built over ``actual``. Defaults to None.
+        stats (:class:`~gaunit.stats.Stats`, optional): record counting comparisons (candidate
+            events tested). Defaults to None.
+        strict (bool, optional): ordered: an actual event satisfies one expected event at
+            most (see :func:`check_ordered`). Defaults to True.
+
+    Returns:
+        Tuple[list, list]: checklist of expected events and checklist of actual events
+    """
+    if index is None:
+        index = EventIndex(actual)
+    if ordered:
+        return check_ordered(expected, actual, index, stats, strict)
+    comparisons = index.comparisons
+    chklst_expected = []
+    chklst_actual = [False] * len(actual)
+    for t in expected:
+        position = index.find(t)
+        chklst_expected.append(position is not None)
+        if position is not None:
+            chklst_actual[position] = True
+    if stats is not None:
+        stats.count(COMPARISONS, index.comparisons - comparisons)
+    return chklst_expected, chklst_actual
+
+
+def check_ordered(
+    expected: List[Mapping],
+    actual: List[Mapping],
+    index: EventIndex = None,
+    stats: Stats = None,
+    strict: bool = True,
+) -> Tuple[list, list]:
+    """Compares expected and actual events in tracking plan order, in a single forward pass.
+
+    Each expected event is found at the first actual event holding all its params after the
+    last event found (missing expected events do not move this cursor). Strict, the event
+    found is consumed: the next expected event is looked for after it. Otherwise (original
+    GAUnit behavior), the next expected event can be satisfied by the same actual event.
+
+    Candidates of an expected event are read from the posting lists of its params in an
+    :class:`EventIndex`, through cursors shared by identical expected events. Cursors only
+    move forward, like the position in actual events: each candidate is tested once whatever
+    the number of expected events, O(actual + expected) instead of a scan of actual events
+    for each expected event.
+
+    Args:
+        expected (List[Mapping]): expected events
+        actual (List[Mapping]): actual events
+        index (EventIndex, optional): index already built over ``actual``. Defaults to None.
+        stats (:class:`~gaunit.stats.Stats`, optional): record counting comparisons (candidate
+            events tested). Defaults to None.
+        strict (bool, optional): an actual event satisfies one expected event at most.
+            Defaults to True.
+
+    Returns:
+        Tuple[list, list]: checklist of expected events and checklist of actual events
+    """
+    if index is None:
+        index = EventIndex(actual)
+    groups = {}  # {expected items: group}
+    lists = []  # posting lists of params of each group, shortest first
+    cursors = []  # position in each posting list of each group
+    chklst_expected = []
+    chklst_actual = [False] * len(actual)
+    step = 1 if strict else 0
+    pos = 0  # first position where next expected event can be found
+    comparisons = 0
+    for t in expected:
+        key = tuple(t.items())
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = len(lists)
+            lists.append(_posting_lists(index, key, len(actual)))
+            cursors.append([0] * len(lists[g]))
+        postings = lists[g]
+        cursor = cursors[g]
+        shortest = postings[0]
+        end = len(shortest)
+        i = first = bisect_left(shortest, pos, cursor[0])
+        while i < end:
+            position = shortest[i]
+            for k in range(1, len(postings)):
+                positions = postings[k]
+                j = cursor[k] = bisect_left(positions, position, cursor[k])
+                if j == len(positions):
+                    end = i  # no event after this one holds this param
+                    break
+                if positions[j] != position:
+                    i += 1
+                    break
+            else:
+                break  # all params found
+        comparisons += i - first + (i < end)
+        if i >= end:
+            cursor[0] = len(shortest)
+            chklst_expected.append(False)
+            continue
+        cursor[0] = i
+        chklst_expected.append(True)
+        chklst_actual[position] = True
+        pos = position + step
+    if stats is not None:
+        stats.count(COMPARISONS, comparisons)
+    return chklst_expected, chklst_actual
+
+
+def _posting_lists(index: EventIndex, items: tuple, size: int) -> list:
+    """posting lists of params of an expected event, shortest first (one empty list when a
+    param is held by no event, all positions when there are no params)"""
+    lists = []
+    for item in items:
+        positions = index.postings.get(item)
+        if positions is None:
+            return [[]]
+        lists.append(positions)
+    if not lists:
+        return [range(size)]
+    lists.sort(key=len)
+    return lists
+
+
+def check_scan(
+    expected: List[Mapping],
+    actual: List[Mapping],
+    ordered: bool = True,
+    stats: Stats = None,
+    strict: bool = True,
+) -> Tuple[list, list]:
+    """Compares expected and actual events by scanning actual events for each expected event.
+
+    This is the original GAUnit engine, kept for comparison purposes.
+
+    Args:
+        expected (List[Mapping]): expected events
+        actual (List[Mapping]): actual events
+        ordered (bool, optional): True if hits must respect expected events order.
+            Defaults to True.
+        stats (:class:`~gaunit.stats.Stats`, optional): record counting comparisons (actual
+            events tested). Defaults to None.
+        strict (bool, optional): ordered: an actual event satisfies one expected event at
+            most (see :func:`check_ordered`). Defaults to True.
+
+    Returns:
+        Tuple[list, list]: checklist of expected events and checklist of actual events
+    """
+    chklst_expected = []
+    chklst_actual = [False] * len(actual)
+    pos = 0  # last checked hit position
+    comparisons = 0
+    for t in expected:
+        check = False
+        for index, hit in enumerate(actual[pos:]):
+            comparisons += 1
+            if t.items() <= hit.items():
+                # expected event found: all params are there
+                check = True
+                chklst_actual[pos + index] = True
+                if ordered:
+                    # update last checked hit position to respect tracking plan order (default)
+                    # strict: this hit is consumed, next expected event is looked for after it
+                    pos += index + 1 if strict else index
+                break
+            # expected event is not here
+        chklst_expected.append(check)
+    if stats is not None:
+        stats.count(COMPARISONS, comparisons)
+    return chklst_expected, chklst_actual
+
+
+def check_matching(
+    expected: List[Mapping],
+    actual: List[Mapping],
+    index: EventIndex = None,
+    stats: Stats = None,
+) -> Tuple[list, list]:
+    """Compares expected and actual events regardless of order, one-to-one.
+
+    Each actual event satisfies one expected event at most (two identical expected events
+    need two actual events) and as many expected events as possible are found: this is a
+    maximum matching of the graph linking each expected event to the actual events holding
+    all its params (candidates are found with an :class:`EventIndex`), computed with the
+    Hopcroft-Karp algorithm. Expected events are first matched to their first free candidate,
+    in tracking plan order.
+
+    Only the first ``len(expected)`` candidates of each expected event are kept: a matching
+    uses fewer actual events, so one of them is always free to replace a dropped candidate.
+    The graph grows with the tracking plan, not with the session.
+
+    Args:
+        expected (List[Mapping]): expected events
+        actual (List[Mapping]): actual events
+        index (EventIndex, optional): index already built over ``actual``. Defaults to None.
+        stats (:class:`~gaunit.stats.Stats`, optional): record counting comparisons (candidate
+            events tested). Defaults to None.
+
+    Returns:
+        Tuple[list, list]: checklist of expected events and checklist of actual events
+    """
+    if index is None:
+        index = EventIndex(actual)
+    comparisons = index.comparisons
+    # identical expected events share their candidates
+    groups = {}  # {expected items: group}
+    group_of = []
+    candidates = []  # candidates of each group
+    for t in expected:
+        key = tuple(t.items())
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = len(candidates)
+            candidates.append(index.find_all(t, len(expected)))
+        group_of.append(g)
+    adjacency = [candidates[g] for g in group_of]
+    match_expected, match_actual = _hopcroft_karp(
+        adjacency, group_of, len(candidates), len(actual)
+    )
+    if stats is not None:
+        stats.count(COMPARISONS, index.comparisons - comparisons)
+    return [m != -1 for m in match_expected], [m != -1 for m in match_actual]
+
+
+def _hopcroft_karp(
+    adjacency: List[List[int]], group_of: List[int], groups: int, right: int
+) -> Tuple[List[int], List[int]]:
+    """maximum matching of a bipartite graph, returns partner of each left vertex and of each
+    right vertex (-1 if unmatched).
+
+    Left vertices of the same group have the same adjacency list: it is scanned once per
+    group during greedy initialization and breadth-first searches.
+    """
+    left = len(adjacency)
+    match_left = [-1] * left
+    match_right = [-1] * right
+
+    # greedy: first free candidate (candidates already taken are never free again)
+    cursors = [0] * groups
+    for u in range(left):
+        g = group_of[u]
+        adj = adjacency[u]
+        i = cursors[g]
+        while i < len(adj) and match_right[adj[i]] != -1:
+            i += 1
+        if i < len(adj):
+            match_left[u] = adj[i]
+            match_right[adj[i]] = u
+            i += 1
+        cursors[g] = i
+
+    infinity = left + 1
+    while True:
+        # breadth-first search: layers of alternating paths from free left vertices
+        dist = [infinity] * left
+        queue = [u for u in range(left) if match_left[u] == -1 and adjacency[u]]
+        for u in queue:
+            dist[u] = 0
+        limit = infinity  # length of shortest augmenting paths
+        scanned = [False] * groups
+        head = 0
+        while head < len(queue):
+            u = queue[head]
+            head += 1
+            g = group_of[u]
+            if dist[u] >= limit or scanned[g]:
+                continue
+            scanned[g] = True  # same neighbors, same or deeper layer
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w == -1:
+                    limit = dist[u] + 1
+                elif dist[w] == infinity:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        if limit == infinity:
+            break
+
+        # depth-first search: vertex-disjoint shortest augmenting paths. A dead end stays
+        # dead for the whole phase, and so do vertices of its group in the same layer
+        cursors = [0] * left
+        dead = set()  # {(group, layer)}
+        augmented = False
+        for root in range(left):
+            if match_left[root] != -1 or dist[root] != 0:
+                continue
+            if (group_of[root], 0) in dead:
+                continue
+            stack = [root]
+            via = []  # right vertex leading to each next vertex of stack
+            while stack:
+                u = stack[-1]
+                layer = dist[u]
+                adj = adjacency[u]
+                pushed = False
+                while cursors[u] < len(adj):
+                    v = adj[cursors[u]]
+                    cursors[u] += 1
+                    w = match_right[v]
+                    if w == -1:
+                        if layer + 1 != limit:
+                            continue
+                        # augment along stack
+                        via.append(v)
+                        for x, y in zip(stack, via):
+                            match_left[x] = y
+                            match_right[y] = x
+                        augmented = True
+                        stack = []
+                        pushed = True
+                        break
+                    if dist[w] == layer + 1 and (group_of[w], layer + 1) not in dead:
+                        via.append(v)
+                        stack.append(w)
+                        pushed = True
+                        break
+                if not pushed:
+                    dead.add((group_of[u], layer))
+                    dist[u] = infinity
+                    stack.pop()
+                    if via:
+                        via.pop()
+        if not augmented:
+            break
+    return match_left, match_right
+
+
+class IncrementalMatcher(object):
+    """Matches actual events against expected events as they arrive, one at a time.
+
+    Ordered, it keeps the same state as :func:`check_ordered`/:func:`check_scan` would have
+    after checking all events fed so far: checklists are always identical to a batch check
+    of these events. Unordered, matches are one-to-one and kept maximum as events arrive
+    (an alternating path is searched from each new event): as many expected events are found
+    as with :func:`check_matching`, which actual events are used may differ when several
+    maximum matchings exist. An index of expected events (by one of their ``(param, value)``
+    pairs) is used so that feeding an event only looks at expected events which may match it.
+
+    Example:
+        >>> m = IncrementalMatcher([{"dp": "A"}, {"dp": "B"}])
+        >>> m.feed({"v": "1", "dp": "A"})
+        >>> m.satisfied
+        False
+        >>> m.feed({"v": "1", "dp": "B"})
+        >>> m.satisfied
+        True
+
+    Args:
+        expected (List[Mapping]): expected events
+        ordered (bool, optional): True if hits must respect expected events order.
+            Defaults to True.
+        strict (bool, optional): ordered: an actual event satisfies one expected event at
+            most (see :func:`check_ordered`). Defaults to True.
+    """
+
+    def __init__(
+        self, expected: List[Mapping], ordered: bool = True, strict: bool = True
+    ):
+        self.expected = expected
+        self.ordered = ordered
+        self.strict = strict
+        self.length = 0  # number of actual events fed
+        # position of matching actual event, for each expected event
+        self.matches = [None] * len(expected)
+        self.missing = len(expected)
+        self._buckets = {}  # {(param, value): [expected positions]}
+        self._always = []  # empty expected events match any event
+        self._candidates = (
+            {}
+        )  # unordered: {actual position: matching expected positions}
+        for j, t in enumerate(expected):
+            if t:
+                item = next(iter(t.items()))
+                self._buckets.setdefault(item, []).append(j)
+            else:
+                self._always.append(j)
+
+    @property
+    def satisfied(self) -> bool:
+        """True when all expected events were found (stays True whatever comes next)"""
+        return self.missing == 0
+
+    def feed(self, event: Mapping):
+        """Checks a new actual event.
+
+        Args:
+            event (Mapping): actual event (params)
+        """
+        position = self.length
+        self.length += 1
+        if not self.missing:
+            return
+        candidates = list(self._always)
+        for item in event.items():
+            candidates.extend(self._buckets.get(item, ()))
+        if not self.ordered:
+            candidates = sorted(
+                j for j in candidates if _is_subset(self.expected[j], event)
+            )
+            if candidates:
+                self._candidates[position] = candidates
+                if self._augment(position):
+                    self.missing -= 1
+            return
+        candidates = sorted(
+            j
+            for j in candidates
+            if self.matches[j] is None and _is_subset(self.expected[j], event)
+        )
+        if not candidates:
+            return
+        # ordered: first missing expected event is found, cursor moves after this event
+        # (strict) or to this event, so following expected events can only match this event
+        first = candidates[0]
+        self.matches[first] = position
+        for k in range(first + 1, len(self.expected)):
+            if not self.strict and _is_subset(self.expected[k], event):
+                self.matches[k] = position
+            else:
+                self.matches[k] = None
+        self.missing = self.matches.count(None)
+
+    def _augment(self, position: int) -> bool:
+        """unordered: finds an alternating path from a new actual event to a missing expected
+        event and swaps matches along it (``False`` if there is none)"""
+        matches = self.matches
+        visited = set()
+        path = [
+            position
+        ]  # actual events, each one matched to next expected event of path
+        through = []  # expected events of path
+        iterators = []
+        while path:
+            v = path[-1]
+            if len(iterators) < len(path):
+                # new actual event on path: a missing expected event ends the path
+                free = next(
+                    (j for j in self._candidates[v] if matches[j] is None), None
+                )
+                if free is not None:
+                    through.append(free)
+                    for w, j in zip(path, through):
+                        matches[j] = w
+                    return True
+                iterators.append(iter(self._candidates[v]))
+            for j in iterators[-1]:
+                if j not in visited:
+                    visited.add(j)
+                    through.append(j)
+                    path.append(matches[j])
+                    break
+            else:
+                path.pop()
+                iterators.pop()
+                if through:
+                    through.pop()
+        return False
+
+    def checklists(self) -> Tuple[list, list]:
+        """Returns checklist of expected events and checklist of actual events fed so far"""
+        chklst_expected = [m is not None for m in self.matches]
+        chklst_actual = [False] * self.length
+        for m in self.matches:
+            if m is not None:
+                chklst_actual[m] = True
+        return chklst_expected, chklst_actual
+
+
+def _is_subset(expected: Mapping, event: Mapping) -> bool:
+    """True if event holds all params of expected event"""
+    for k, v in expected.items():
+        if event.get(k, _MISSING) != v:
+            return False
+    return True
@@ -7,24 +7,60 @@ This module implements main classes used by gaunit: :class:`TrackingPlan,
 from __future__ import annotations
 
 import json
-import pprint
-from typing import List, Tuple
-
-from colorama import Fore, init
-from gspread import Spreadsheet
+import time
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from .cache import (
+    EventCache,
+    extract_har_events,
+    extract_perf_log_events,
+    get_event_cache,
+)
+from .compiled import (
+    compiled_path,
+    is_compiled,
+    read_compiled,
+    source_hash,
+    write_compiled,
+)
+from .diagnostics import NEAREST_MISSES, NearMiss, nearest_misses
+from .events import PROPERTY_PARAM, compact_event, compact_events
 from .exceptions import TestCaseCheckError, TrackingPlanError
+from .gsheet import get_worksheets_records
+from .json_backend import JsonBackend, get_json_backend
+from .matching import (
+    ENGINE_INDEX,
+    ENGINE_SCAN,
+    ENGINES,
+    EventIndex,
+    IncrementalMatcher,
+    check_matching,
+    check_ordered,
+    check_scan,
+)
+from .render import TextRenderer
+from .stats import STAGE_EXTRACT, STAGE_MATCH, Stats
+from .table import EventTable
 from .utils import (
     format_events,
-    get_ga_requests_from_browser_perf_log,
-    get_ga_requests_from_har,
-    get_py_version,
-    load_dict_xor_json,
+    get_ga_url_matcher,
     open_json,
     parse_ga_request,
-    parse_ga_url,
 )
 
+if TYPE_CHECKING:  # gspread is optional and slow to import
+    from gspread import Spreadsheet
+
 
 class TrackingPlan(object):
     """User-defined class object representing a :class:`~gaunit.TrackingPlan`.
@@ -47,18 +83,36 @@ class TrackingPlan(object):
         Raises:
             :exception:`gaunit.TrackingPlanError`: if test case is not found in tracking plan
         """
+        events = self._get_test_case(test_case_id)["events"]
+        return events
+
+    def get_property(self, test_case_id: str) -> Optional[str]:
+        """Get the property targeted by a test case: UA tracking id or GA4 measurement id
+        (``"property"`` of test case in tracking plan). Only events sent to this property
+        (``tid`` param) are checked against the test case.
+
+        Args:
+            test_case_id (str):  test case id
+
+        Raises:
+            :exception:`gaunit.TrackingPlanError`: if test case is not found in tracking plan
+
+        Returns:
+            Optional[str]: property, ``None`` if test case checks events of all properties
+        """
+        return self._get_test_case(test_case_id).get("property")
+
+    def _get_test_case(self, test_case_id: str) -> dict:
         try:
-            tc = self.content[test_case_id]
+            return self.content[test_case_id]
         except KeyError:
             raise TrackingPlanError(
                 "test case not found in tracking plan: '%s'" % test_case_id
             )
-        events = tc["events"]
-        return events
 
     @classmethod
     def from_events(
-        cls, test_case_id: str, expected_events: List[dict]
+        cls, test_case_id: str, expected_events: List[dict], property_id: str = None
     ) -> TrackingPlan:
         """Creates an instance of :class:`~gaunit.TrackingPlan` from a list of expected events
         (only for one test case)
@@ -71,16 +125,18 @@ class TrackingPlan(object):
         Args:
             test_case_id (str): test case id
             expected_events (list[Dict]): expected events for this tests case
+            property_id (str, optional): property targeted by test case (see
+                :func:`TrackingPlan.get_property`). Defaults to None.
 
         Returns:
             :class:`~gaunit.TrackingPlan` instance
         """
         tp = TrackingPlan()
-        tp.add_test_case(test_case_id, expected_events)
+        tp.add_test_case(test_case_id, expected_events, property_id)
         return tp
 
     @classmethod
-    def from_json(cls, path: str) -> TrackingPlan:
+    def from_json(cls, path: str, json_backend: JsonBackend = None) -> TrackingPlan:
         """Creates an instance of :class:`TrackingPlan` from a JSON file
 
         See Documentation for the JSON file format.
@@ -91,6 +147,8 @@ class TrackingPlan(object):
 
         Args:
             path (str): path to JSON file representing the tracking plan
+            json_backend (Union[str, JsonBackend], optional): JSON backend (see
+                :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
 
         Raises:
             :exception:`gaunit.TrackingPlanError`: if tracking plan format is not valid
@@ -99,7 +157,7 @@ class TrackingPlan(object):
             :class:`~gaunit.TrackingPlan` instance.
         """
         tp = TrackingPlan()
-        d = open_json(path)
+        d = open_json(path, json_backend)
         try:
             test_cases = d["test_cases"]
             for tc in test_cases:
@@ -115,11 +173,106 @@ class TrackingPlan(object):
             )
 
     @classmethod
-    def from_spreadsheet(cls, sheet: Spreadsheet) -> TrackingPlan:
+    def load_compiled(
+        cls,
+        path: str,
+        test_cases: List[str] = None,
+        source: str = None,
+        check_stale: bool = True,
+    ) -> TrackingPlan:
+        """Creates an instance of :class:`TrackingPlan` from a compiled tracking plan (see
+        :func:`TrackingPlan.compile`).
+
+        Expected events are stored normalized, as read-only :class:`~gaunit.events.Event`
+        mappings: they are not formatted again and are used as is by
+        :class:`~gaunit.TestCase`. Test cases can be loaded without reading the others.
+
+        Example:
+            >>> from gaunit import TrackingPlan
+            >>> TrackingPlan.compile("tracking_plan.json")  # or `ga plan compile`
+            'tracking_plan.gaplan'
+            >>> tracking_plan = TrackingPlan.load_compiled("tracking_plan.gaplan", ["home"])
+
+        Args:
+            path (str): path to compiled tracking plan
+            test_cases (List[str], optional): test cases to load. Defaults to None (all test
+                cases).
+            source (str, optional): JSON tracking plan to check the compiled one against.
+                Defaults to None (JSON file it was compiled from, if it still exists).
+            check_stale (bool, optional): check that the JSON source did not change since
+                compilation. Defaults to True.
+
+        Raises:
+            :exception:`gaunit.TrackingPlanError`: if file is not a compiled tracking plan
+                (or was compiled by another version of GAUnit) or a test case is not found
+            :exception:`gaunit.StaleTrackingPlanError`: if the JSON source changed since
+                compilation
+
+        Returns:
+            :class:`~gaunit.TrackingPlan` instance.
+        """
+        tp = TrackingPlan()
+        tp.content = read_compiled(path, test_cases, source, check_stale)
+        return tp
+
+    @classmethod
+    def compile(
+        cls, source: str, path: str = None, json_backend: JsonBackend = None
+    ) -> str:
+        """Compiles a JSON tracking plan (see :func:`TrackingPlan.load_compiled`).
+
+        Args:
+            source (str): path to JSON tracking plan
+            path (str, optional): target file. Defaults to None (same path as ``source``
+                with a ``.gaplan`` extension).
+            json_backend (Union[str, JsonBackend], optional): JSON backend (see
+                :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+        Raises:
+            :exception:`gaunit.TrackingPlanError`: if tracking plan format is not valid
+
+        Returns:
+            str: path to compiled tracking plan
+        """
+        path = path or compiled_path(source)
+        content_hash = source_hash(source)  # before reading, in case source changes
+        tp = cls.from_json(source, json_backend)
+        write_compiled(tp.content, path, source, content_hash)
+        return path
+
+    @classmethod
+    def from_file(cls, path: str, test_cases: List[str] = None) -> TrackingPlan:
+        """Creates an instance of :class:`TrackingPlan` from a JSON or a compiled tracking
+        plan (see :func:`TrackingPlan.from_json` and :func:`TrackingPlan.load_compiled`).
+
+        Args:
+            path (str): path to tracking plan
+            test_cases (List[str], optional): test cases to load from a compiled tracking
+                plan. Defaults to None (all test cases).
+
+        Returns:
+            :class:`~gaunit.TrackingPlan` instance.
+        """
+        if is_compiled(path):
+            return cls.load_compiled(path, test_cases)
+        return cls.from_json(path)
+
+    @classmethod
+    def from_spreadsheet(
+        cls,
+        sheet: Spreadsheet,
+        test_cases: List[str] = None,
+        cache: Union[str, EventCache] = None,
+    ) -> TrackingPlan:
         """Creates an instance of :class:`~gaunit.TrackingPlan` from a Google Spreadsheet.
 
         This method uses gspread to connect to Google Sheets and import test cases and
-        expected events. See Documentation for the spreadsheet format.
+        expected events (``pip install gaunit[gsheet]``). See Documentation for the
+        spreadsheet format.
+
+        All worksheets are fetched in one batched request. With a ``cache``, worksheets are
+        stored by spreadsheet revision and not downloaded again until the spreadsheet changes
+        (see :func:`gaunit.gsheet.get_worksheets_records`).
 
         Examples:
             >>> import gspread
@@ -127,19 +280,26 @@ class TrackingPlan(object):
             >>> gc = gspread.service_account()  # authentication
             >>> sh = gc.open("Example spreadsheet")  # open spreadsheet
             >>> tp = TrackingPlan.from_spreadsheet(sh)  # import tracking plan
+            >>> tp = TrackingPlan.from_spreadsheet(sh, ["home"], cache=".gaunit_cache")
 
         Args:
             sheet (gspread.Spreadsheet): gspread instance of the spreadsheet to import
+            test_cases (List[str], optional): titles of worksheets (test cases) to import.
+                Defaults to None (all worksheets).
+            cache (Union[str, EventCache], optional): cache directory (or
+                :class:`~gaunit.cache.EventCache`). Defaults to None.
+
+        Raises:
+            :exception:`gaunit.TrackingPlanError`: if a test case is not found in spreadsheet
 
         Returns:
             :class:`TrackingPlan` instance.
         """
         tp = TrackingPlan()
-        worksheets = sheet.worksheets()
-        for w in worksheets:
-            events = w.get_all_records()
+        records = get_worksheets_records(sheet, test_cases, cache)
+        for title, events in records.items():
             events = format_events(events)
-            tp.add_test_case(w.title, events)
+            tp.add_test_case(title, events)
         return tp
 
     # @classmethod
@@ -168,11 +328,17 @@ class TrackingPlan(object):
             file (str): target file
         """
 
-        tracking_plan = {"test_cases": self.content}
+        test_cases = {
+            i: dict(tc, events=[dict(e) for e in tc["events"]])
+            for i, tc in self.content.items()
+        }
+        tracking_plan = {"test_cases": test_cases}
         with open(file, "w", encoding="utf8") as f:
             json.dump(tracking_plan, f)
 
-    def add_test_case(self, test_case_id: str, expected_events: List[dict]):
+    def add_test_case(
+        self, test_case_id: str, expected_events: List[dict], property_id: str = None
+    ):
         """Add or update expected events for a given test case.
 
         Example:
@@ -181,6 +347,7 @@ class TrackingPlan(object):
             >>> expected_events = [{"t":"pageview","dt":"home"},...]
             >>> tracking_plan = TrackingPlan()
             >>> tracking_plan.add_test_case("my_test_case", expected_events)
+            >>> tracking_plan.add_test_case("my_ga4_test_case", events, "G-XXXXXXXX")
 
 
         See also:
@@ -189,6 +356,8 @@ class TrackingPlan(object):
         Args:
             test_case_id (str): id of the test case
             expected_events (List[dict]): list of expected events for the given test case
+            property_id (str, optional): property targeted by test case (see
+                :func:`TrackingPlan.get_property`). Defaults to None (all properties).
 
         Raises:
             TypeError: if format of ``expected_events`` is not valid.
@@ -196,6 +365,8 @@ class TrackingPlan(object):
         try:
             expected_events = format_events(expected_events)
             d = {test_case_id: {"events": expected_events}}
+            if property_id is not None:
+                d[test_case_id]["property"] = property_id
             self.content.update(d)
         except AttributeError:
             raise TypeError(
@@ -203,9 +374,14 @@ class TrackingPlan(object):
                 % expected_events
             )
 
-    def update_test_case(self, test_case_id: str, expected_events: List[dict]):
-        """Simple alias for :func:`TrackingPlan.add_test_case()`."""
-        self.add_test_case(test_case_id, expected_events)
+    def update_test_case(
+        self, test_case_id: str, expected_events: List[dict], property_id: str = None
+    ):
+        """Simple alias for :func:`TrackingPlan.add_test_case()`, keeping the property
+        targeted by an existing test case unless ``property_id`` is given."""
+        if property_id is None:
+            property_id = self.content.get(test_case_id, {}).get("property")
+        self.add_test_case(test_case_id, expected_events, property_id)
 
 
 class TestCase(object):
@@ -235,11 +411,26 @@ class TestCase(object):
         har_path (str): Path to HAR file for this test case (standard HAR JSON).
             Defaults to None.
         perf_log (list): Browser performance log
-        transport_url (str): custom transport URL for server side GTM.
-            Defaults to 'https://www.google-analytics.com'
+        perf_log_path (str): Path to a browser performance log file (JSONL or JSON).
+            Defaults to None.
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to 'https://www.google-analytics.com'
+        cache (:class:`~gaunit.cache.EventCache`): cache of events extracted from HAR files and
+            Performance Logs (a cache directory can be given to constructor). Defaults to None
+        stats (:class:`~gaunit.stats.Stats`): timings and counters of extraction and checks
+            (reset when events are loaded)
+        json_backend (Union[str, JsonBackend]): JSON backend used to decode HAR files and
+            Performance Logs (see :func:`gaunit.json_backend.get_json_backend`). Defaults to
+            None
+        use_mmap (bool): find GA requests in HAR files with a raw scan and decode them only
+            (see :func:`gaunit.har.get_ga_requests_from_har_mmap`). Defaults to False
         actual_events (list): List of GA events params parsed from HAR or http log
-            Each event is represented by a dict of params (same as `expected_events`).
+            Each event is represented by a read-only mapping of params (same as
+            `expected_events`), see :class:`~gaunit.events.Event`.
             Example: ``[{"t":"pageview","dt":"home"},...]``
+        property_id (str): property targeted by test case (see
+            :func:`TrackingPlan.get_property`): only events sent to this property are kept
+            in :attr:`actual_events`. ``None`` for all events.
     """
 
     def __init__(
@@ -250,6 +441,10 @@ class TestCase(object):
         har_path: str = None,
         perf_log: list = None,
         transport_url: str = "https://www.google-analytics.com",
+        cache: Union[str, EventCache] = None,
+        perf_log_path: str = None,
+        json_backend: Union[str, JsonBackend] = None,
+        use_mmap: bool = False,
     ):
         # Default empty dicts/lists for dict/lists params.
         har = {} if har is None else har
@@ -257,24 +452,35 @@ class TestCase(object):
 
         self.id = id  # test case name
         self.transport_url = transport_url
+        self.cache = get_event_cache(cache)
+        self.json_backend = json_backend
+        self.use_mmap = use_mmap
+        self.stats = Stats()
         if isinstance(tracking_plan, TrackingPlan):
             self.expected_events = tracking_plan.get_expected_events(self.id)
+            self.property_id = tracking_plan.get_property(self.id)
         else:
             raise TypeError(
                 "Invalid tracking plan type: '%s'. Please provide a 'TrackingPlan' instance."
                 % tracking_plan
             )
         self.actual_events = []
+        self._index = None  # EventIndex over actual events, built on first check
+        self._loaded = False  # True when actual events were loaded
+        self._matcher = None  # IncrementalMatcher fed with actual events (see feed())
+        self._fed_events = None  # actual events list the matcher was fed with
 
         self.har = har  # for debug, will be killed soon
+        self.har_path = har_path
         self.perf_log = perf_log
+        self.perf_log_path = perf_log_path
         # self.page_flow = [] # will store urls from pages TODO
         # self.page_flow_ids = [] # will store har ids for pages
         if har or har_path:
             self.load_har(har, har_path)
 
-        if perf_log:
-            self.load_perf_log(perf_log)
+        if perf_log or perf_log_path:
+            self.load_perf_log(perf_log, perf_log_path)
 
     def load_har(
         self,
@@ -286,29 +492,51 @@ class TestCase(object):
         Updates :attr:`actual_events`.
         Takes one and one only argument : dict or path to a json file
 
+        HAR files are read incrementally: only requests sent to GA are kept in memory, so
+        memory usage depends on the number of GA hits, not on the HAR file size. If
+        :attr:`cache` is set, events already extracted from the same HAR file are read from it.
+        If :attr:`use_mmap` is set, HAR files are scanned for GA requests instead.
+
         Args:
             har (dict, optional): [description]. Defaults to None.
             har_path (str, optional): [description]. Defaults to None.
 
+        Raises:
+            :exception:`gaunit.DictXORJsonPathError`: if zero or two arguments are given
         """
 
-        har = load_dict_xor_json(har, har_path)
-        # extract GA events
-        requests = get_ga_requests_from_har(har, self.transport_url)
-        events = []
-        for r in requests:
-            events.extend(parse_ga_request(r))
+        stats = Stats()
+        with stats.stage(STAGE_EXTRACT):
+            events = extract_har_events(
+                har,
+                har_path,
+                self.transport_url,
+                stats,
+                self.json_backend,
+                self.use_mmap,
+                self.cache,
+            )
 
+        self.stats = stats
         self.har = har  # TDO remove attribute
-        self.actual_events = events
+        self.har_path = har_path
+        self.actual_events = self._select_property(events)
+        self._index = None
+        self._loaded = True
 
         # # extract pages (urls and har ids)
         # page_flow = get_pages_from_har(har)
         # page_flow_ids = get_pages_ids_from_har(har)
 
-    def load_perf_log(self, perf_log: list):
+    def load_perf_log(self, perf_log: list = None, perf_log_path: str = None):
         """Extracts and stores analytics events from Performance Log.
 
+        Updates :attr:`actual_events`.
+        Takes one and one only argument : log entries or path to a log file (JSONL, one entry
+        per line, or JSON list of entries). Log files are streamed, whatever their size.
+        Entries are filtered with a substring check before being decoded and each request is
+        counted once (see :func:`gaunit.utils.iter_ga_requests_from_browser_perf_log`).
+
         For more info on Performance Log, see https://chromedriver.chromium.org/logging/performance-log
 
         Warning:
@@ -318,28 +546,218 @@ class TestCase(object):
             :func:`TestCase.load_har` instead.
 
         Args:
-            perf_log (list): log entries from ``driver.get_log("performance")``
+            perf_log (list, optional): log entries from ``driver.get_log("performance")``.
+                Defaults to None.
+            perf_log_path (str, optional): path to a Performance Log file. Defaults to None.
 
+        Raises:
+            :exception:`gaunit.DictXORJsonPathError`: if zero or two arguments are given
         """
         # TODO GA4 check that there are no POST methods, otherwise throw an error or warning
-        urls = get_ga_requests_from_browser_perf_log(perf_log, self.transport_url)
-        events = [parse_ga_url(url) for url in urls]
+        stats = Stats()
+        with stats.stage(STAGE_EXTRACT):
+            events = extract_perf_log_events(
+                perf_log,
+                perf_log_path,
+                self.transport_url,
+                stats,
+                self.json_backend,
+                self.cache,
+            )
 
-        self.perf_log = perf_log
+        self.stats = stats
+        self.perf_log = [] if perf_log is None else perf_log
+        self.perf_log_path = perf_log_path
+        self.actual_events = self._select_property(events)
+        self._index = None
+        self._loaded = True
+
+    def load_events(self, events: list, index: EventIndex = None):
+        """Stores analytics events already extracted from a HAR or a Performance Log.
+
+        Updates :attr:`actual_events`. Useful to check several test cases against the same
+        events without extracting them again (see :func:`gaunit.check_har_all`).
+
+        Events are stored as given: if test case targets a property, only give events sent
+        to it (see :func:`gaunit.events.partition_events`).
+
+        Args:
+            events (list): GA events parameters. Example: ``[{"t":"pageview","dt":"home"},...]``
+            index (:class:`~gaunit.matching.EventIndex`, optional): index already built over
+                ``events``, shared between test cases. Defaults to None.
+        """
         self.actual_events = events
+        self._index = index
+        self._loaded = True
+        self.stats = Stats()
+
+    def feed(self, event_or_request: Union[Mapping, str]) -> int:
+        """Checks a new actual event, or the events of a new GA request, as it arrives.
+
+        Adds events to :attr:`actual_events` and keeps the state of an ordered
+        :func:`TestCase.check()` up to date, so that :attr:`satisfied` is known after each
+        event without checking all events again. :func:`TestCase.result()` is the same as
+        after loading all events at once.
+
+        Example:
+            >>> tc = TestCase("my_test_case", tracking_plan)
+            >>> tc.feed({"t": "pageview", "dt": "home"})  # an event
+            1
+            >>> tc.feed("https://www.google-analytics.com/collect?v=1&t=event&ea=click")  # a URL
+            1
+            >>> tc.feed({"method": "GET", "url": "https://example.com/"})  # not a GA request
+            0
+            >>> tc.satisfied
+            True
+
+        Args:
+            event_or_request (Union[Mapping, str]): event params, request from a HAR file
+                (``{"method": ..., "url": ..., "postData": ...}``) or request URL.
+                Requests not sent to :attr:`transport_url` are ignored, and so are events
+                not sent to :attr:`property_id`.
+
+        Returns:
+            int: number of events added
+        """
+        if isinstance(event_or_request, str):
+            request = {"method": "GET", "url": event_or_request}
+        elif "url" in event_or_request and "method" in event_or_request:
+            request = event_or_request
+        else:
+            request = None
+
+        if request is None:
+            events = [compact_event(event_or_request)]
+        elif get_ga_url_matcher(self.transport_url)(request["url"]):
+            events = compact_events(parse_ga_request(request))
+        else:
+            return 0  # not a GA request
+
+        events = self._select_property(events)
+        matcher = self._get_matcher()
+        for event in events:
+            self.actual_events.append(event)
+            matcher.feed(event)
+        self._index = None
+        self._loaded = True
+        return len(events)
+
+    @property
+    def satisfied(self) -> bool:
+        """``True`` as soon as all expected events were found in actual events (in tracking
+        plan order), see :func:`TestCase.feed()`"""
+        return self._get_matcher().satisfied
+
+    def wait_until_satisfied(
+        self,
+        poll: Callable[[], Iterable[Union[Mapping, str]]],
+        timeout: float = 10.0,
+        interval: float = 0.5,
+    ) -> bool:
+        """Feeds what ``poll()`` returns until the test case is satisfied or time is out.
+
+        Useful to end a Selenium scenario as soon as all expected events were sent, instead of
+        waiting a fixed time.
 
-    def check(self, ordered=True) -> Tuple[list, list]:
+        Example:
+            >>> from gaunit.utils import get_ga_requests_from_browser_perf_log
+            >>> def poll():  # new GA requests since last call
+            ...     return get_ga_requests_from_browser_perf_log(driver.get_log("performance"))
+            >>> driver.find_element_by_id("addToCart").click()
+            >>> tc.wait_until_satisfied(poll, timeout=5)
+            True
+
+        Args:
+            poll (Callable[[], Iterable[Union[Mapping, str]]]): returns new events or requests
+                (see :func:`TestCase.feed()`) on each call
+            timeout (float, optional): maximum time to wait, in seconds. Defaults to 10.0.
+            interval (float, optional): time between two calls to ``poll``, in seconds.
+                Defaults to 0.5.
+
+        Returns:
+            bool: ``True`` if test case is satisfied, ``False`` if time is out
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            for event_or_request in poll():
+                self.feed(event_or_request)
+            if self.satisfied:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+    def _select_property(self, events: list) -> list:
+        """events sent to :attr:`property_id` (all events if it is not set)"""
+        if self.property_id is None:
+            return events
+        return [e for e in events if e.get(PROPERTY_PARAM) == self.property_id]
+
+    def _get_matcher(self) -> IncrementalMatcher:
+        """returns the incremental matcher, fed with current actual events"""
+        if not self._matcher_is_current():
+            # events were loaded (or changed): own a copy, events may be shared
+            self.actual_events = list(self.actual_events)
+            self._fed_events = self.actual_events
+            self._matcher = IncrementalMatcher(self.expected_events)
+            for event in self.actual_events:
+                self._matcher.feed(event)
+        return self._matcher
+
+    def _matcher_is_current(self) -> bool:
+        return (
+            self._matcher is not None
+            and self._fed_events is self.actual_events
+            and self._matcher.length == len(self.actual_events)
+        )
+
+    def events_table(self) -> EventTable:
+        """Returns actual events as a columnar :class:`~gaunit.table.EventTable` (requires NumPy).
+
+        Example:
+            >>> tc = TestCase("my_test_case", tracking_plan, har_path="session.har")
+            >>> table = tc.events_table()
+            >>> table.where(t="event").value_counts("ea")
+            {'add_to_cart': 12, 'view_item': 5}
+
+        Raises:
+            ImportError: if NumPy is not installed
+        """
+        return EventTable.from_events(self.actual_events)
+
+    def check(
+        self, ordered=True, engine=ENGINE_INDEX, strict=True
+    ) -> Tuple[list, list]:
         # TODO make private?
         """Compares events from tracking plan and from log and returns 2 checklists.
 
         Compares :attr:`expected_events` and :attr:`actual_events`, which makes sense!
 
+        By default, an index of actual events params is built once and used to look for each
+        expected event (``engine="index"``). ``engine="scan"`` scans actual events for each
+        expected event instead (original engine, same results but slower on large sessions).
+
+        Ordered checks are strict: an actual event satisfies one expected event at most, the
+        next expected event is looked for after it (see :func:`gaunit.matching.check_ordered`).
+        With ``strict=False``, following expected events can be satisfied by the same actual
+        event (original behavior).
+
+        Unordered checks are one-to-one: an actual event satisfies one expected event at most
+        and as many expected events as possible are found (see
+        :func:`gaunit.matching.check_matching`). ``engine="scan"`` keeps the original
+        unordered check, where an actual event can satisfy several expected events.
+
         Args:
             ordered (bool, optional): True if we want hits to respect tracking plan
                 order (default behavior)
+            engine (str, optional): matching engine, ``"index"`` or ``"scan"``.
+                Defaults to ``"index"``.
+            strict (bool, optional): ordered: an actual event satisfies one expected event
+                at most. Defaults to True.
 
         Raises:
             :exception:`gaunit.TestCaseCheckError`: if no valid HAR or Perf log were provided before check
+            ValueError: if engine is unknown
 
         Returns:
             Tuple[list, list]: 2 checklists; First checklist tells which event in tracking plan is
@@ -348,37 +766,54 @@ class TestCase(object):
         """
 
         # check if everything needed is defined
-        if not self.har and not self.perf_log:
+        if not self._loaded:
             raise TestCaseCheckError(
                 "HAR and Perf log are both missing or empty. Please load one before performing a check"
             )
 
+        if engine not in ENGINES:
+            raise ValueError(
+                "Unknown engine: '%s'. Valid engines are: %s" % (engine, ENGINES)
+            )
+
         # start checking
-        expected = self.expected_events
-        actual = self.actual_events
-        chklst_expected = []
-        chklst_actual = [False] * len(actual)
-        pos = 0  # last checked hit position
-        for t in expected:
-            check = False
-            for index, hit in enumerate(actual[pos:]):
-                if t.items() <= hit.items():
-                    # expected event found: all params are there
-                    check = True
-                    chklst_actual[pos + index] = True
-                    if ordered:
-                        # update last checked hit position to respect tracking plan order (default)
-                        pos += index
-                    break
-                # expected event is not here
-            chklst_expected.append(check)
-
-        return chklst_expected, chklst_actual
-
-    def result(self):
-        """Performs tracking checks and return a :class:`Result` instance"""
-
-        expected, actual = self.check()
+        with self.stats.stage(STAGE_MATCH):
+            if engine == ENGINE_SCAN:
+                return check_scan(
+                    self.expected_events,
+                    self.actual_events,
+                    ordered,
+                    self.stats,
+                    strict,
+                )
+            if ordered and strict and self._matcher_is_current():
+                # events were fed one at a time: checklists are already known
+                return self._matcher.checklists()
+            if self._index is None or self._index.events is not self.actual_events:
+                self._index = EventIndex(self.actual_events)
+            if not ordered:
+                return check_matching(
+                    self.expected_events, self.actual_events, self._index, self.stats
+                )
+            return check_ordered(
+                self.expected_events,
+                self.actual_events,
+                self._index,
+                self.stats,
+                strict,
+            )
+
+    def result(self, ordered=True, strict=True):
+        """Performs tracking checks and return a :class:`Result` instance
+
+        Args:
+            ordered (bool, optional): True if hits must respect tracking plan order (see
+                :func:`TestCase.check`). Defaults to True.
+            strict (bool, optional): ordered: an actual event satisfies one expected event
+                at most. Defaults to True.
+        """
+
+        expected, actual = self.check(ordered, strict=strict)
         r = Result(self, expected, actual)
         return r
 
@@ -398,6 +833,8 @@ class Result(object):
             are missing (``False`` if missing)
         checklist_actual_events (list): Checklist of events found in log which corresponds
                 to an expected event
+        stats (:class:`~gaunit.stats.Stats`): timings and counters of extraction, check and
+            report (see :func:`Stats.print_stats()`)
     """
 
     def __init__(
@@ -407,8 +844,17 @@ class Result(object):
         self.actual_events = test_case.actual_events
         self.checklist_expected_events = checklist_expected
         self.checklist_actual_events = checklist_actual
+        self.stats = test_case.stats
+        self._index = test_case._index
+        self._nearest = {}  # {k: nearest misses}
         # self.comparison = None
 
+    def __getstate__(self):
+        # index over actual events is rebuilt if needed (results sent by batch workers)
+        state = self.__dict__.copy()
+        state["_index"] = None
+        return state
+
     # TODO method to return merged results : comparison of both tracker and hits list
 
     def was_successful(self) -> bool:
@@ -455,7 +901,36 @@ class Result(object):
 
         return [{"event": h, "expected": c} for (h, c) in zip(events, chcklst)]
 
-    def print_result(self, display_ok=False):
+    def nearest_misses(self, k: int = NEAREST_MISSES) -> Dict[int, List[NearMiss]]:
+        """Returns, for each missing expected event, the ``k`` actual events holding most of
+        its params and the params which differ.
+
+        Example:
+            >>> r = gaunit.check_har("my_test_case", tracking_plan, har=har)
+            >>> r.nearest_misses()
+            {2: [NearMiss(position=7, matched=2, diff={'ea': ('add_to_cart', 'add')}), ...]}
+
+        Args:
+            k (int, optional): maximum number of actual events for each missing event.
+                Defaults to 3.
+
+        Returns:
+            Dict[int, List[:class:`~gaunit.diagnostics.NearMiss`]]: nearest misses by position
+            of missing expected event (see :func:`gaunit.diagnostics.nearest_misses`)
+        """
+        if k not in self._nearest:
+            if self._index is None or self._index.events is not self.actual_events:
+                self._index = EventIndex(self.actual_events)
+            self._nearest[k] = {
+                i: nearest_misses(event, self._index, k)
+                for i, (event, check) in enumerate(
+                    zip(self.expected_events, self.checklist_expected_events)
+                )
+                if not check
+            }
+        return self._nearest[k]
+
+    def print_result(self, display_ok=False, nearest=NEAREST_MISSES):
         """Pretty print result of a test.
 
         Two parts: prints the expected events that are missing by defaults or all expected events
@@ -484,99 +959,29 @@ class Result(object):
             GA events found: total:9 / ok:3 / missing:0
             ✔ OK: all expected events found
 
-        Args:
-            display_ok (bool, optional): if set to ``True``, print all expected events, not only
-                missing events. Defaults to ``False``.
-        """
-        self._print_expected_events(all=display_ok)
-        self._print_summary()
+        Missing events are followed by the closest actual events and the params which differ::
 
-    def _print_expected_events(self, all=False):
-        """pretty print list of events from tracking plan
+            {'t': 'event', 'ea': 'add_to_cart'}
+                                                                               ... missing
+                closest event #7: 1/2 params
+                    ea: expected 'add_to_cart', found 'add'
 
-        says which tracker was found in test case  ("OK" or "missing"), used in CLI
+        Statuses are colored when output is a terminal. See :mod:`gaunit.render` for other
+        formats (JSON, NDJSON).
 
         Args:
-            all (bool, optional): if False, print only missing events if True, print all.
-                Defaults to False.
-        """
-        expected = self.expected_events
-        chcklst = self.checklist_expected_events
-        init(autoreset=True)  # colorama
-
-        print("events in tracking plan: %s" % len(expected))
-        args = (
-            {"sort_dicts": False} if get_py_version() >= (3, 8) else {}
-        )  # preserve dict params order when printing (only for Python>=3.8)
-        for event, check in zip(expected, chcklst):
-            if not check:
-                print(80 * "=")
-                pprint.pprint(event, **args)  # pylint: disable=E1123
-                print(67 * " ", " ... " + Fore.RED + "missing")
-            elif check and all:
-                print(80 * "=")
-                pprint.pprint(event, **args)  # pylint: disable=E1123
-                print(72 * " ", " ... " + Fore.GREEN + "OK")
-            else:
-                pass
-
-    def _print_summary(self):
-        """print a result summary
-
-        Example:
-            output:
-
-            | GA events found: total:4 / ok:3 / missing:0
-            | ✔ OK: all expected events found
-
-            or
-
-            | GA events found: total:11 / ok:1 / missing:2
-            | ❌ FAILED: events missing
-            ""
-
+            display_ok (bool, optional): if set to ``True``, print all expected events, not only
+                missing events. Defaults to ``False``.
+            nearest (int, optional): number of closest actual events printed under each
+                missing event, with the params which differ (see :func:`nearest_misses`).
+                Defaults to 3.
         """
-        expected = self.expected_events
-        actual = self.actual_events
-        chcklst = self.checklist_expected_events
-        total_found, expected_found = len(actual), len([c for c in chcklst if c])
-        missing = len(expected) - expected_found
-
-        print(80 * "-")
-        if total_found == 0:
-            print("no GA events found")
-        else:
-            print(
-                "GA events found: total:%s / ok:%s / missing:%s"
-                % (total_found, expected_found, missing)
-            )
-        if False in chcklst:
-            try:
-                print("\N{Cross Mark} FAILED: events missing")
-            except UnicodeEncodeError:
-                print("FAILED: events missing")
-        else:
-            try:
-                print("\N{Heavy Check Mark} OK: all expected events found")
-            except UnicodeEncodeError:
-                print("OK: all expected events found")
+        TextRenderer().result(self, display_ok=display_ok, nearest=nearest)
 
     def print_actual_events(self):
         """pretty print list of analytics hits from test case
 
-        says which analytics hit was in tracking plan ("OK" or "skip"), used in CLI
+        says which analytics hit was in tracking plan ("OK" or "skip"), used in CLI.
+        See :mod:`gaunit.render` for other formats.
         """
-        events = self.actual_events
-        chcklst = self.checklist_actual_events
-
-        init(autoreset=True)  # colorama
-        args = (
-            {"sort_dicts": False} if get_py_version() >= (3, 8) else {}
-        )  # preserve dict params order when printing (only for Python>=3.8)
-        for event, check in zip(events, chcklst):
-            print(80 * "=")
-            pprint.pprint(event, **args)  # pylint: disable=E1123
-            if check:
-                print(72 * " ", " ... " + Fore.GREEN + "OK")
-            else:
-                print(70 * " ", " ... skip")
+        TextRenderer().actual_events(self)
@@ -0,0 +1,119 @@
+"""
+gaunit.perf_log
+
+This module implements the extraction of GA events from browser Performance Logs stored in
+files: JSONL files (one log entry per line) or JSON arrays (``json.dump(driver.get_log(...))``)
+are streamed, so that logs of any size can be checked.
+"""
+from time import perf_counter
+from typing import Iterator
+
+from .events import compact_events
+from .exceptions import DictXORJsonPathError
+from .har import _JsonStream
+from .json_backend import JsonBackend, get_json_backend
+from .stats import (
+    ENTRIES,
+    EVENTS,
+    REQUESTS,
+    STEP_DECODE,
+    STEP_FILTER,
+    STEP_PARSE,
+    Stats,
+)
+from .utils import iter_ga_requests_from_browser_perf_log, parse_ga_url
+
+
+def iter_perf_log_file(
+    perf_log_path: str, json_backend: JsonBackend = None
+) -> Iterator[dict]:
+    """yield Performance Log entries one by one from a file
+
+    Args:
+        perf_log_path (str): path to a JSONL file (one entry per line) or a JSON file (list of
+            entries)
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+    Raises:
+        ValueError: if file is not valid JSONL or JSON
+
+    Yields:
+        dict: log entry, ex: ``{"level": "INFO", "message": "...", "timestamp": ...}``
+    """
+    backend = get_json_backend(json_backend)
+    with open(perf_log_path, "rb") as f:
+        s = _JsonStream(f, json_backend=backend)
+        if s.peek() == b"[":
+            s.expect(b"[")
+            while s.next_item(b"]"):
+                yield s.read_value()
+            return
+        # JSONL: start over, line by line
+        f.seek(0)
+        loads = backend.loads
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def get_events_from_perf_log(
+    perf_log: list = None,
+    perf_log_path: str = None,
+    transport_url: str = "https://www.google-analytics.com",
+    stats: Stats = None,
+    json_backend: JsonBackend = None,
+) -> list:
+    """extract GA events from a Performance Log or a Performance Log file
+
+    Takes one and one only argument: log entries or path to a file (see
+    :func:`iter_perf_log_file`).
+
+    Args:
+        perf_log (list, optional): log entries from ``driver.get_log("performance")``.
+            Defaults to None.
+        perf_log_path (str, optional): path to Performance Log file. Defaults to None.
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        stats (:class:`~gaunit.stats.Stats`, optional): record of timings and counters to
+            update. Messages are decoded while filtering (only those which may be GA
+            requests), so their decoding time is part of ``"filter"``. Defaults to None.
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+
+    Raises:
+        DictXORJsonPathError: if zero or two arguments are given
+
+    Returns:
+        list: list of GA events parameters (compact read-only :class:`~gaunit.events.Event`)
+    """
+    if perf_log and perf_log_path:
+        raise DictXORJsonPathError(
+            "too many arguments (list and json_path). only one argument must be given"
+        )
+    elif perf_log:
+        log = perf_log
+    elif perf_log_path:
+        log = iter_perf_log_file(perf_log_path, json_backend)
+    else:
+        raise DictXORJsonPathError(
+            "arguments given are both empty (list or JSON file path)"
+        )
+    if stats is None:
+        urls = iter_ga_requests_from_browser_perf_log(log, transport_url, json_backend)
+        return compact_events(parse_ga_url(url) for url in urls)
+
+    log = stats.timed(log, STEP_DECODE, ENTRIES)
+    decode_time = stats.timings.get(STEP_DECODE, 0.0)
+    start = perf_counter()
+    urls = list(
+        iter_ga_requests_from_browser_perf_log(log, transport_url, json_backend)
+    )
+    filtered = perf_counter()
+    decode_time = stats.timings.get(STEP_DECODE, 0.0) - decode_time
+    events = compact_events(parse_ga_url(url) for url in urls)
+    stats.add_time(STEP_FILTER, filtered - start - decode_time)
+    stats.add_time(STEP_PARSE, perf_counter() - filtered)
+    stats.count(REQUESTS, len(urls))
+    stats.count(EVENTS, len(events))
+    return events
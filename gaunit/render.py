@@ -0,0 +1,508 @@
+"""
+gaunit.render
+
+This module implements the renderers writing results of checks: ``text`` for humans (see
+:func:`gaunit.Result.print_result`), ``json`` (one document) and ``ndjson`` (one JSON record
+per line) for other tools. Output is buffered and events are written as checklists are read,
+without intermediate lists.
+"""
+import abc
+import json
+import sys
+from typing import Dict, Mapping, TextIO
+
+from .diagnostics import NEAREST_MISSES
+from .stats import STAGE_REPORT
+from .utils import get_py_version
+
+FORMAT_TEXT = "text"
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMATS = (FORMAT_TEXT, FORMAT_JSON, FORMAT_NDJSON)
+
+BUFFER_SIZE = 1 << 16  # characters written to output at once
+
+_colors_enabled = False
+
+
+class Renderer(abc.ABC):
+    """Writes results of checks to a text stream, through a buffer.
+
+    Args:
+        out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+    """
+
+    def __init__(self, out: TextIO = None):
+        self.out = sys.stdout if out is None else out
+        self._parts = []
+        self._size = 0
+
+    def write(self, s: str):
+        """buffered write"""
+        self._parts.append(s)
+        self._size += len(s)
+        if self._size >= BUFFER_SIZE:
+            self._write_buffer()
+
+    def flush(self):
+        """writes buffer to output"""
+        self._write_buffer()
+        self.out.flush()
+
+    def _write_buffer(self):
+        if self._parts:
+            self.out.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+    def result(
+        self,
+        r,
+        test_case_id: str = None,
+        display_ok=False,
+        stats=False,
+        nearest=NEAREST_MISSES,
+    ):
+        """Writes result of a test case.
+
+        Args:
+            r (:class:`~gaunit.Result`): result
+            test_case_id (str, optional): test case id. Defaults to None.
+            display_ok (bool, optional): text: write expected events found, not only
+                missing ones. Defaults to False.
+            stats (bool, optional): write timings and counters. Defaults to False.
+            nearest (int, optional): number of closest actual events written for each
+                missing event (see :func:`gaunit.Result.nearest_misses`). Defaults to 3.
+        """
+        with r.stats.stage(STAGE_REPORT):
+            self._result(r, test_case_id, display_ok, nearest)
+        if stats:
+            self._stats(r.stats, test_case_id)
+        self.flush()
+
+    def results(
+        self,
+        results: Dict[str, object],
+        display_ok=False,
+        stats=False,
+        nearest=NEAREST_MISSES,
+    ):
+        """Writes results of several test cases (see :func:`gaunit.check_har_all`), then a
+        summary.
+
+        Args:
+            results (Dict[str, :class:`~gaunit.Result`]): results by test case id
+            display_ok (bool, optional): text: write expected events found, not only
+                missing ones. Defaults to False.
+            stats (bool, optional): write timings and counters. Defaults to False.
+            nearest (int, optional): number of closest actual events written for each
+                missing event. Defaults to 3.
+        """
+        self._begin_results()
+        for test_case_id, r in results.items():
+            self.result(r, test_case_id, display_ok, stats, nearest)
+        failed = sum(1 for r in results.values() if not r.was_successful())
+        self._end_results(len(results), failed)
+        self.flush()
+
+    def actual_events(self, r, test_case_id: str = None):
+        """Writes actual events of a result, and whether they were expected.
+
+        Args:
+            r (:class:`~gaunit.Result`): result
+            test_case_id (str, optional): test case id. Defaults to None.
+        """
+        with r.stats.stage(STAGE_REPORT):
+            self._actual_events(r, test_case_id)
+            self.flush()
+
+    @abc.abstractmethod
+    def _result(self, r, test_case_id: str, display_ok: bool, nearest: int):
+        """writes result of a test case, with its missing events"""
+
+    @abc.abstractmethod
+    def _stats(self, stats, test_case_id: str):
+        """writes timings and counters of a check"""
+
+    @abc.abstractmethod
+    def _actual_events(self, r, test_case_id: str):
+        """writes actual events of a result, and whether they were expected"""
+
+    def _begin_results(self):
+        pass
+
+    def _end_results(self, total: int, failed: int):
+        pass
+
+
+class TextRenderer(Renderer):
+    """Human readable results, same as :func:`gaunit.Result.print_result`.
+
+    Args:
+        out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+        color (bool, optional): color statuses. Defaults to None (only if output is a
+            terminal).
+    """
+
+    width = 80
+
+    def __init__(self, out: TextIO = None, color: bool = None):
+        super().__init__(out)
+        if color is None:
+            isatty = getattr(self.out, "isatty", None)
+            color = bool(isatty and isatty())
+        self.color = color
+        if color:
+            _enable_colors()
+        # preserve dict params order when printing (only for Python>=3.8)
+        self._sort_dicts = get_py_version() < (3, 8)
+
+    def _result(self, r, test_case_id: str, display_ok: bool, nearest: int):
+        if test_case_id is not None:
+            self.write("test case: %s\n" % test_case_id)
+        self._expected_events(r, display_ok, nearest)
+        self._summary(r)
+
+    def _expected_events(self, r, display_ok: bool, nearest: int):
+        """expected events (only missing ones unless ``display_ok``) and their status"""
+        self.write("events in tracking plan: %s\n" % len(r.expected_events))
+        separator = 80 * "=" + "\n"
+        missing = 67 * " " + "  ... " + self._red("missing") + "\n"
+        ok = 72 * " " + "  ... " + self._green("OK") + "\n"
+        misses = r.nearest_misses(nearest) if nearest > 0 else {}
+        for i, (event, check) in enumerate(
+            zip(r.expected_events, r.checklist_expected_events)
+        ):
+            if not check:
+                self.write(separator + self.format_event(event) + "\n" + missing)
+                for miss in misses.get(i, ()):
+                    self._near_miss(miss, len(event))
+            elif display_ok:
+                self.write(separator + self.format_event(event) + "\n" + ok)
+
+    def _summary(self, r):
+        chcklst = r.checklist_expected_events
+        total_found = len(r.actual_events)
+        expected_found = sum(1 for c in chcklst if c)
+        missing = len(r.expected_events) - expected_found
+
+        self.write(80 * "-" + "\n")
+        if total_found == 0:
+            self.write("no GA events found\n")
+        else:
+            self.write(
+                "GA events found: total:%s / ok:%s / missing:%s\n"
+                % (total_found, expected_found, missing)
+            )
+        if missing:
+            self.write(self._symbol("\N{CROSS MARK} ") + "FAILED: events missing\n")
+        else:
+            self.write(
+                self._symbol("\N{HEAVY CHECK MARK} ")
+                + "OK: all expected events found\n"
+            )
+
+    def _near_miss(self, miss, params: int):
+        """closest actual event and the params which differ"""
+        self.write(
+            "    closest event #%s: %s/%s params%s\n"
+            % (
+                miss.position,
+                miss.matched,
+                params,
+                "" if miss.diff else " (out of order or already found)",
+            )
+        )
+        for param, (expected, actual) in miss.diff.items():
+            found = "not found" if actual is None else "found %r" % (actual,)
+            self.write("        %s: expected %r, %s\n" % (param, expected, found))
+
+    def _stats(self, stats, test_case_id: str):
+        self.write(stats.format_stats())
+
+    def _actual_events(self, r, test_case_id: str):
+        separator = 80 * "=" + "\n"
+        ok = 72 * " " + "  ... " + self._green("OK") + "\n"
+        skip = 70 * " " + "  ... skip\n"
+        for event, check in zip(r.actual_events, r.checklist_actual_events):
+            self.write(
+                separator + self.format_event(event) + "\n" + (ok if check else skip)
+            )
+
+    def _end_results(self, total: int, failed: int):
+        self.write(80 * "=" + "\n")
+        self.write("test cases: %s / failed: %s\n" % (total, failed))
+
+    def status(
+        self, test_case_id: str, expected_events: list, checklist: list, total: int
+    ):
+        """Writes the status of a test case being checked (see ``ga watch``): one line per
+        expected event (cut to output width), then counters.
+
+        Args:
+            test_case_id (str): test case id
+            expected_events (list): expected events
+            checklist (list): checklist of expected events (``False`` if missing)
+            total (int): number of actual events checked so far
+        """
+        found = sum(1 for c in checklist if c)
+        self.write("test case: %s\n" % test_case_id)
+        for event, check in zip(expected_events, checklist):
+            rep = repr(dict(event))
+            if len(rep) > self.width - 10:
+                rep = rep[: self.width - 13] + "..."
+            mark = self._green("OK     ") if check else self._red("missing")
+            self.write("  %s %s\n" % (mark, rep))
+        self.write(
+            "GA events found: total:%s / ok:%s / missing:%s\n"
+            % (total, found, len(checklist) - found)
+        )
+        self.flush()
+
+    def format_event(self, event: Mapping) -> str:
+        """event as pretty printed by ``pprint`` (without importing it for short events)"""
+        d = dict(event)
+        if not self._sort_dicts:
+            rep = repr(d)
+            if len(rep) <= self.width:
+                return rep  # same as pprint: fits on one line
+        import pprint
+
+        if self._sort_dicts:
+            return pprint.pformat(d, width=self.width)
+        return pprint.pformat(d, width=self.width, sort_dicts=False)
+
+    def _symbol(self, symbol: str) -> str:
+        """symbol, or nothing if output encoding cannot write it"""
+        encoding = getattr(self.out, "encoding", None) or "utf8"
+        try:
+            symbol.encode(encoding)
+        except (UnicodeEncodeError, LookupError):
+            return ""
+        return symbol
+
+    def _red(self, s: str) -> str:
+        return "\x1b[31m%s\x1b[0m" % s if self.color else s
+
+    def _green(self, s: str) -> str:
+        return "\x1b[32m%s\x1b[0m" % s if self.color else s
+
+
+class JsonRenderer(Renderer):
+    """One JSON document: a test case record, or ``{"test_cases": [...], "total": n,
+    "failed": n}`` for several test cases.
+
+    Record of a test case::
+
+        {"test_case": "home", "successful": false, "total": 9, "ok": 2, "missing": 1,
+         "expected_events": [{"event": {"t": "pageview", "dp": "home"}, "found": true}, ...],
+         "actual_events": [{"event": {...}, "expected": true}, ...]}
+
+    Missing expected events have a ``"nearest"`` list of the closest actual events::
+
+        {"event": {"t": "event", "ea": "add_to_cart"}, "found": false, "nearest": [
+            {"position": 7, "event": {...}, "matched": 1,
+             "diff": {"ea": {"expected": "add_to_cart", "actual": "add"}}}]}
+
+    Args:
+        out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+    """
+
+    def __init__(self, out: TextIO = None):
+        super().__init__(out)
+        # standard json module: same output whatever JSON backends are installed
+        self.dumps = json.dumps
+        self._records = None  # number of records written in a list of test cases
+
+    def result(
+        self,
+        r,
+        test_case_id: str = None,
+        display_ok=False,
+        stats=False,
+        nearest=NEAREST_MISSES,
+    ):
+        if self._records is not None:
+            self.write(",\n" if self._records else "\n")
+            self._records += 1
+        with r.stats.stage(STAGE_REPORT):
+            self._result(r, test_case_id, display_ok, nearest)
+        if stats:
+            self._stats(r.stats, test_case_id)
+        self.write("}" if self._records is not None else "}\n")
+        self.flush()
+
+    def _result(self, r, test_case_id: str, display_ok: bool, nearest: int):
+        dumps = self.dumps
+        self.write("{")
+        if test_case_id is not None:
+            self.write('"test_case": %s, ' % dumps(test_case_id))
+        self.write('"successful": %s, ' % dumps(r.was_successful()))
+        self.write(_counts(r))
+        self.write(', "expected_events": [')
+        misses = r.nearest_misses(nearest) if nearest > 0 else {}
+        for i, (event, check) in enumerate(
+            zip(r.expected_events, r.checklist_expected_events)
+        ):
+            self.write(
+                '%s{"event": %s, "found": %s%s}'
+                % (
+                    ", " if i else "",
+                    dumps(dict(event)),
+                    dumps(check),
+                    self._nearest(misses, i),
+                )
+            )
+        self.write('], "actual_events": [')
+        self._write_actual_events(r)
+        self.write("]")
+
+    def _nearest(self, misses: dict, i: int) -> str:
+        """``"nearest"`` member of a missing expected event"""
+        if i not in misses:
+            return ""
+        return ', "nearest": %s' % self.dumps([m.as_dict() for m in misses[i]])
+
+    def _write_actual_events(self, r):
+        dumps = self.dumps
+        first = True
+        for event, check in zip(r.actual_events, r.checklist_actual_events):
+            self.write(
+                '%s{"event": %s, "expected": %s}'
+                % ("" if first else ", ", dumps(dict(event)), dumps(check))
+            )
+            first = False
+
+    def _stats(self, stats, test_case_id: str):
+        self.write(', "stats": %s' % self.dumps(stats.as_dict()))
+
+    def _actual_events(self, r, test_case_id: str):
+        self.write("[")
+        self._write_actual_events(r)
+        self.write("]\n")
+
+    def _begin_results(self):
+        self.write('{"test_cases": [')
+        self._records = 0
+
+    def _end_results(self, total: int, failed: int):
+        self._records = None
+        self.write('\n], "total": %s, "failed": %s}\n' % (total, failed))
+
+
+class NdjsonRenderer(JsonRenderer):
+    """One JSON record per line, with a ``type``:
+
+    - ``expected_event``: ``{"type": "expected_event", "test_case": "home", "event": {...},
+      "found": true}`` (and ``"nearest"`` if missing, see :class:`JsonRenderer`)
+    - ``actual_event``: ``{"type": "actual_event", "test_case": "home", "event": {...},
+      "expected": true}``
+    - ``result``: ``{"type": "result", "test_case": "home", "successful": true, "total": 9,
+      "ok": 3, "missing": 0}`` (and ``"stats"``), after events of a test case
+    - ``summary``: ``{"type": "summary", "total": 2, "failed": 1}``, after all test cases
+
+    Args:
+        out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+    """
+
+    def result(
+        self,
+        r,
+        test_case_id: str = None,
+        display_ok=False,
+        stats=False,
+        nearest=NEAREST_MISSES,
+    ):
+        with r.stats.stage(STAGE_REPORT):
+            self._result(r, test_case_id, display_ok, nearest)
+        if stats:
+            self._stats(r.stats, test_case_id)
+        self.write("}\n")
+        self.flush()
+
+    def _result(self, r, test_case_id: str, display_ok: bool, nearest: int):
+        dumps = self.dumps
+        prefix = '{"type": "expected_event", '
+        if test_case_id is not None:
+            prefix += '"test_case": %s, ' % dumps(test_case_id)
+        misses = r.nearest_misses(nearest) if nearest > 0 else {}
+        for i, (event, check) in enumerate(
+            zip(r.expected_events, r.checklist_expected_events)
+        ):
+            self.write(
+                '%s"event": %s, "found": %s%s}\n'
+                % (prefix, dumps(dict(event)), dumps(check), self._nearest(misses, i))
+            )
+        self._actual_events(r, test_case_id)
+        self.write('{"type": "result", ')
+        if test_case_id is not None:
+            self.write('"test_case": %s, ' % dumps(test_case_id))
+        self.write('"successful": %s, ' % dumps(r.was_successful()))
+        self.write(_counts(r))
+
+    def _actual_events(self, r, test_case_id: str):
+        dumps = self.dumps
+        prefix = '{"type": "actual_event", '
+        if test_case_id is not None:
+            prefix += '"test_case": %s, ' % dumps(test_case_id)
+        for event, check in zip(r.actual_events, r.checklist_actual_events):
+            self.write(
+                '%s"event": %s, "expected": %s}\n'
+                % (prefix, dumps(dict(event)), dumps(check))
+            )
+
+    def _begin_results(self):
+        pass
+
+    def _end_results(self, total: int, failed: int):
+        self.write('{"type": "summary", "total": %s, "failed": %s}\n' % (total, failed))
+
+
+def get_renderer(format: str = FORMAT_TEXT, out: TextIO = None) -> Renderer:
+    """returns a renderer for a format
+
+    Example:
+        >>> from gaunit.render import get_renderer
+        >>> r = gaunit.check_har("my_test_case", tracking_plan, har_path="session.har")
+        >>> get_renderer("ndjson").result(r, "my_test_case")
+        {"type": "expected_event", "test_case": "my_test_case", "event": {...}, "found": true}
+        ...
+
+    Args:
+        format (str, optional): ``"text"``, ``"json"`` or ``"ndjson"``. Defaults to "text".
+        out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+
+    Raises:
+        ValueError: if format is unknown
+    """
+    renderers = {
+        FORMAT_TEXT: TextRenderer,
+        FORMAT_JSON: JsonRenderer,
+        FORMAT_NDJSON: NdjsonRenderer,
+    }
+    if format not in renderers:
+        raise ValueError(
+            "Unknown format: '%s'. Valid formats are: %s" % (format, FORMATS)
+        )
+    return renderers[format](out)
+
+
+def _counts(r) -> str:
+    """counts of a result, as JSON members"""
+    total = len(r.actual_events)
+    ok = sum(1 for c in r.checklist_expected_events if c)
+    missing = len(r.checklist_expected_events) - ok
+    return '"total": %s, "ok": %s, "missing": %s' % (total, ok, missing)
+
+
+def _enable_colors():
+    """ANSI colors on Windows consoles (once)"""
+    global _colors_enabled
+    if _colors_enabled:
+        return
+    _colors_enabled = True
+    if sys.platform == "win32":
+        import colorama
+
+        # colorama < 0.4.6 has no just_fix_windows_console()
+        getattr(colorama, "just_fix_windows_console", colorama.init)()
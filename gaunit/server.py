@@ -0,0 +1,307 @@
+"""
+gaunit.server
+
+This module implements a local GA collect endpoint: an asyncio HTTP server receiving GA hits
+(``/collect``, ``/j/collect``, ``/g/collect`` and ``/batch``, under any path prefix) and
+checking them against a :class:`~gaunit.TrackingPlan` as they arrive.
+
+Point ``transport_url`` (or server side GTM) to this server, browse, and get the status of each
+test case from ``GET /_gaunit/status``.
+"""
+import asyncio
+import json
+from typing import List
+from urllib.parse import urlsplit
+
+from .events import PROPERTY_PARAM, compact_events
+from .matching import IncrementalMatcher
+from .models import TrackingPlan
+from .utils import parse_ga_request
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+HIT_ENDPOINTS = ("/collect", "/j/collect", "/g/collect")
+BATCH_ENDPOINT = "/batch"
+
+# 1x1 transparent GIF, as returned by GA
+_GIF = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\x00\x00\x00!\xf9\x04\x01\x00\x00"
+    b"\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+_REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    414: "URI Too Long",
+    431: "Request Header Fields Too Large",
+}
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+class CollectServer(object):
+    """Local GA collect endpoint checking hits against a tracking plan as they arrive.
+
+    Hits are parsed with :func:`gaunit.utils.parse_ga_request` and fed to one
+    :class:`~gaunit.matching.IncrementalMatcher` per test case, so checking a hit only costs a
+    few lookups whatever the number of hits received before.
+
+    Local API:
+
+    - ``GET /_gaunit/status``: status of each test case (JSON)
+    - ``GET /_gaunit/events``: events received (JSON)
+    - ``POST /_gaunit/reset``: forget events received (new test session)
+
+    Example:
+        >>> from gaunit import TrackingPlan
+        >>> from gaunit.server import CollectServer
+        >>> tp = TrackingPlan.from_json("tracking_plan.json")
+        >>> CollectServer(tp, port=8080).run()  # until interrupted
+
+    Args:
+        tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events
+        test_case_ids (List[str], optional): test cases to check. Defaults to None (all test
+            cases in tracking plan).
+        host (str, optional): listening address. Defaults to "127.0.0.1".
+        port (int, optional): listening port (0 for any free port). Defaults to 8080.
+        ordered (bool, optional): True if hits must respect tracking plan order.
+            Defaults to True.
+        verbose (bool, optional): print test cases when they are satisfied. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        tracking_plan: TrackingPlan,
+        test_case_ids: List[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        ordered: bool = True,
+        verbose: bool = False,
+    ):
+        if test_case_ids is None:
+            test_case_ids = list(tracking_plan.content)
+        self.tracking_plan = tracking_plan
+        self.test_case_ids = test_case_ids
+        self.host = host
+        self.port = port
+        self.ordered = ordered
+        self.verbose = verbose
+        # property targeted by each test case: events sent to other ones are not fed
+        self.properties = {i: tracking_plan.get_property(i) for i in test_case_ids}
+        self.reset()
+
+    def reset(self):
+        """Forgets all events received and starts checking from scratch"""
+        self.hits = 0  # number of requests received
+        self.events = []
+        self.matchers = {
+            i: IncrementalMatcher(
+                self.tracking_plan.get_expected_events(i), self.ordered
+            )
+            for i in self.test_case_ids
+        }
+
+    def handle_hit(self, method: str, target: str, body: str = "") -> int:
+        """Parses a GA request and checks its events against test cases.
+
+        Args:
+            method (str): HTTP method (``"GET"`` or ``"POST"``)
+            target (str): request target (path and query string)
+            body (str, optional): request body. Defaults to "".
+
+        Returns:
+            int: number of events found in request
+        """
+        path = urlsplit(target).path
+        url = "http://gaunit" + target
+        if path.endswith(BATCH_ENDPOINT):
+            # UA batch: one hit payload per line
+            requests = [
+                {"method": "POST", "url": url, "postData": {"text": line}}
+                for line in body.split("\n")
+                if line
+            ]
+        elif method == "POST" and body:
+            requests = [{"method": "POST", "url": url, "postData": {"text": body}}]
+        else:
+            requests = [{"method": "GET", "url": url}]
+
+        self.hits += 1
+        count = 0
+        for r in requests:
+            for event in compact_events(parse_ga_request(r)):
+                self.events.append(event)
+                count += 1
+                for test_case_id, m in self.matchers.items():
+                    property_id = self.properties[test_case_id]
+                    if (
+                        property_id is not None
+                        and event.get(PROPERTY_PARAM) != property_id
+                    ):
+                        continue  # sent to another property
+                    satisfied = m.satisfied
+                    m.feed(event)
+                    if self.verbose and m.satisfied and not satisfied:
+                        print("test case satisfied: %s" % test_case_id)
+        return count
+
+    def status(self) -> dict:
+        """Returns status of each test case
+
+        Example:
+            >>> server.status()
+            {'hits': 4, 'events': 5, 'test_cases': {'home': {'satisfied': True, 'found': 3,
+            'expected': 3, 'checklist': [True, True, True]}}}
+        """
+        test_cases = {}
+        for test_case_id, m in self.matchers.items():
+            chklst_expected, _ = m.checklists()
+            test_cases[test_case_id] = {
+                "satisfied": m.satisfied,
+                "found": len(chklst_expected) - m.missing,
+                "expected": len(chklst_expected),
+                "checklist": chklst_expected,
+            }
+        return {"hits": self.hits, "events": len(self.events), "test_cases": test_cases}
+
+    def _route(self, method: str, target: str, body: str):
+        """returns status, content type and body of response"""
+        path = urlsplit(target).path
+        if path == "/_gaunit/status":
+            return 200, "application/json", json.dumps(self.status()).encode("utf8")
+        if path == "/_gaunit/events":
+            events = [dict(e) for e in self.events]
+            return 200, "application/json", json.dumps(events).encode("utf8")
+        if path == "/_gaunit/reset":
+            if method != "POST":
+                return 405, "text/plain", b""
+            self.reset()
+            return 204, "text/plain", b""
+        if path.endswith(HIT_ENDPOINTS) or path.endswith(BATCH_ENDPOINT):
+            if method not in ("GET", "POST"):
+                return 405, "text/plain", b""
+            try:
+                self.handle_hit(method, target, body)
+            except ValueError:
+                return 400, "text/plain", b""  # malformed payload
+            if method == "GET":
+                return 200, "image/gif", _GIF
+            return 204, "text/plain", b""
+        return 404, "text/plain", b""
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """returns method, target, headers and body of next request (None if connection is
+        closed)"""
+        line = await self._readline(reader, 414)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise _BadRequest(400)
+        headers = {}
+        while True:
+            line = await self._readline(reader, 431)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _BadRequest(400)
+        if length > MAX_BODY_SIZE:
+            raise _BadRequest(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, target, version, headers, body.decode("utf8", "replace")
+
+    async def _readline(self, reader: asyncio.StreamReader, status: int) -> bytes:
+        """reads a line, answered with ``status`` if it is longer than the stream limit"""
+        try:
+            return await reader.readline()
+        except ValueError:  # asyncio.LimitOverrunError
+            raise _BadRequest(status)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _BadRequest as e:
+                    self._write_response(writer, e.status, "text/plain", b"", False)
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = (
+                    connection == "keep-alive"
+                    if version == "HTTP/1.0"
+                    else connection != "close"
+                )
+                status, content_type, content = self._route(method, target, body)
+                self._write_response(writer, status, content_type, content, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        content_type: str,
+        content: bytes,
+        keep_alive: bool,
+    ):
+        head = (
+            "HTTP/1.1 %s %s\r\n"
+            "Content-Type: %s\r\n"
+            "Content-Length: %s\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Cache-Control: no-cache, no-store, must-revalidate\r\n"
+            "Connection: %s\r\n"
+            "\r\n"
+            % (
+                status,
+                _REASONS.get(status, ""),
+                content_type,
+                len(content),
+                "keep-alive" if keep_alive else "close",
+            )
+        )
+        writer.write(head.encode("latin-1") + content)
+
+    async def start(self) -> asyncio.AbstractServer:
+        """Starts listening (within a running event loop) and returns the asyncio server"""
+        server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def serve_forever(self):
+        """Starts listening and serves until cancelled"""
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """Runs server until interrupted (Ctrl+C)"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,178 @@
+"""
+gaunit.stats
+
+This module implements :class:`Stats`, a lightweight record of what a check did (entries
+scanned, GA requests kept, events produced, comparisons made) and of the wall time spent in
+each stage, and a registry of hooks to attach profilers or tracers around stages.
+"""
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+from typing import Callable, ContextManager, Dict, Iterable, Iterator
+
+# stages, with hooks called around them
+STAGE_EXTRACT = "extract"  # HAR or Performance Log to events (decode, filter and parse)
+STAGE_MATCH = "match"  # expected events against actual events
+STAGE_REPORT = "report"  # printing results
+STAGES = (STAGE_EXTRACT, STAGE_MATCH, STAGE_REPORT)
+
+# steps of extract stage, only timed
+STEP_CACHE = "cache"  # hashing captures, reading and storing events in an EventCache
+STEP_DECODE = "decode"  # JSON decoding of HAR entries or log lines
+STEP_FILTER = "filter"  # keeping GA requests only
+STEP_PARSE = "parse"  # GA requests to events params
+
+# counters
+ENTRIES = "entries"  # HAR entries or Performance Log entries scanned
+REQUESTS = "requests"  # GA requests kept
+EVENTS = "events"  # events produced
+COMPARISONS = "comparisons"  # expected events compared with actual events
+CACHE_HITS = "cache_hits"  # captures whose events were read from an EventCache
+CACHE_MISSES = "cache_misses"  # captures extracted and stored in an EventCache
+COUNTERS = (ENTRIES, REQUESTS, EVENTS, COMPARISONS, CACHE_HITS, CACHE_MISSES)
+
+_hooks = []  # type: list
+
+
+def register_hook(factory: Callable[[str, "Stats"], ContextManager]) -> Callable:
+    """Registers a hook called around each stage (``"extract"``, ``"match"`` and
+    ``"report"``) of every check.
+
+    A hook is a factory taking the stage name and the :class:`Stats` record, and returning
+    a context manager entered when stage starts and exited when stage ends. Can be used as a
+    decorator.
+
+    Example:
+        >>> import cProfile
+        >>> from contextlib import contextmanager
+        >>> import gaunit.stats
+        >>> @gaunit.stats.register_hook
+        ... @contextmanager
+        ... def profile(stage, stats):
+        ...     profiler = cProfile.Profile()
+        ...     profiler.enable()
+        ...     yield
+        ...     profiler.disable()
+        ...     profiler.dump_stats("%s.prof" % stage)
+
+    Args:
+        factory (Callable[[str, Stats], ContextManager]): context manager factory
+
+    Returns:
+        Callable: ``factory``, unchanged
+    """
+    _hooks.append(factory)
+    return factory
+
+
+def unregister_hook(factory: Callable[[str, "Stats"], ContextManager]):
+    """Removes a hook registered with :func:`register_hook`"""
+    _hooks.remove(factory)
+
+
+class Stats(object):
+    """Counters and wall time (in seconds) per stage of a check.
+
+    Available as :attr:`gaunit.Result.stats` (and ``ga check --stats``).
+
+    Example:
+        >>> r = gaunit.check_har("my_test_case", tracking_plan, har_path="session.har")
+        >>> r.stats.counters
+        {'entries': 120, 'requests': 9, 'events': 9, 'comparisons': 14}
+        >>> r.stats.timings
+        {'decode': 0.0113, 'filter': 0.0002, 'parse': 0.0004, 'extract': 0.0121, 'match': 5e-05}
+    """
+
+    def __init__(self):
+        self.timings = {}  # type: Dict[str, float]
+        self.counters = {}  # type: Dict[str, int]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator["Stats"]:
+        """times a stage, with registered hooks called around it"""
+        with ExitStack() as stack:
+            for factory in list(_hooks):
+                stack.enter_context(factory(name, self))
+            start = perf_counter()
+            try:
+                yield self
+            finally:
+                self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed(self, iterable: Iterable, name: str, counter: str = None) -> Iterator:
+        """yields items of ``iterable``, adding time spent getting them to timing ``name``
+        (and counting them in ``counter``)"""
+        it = iter(iterable)
+        timings = self.timings
+        n = 0
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    timings[name] = timings.get(name, 0.0) + perf_counter() - start
+                n += 1
+                yield item
+        finally:
+            if counter is not None:
+                self.count(counter, n)
+
+    def update(self, other: "Stats"):
+        """adds timings and counters of another record"""
+        for name, seconds in other.timings.items():
+            self.add_time(name, seconds)
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def as_dict(self) -> dict:
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def print_stats(self):
+        """pretty print timings and counters
+
+        Example:
+            output:
+
+            | stats:
+            |   extract          12.1 ms
+            |     decode         11.3 ms
+            |     filter          0.2 ms
+            |     parse           0.4 ms
+            |   match             0.1 ms
+            |   report            0.8 ms
+            |   entries: 120 / requests: 9 / events: 9 / comparisons: 14
+        """
+        print(self.format_stats(), end="")
+
+    def format_stats(self) -> str:
+        """timings and counters, as printed by :func:`Stats.print_stats`"""
+        lines = ["stats:"]
+        steps = (STEP_CACHE, STEP_DECODE, STEP_FILTER, STEP_PARSE)
+        names = [n for n in STAGES if n in self.timings]
+        names += [n for n in self.timings if n not in STAGES and n not in steps]
+        for name in names:
+            lines.append("  %-14s %8.1f ms" % (name, self.timings[name] * 1000))
+            if name == STAGE_EXTRACT:
+                for step in steps:
+                    if step in self.timings:
+                        lines.append(
+                            "    %-12s %8.1f ms" % (step, self.timings[step] * 1000)
+                        )
+        if self.counters:
+            counters = [n for n in COUNTERS if n in self.counters]
+            counters += [n for n in self.counters if n not in COUNTERS]
+            lines.append(
+                "  " + " / ".join("%s: %s" % (n, self.counters[n]) for n in counters)
+            )
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self):
+        return "Stats(timings=%r, counters=%r)" % (self.timings, self.counters)
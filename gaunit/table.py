@@ -0,0 +1,164 @@
+"""
+gaunit.table
+
+This module implements :class:`EventTable`, a columnar representation of GA events backed by
+NumPy: one dictionary-encoded column per parameter. Filtering, projection and counts run as
+vectorized operations across all hits.
+
+NumPy is an optional dependency: ``pip install gaunit[table]``.
+"""
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "NumPy is required for event tables. Please install it: 'pip install gaunit[table]'"
+        )
+    return numpy
+
+
+class EventTable(object):
+    """Columnar table of GA events.
+
+    Each parameter is a dictionary-encoded column: an array of codes (``-1`` when the param
+    is absent from a hit) and the list of distinct values (categories).
+
+    Example:
+        >>> from gaunit.table import EventTable
+        >>> table = EventTable.from_events(events)
+        >>> table.value_counts("t")
+        {'event': 6, 'pageview': 3}
+        >>> pageviews = table.where(t="pageview").select(["dt"])
+        >>> pageviews.to_events()
+        [{'dt': 'Home'}, {'dt': 'Product View'}, {'dt': 'Cart'}]
+
+    Args:
+        columns (Dict[str, Tuple[numpy.ndarray, list]]): codes and categories by param
+        length (int): number of hits
+    """
+
+    def __init__(self, columns: Dict[str, Tuple[object, list]], length: int):
+        self._np = _import_numpy()
+        self._columns = columns
+        self._length = length
+
+    @classmethod
+    def from_events(cls, events: Iterable[Mapping]) -> "EventTable":
+        """Builds a table from events (dicts of params), in a single pass.
+
+        Args:
+            events (Iterable[Mapping]): GA events
+        """
+        np = _import_numpy()
+        building = {}  # {param: (categories codes, rows, codes)}
+        length = 0
+        for row, event in enumerate(events):
+            length += 1
+            for param, value in event.items():
+                try:
+                    codes_by_value, rows, codes = building[param]
+                except KeyError:
+                    codes_by_value, rows, codes = building[param] = ({}, [], [])
+                code = codes_by_value.get(value)
+                if code is None:
+                    code = codes_by_value[value] = len(codes_by_value)
+                rows.append(row)
+                codes.append(code)
+
+        columns = {}
+        for param, (codes_by_value, rows, codes) in building.items():
+            column = np.full(length, -1, dtype=np.int32)
+            column[np.asarray(rows, dtype=np.intp)] = codes
+            columns[param] = (column, list(codes_by_value))
+        return cls(columns, length)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def columns(self) -> List[str]:
+        """params found in events (in order of first appearance)"""
+        return list(self._columns)
+
+    def codes(self, param: str):
+        """array of codes for a param (``-1`` where param is absent)"""
+        try:
+            return self._columns[param][0]
+        except KeyError:
+            return self._np.full(self._length, -1, dtype=self._np.int32)
+
+    def categories(self, param: str) -> list:
+        """distinct values of a param"""
+        try:
+            return self._columns[param][1]
+        except KeyError:
+            return []
+
+    def mask(self, param: str):
+        """boolean array: ``True`` where hit has param"""
+        return self.codes(param) >= 0
+
+    def column(self, param: str):
+        """object array of values of a param (``None`` where param is absent)"""
+        values = self._np.empty(len(self.categories(param)) + 1, dtype=object)
+        values[:-1] = self.categories(param)  # last one (code -1) stays None
+        return values[self.codes(param)]
+
+    def eq(self, param: str, value: str):
+        """boolean array: ``True`` where hit has ``param == value``"""
+        try:
+            code = self.categories(param).index(value)
+        except ValueError:
+            return self._np.zeros(self._length, dtype=bool)
+        return self.codes(param) == code
+
+    def isin(self, param: str, values: Iterable[str]):
+        """boolean array: ``True`` where value of param is one of ``values``"""
+        values = set(values)
+        selected = [i for i, v in enumerate(self.categories(param)) if v in values]
+        return self._np.isin(self.codes(param), selected)
+
+    def filter(self, mask) -> "EventTable":
+        """returns a table with the hits selected by a boolean array"""
+        columns = {
+            param: (codes[mask], categories)
+            for param, (codes, categories) in self._columns.items()
+        }
+        return EventTable(columns, int(self._np.count_nonzero(mask)))
+
+    def where(self, **predicates: str) -> "EventTable":
+        """returns a table with the hits matching all ``param=value`` predicates
+
+        Example:
+            >>> table.where(t="event", ea="add_to_cart")
+        """
+        mask = self._np.ones(self._length, dtype=bool)
+        for param, value in predicates.items():
+            mask &= self.eq(param, value)
+        return self.filter(mask)
+
+    def select(self, params: Iterable[str]) -> "EventTable":
+        """returns a table with only some params (projection)"""
+        columns = {p: self._columns[p] for p in params if p in self._columns}
+        return EventTable(columns, self._length)
+
+    def value_counts(self, param: str) -> Dict[str, int]:
+        """number of hits for each value of a param, most frequent first"""
+        np = self._np
+        codes = self.codes(param)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories(param)))
+        order = np.argsort(-counts, kind="stable")
+        categories = self.categories(param)
+        return {categories[i]: int(counts[i]) for i in order if counts[i]}
+
+    def to_events(self) -> List[dict]:
+        """returns events as dicts of params (absent params are left out)"""
+        rows = [{} for _ in range(self._length)]
+        for param, (codes, categories) in self._columns.items():
+            present = self._np.flatnonzero(codes >= 0)
+            for row, code in zip(present.tolist(), codes[present].tolist()):
+                rows[row][param] = categories[code]
+        return rows
@@ -3,21 +3,27 @@ gaunit.utils
 
 This module implements general methods used by gaunits.
 """
-import json
-import re
 import sys
-from typing import Tuple
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple, Union
 from urllib.parse import parse_qs, unquote, urlparse
 
+from .events import LayeredParams
 from .exceptions import DictXORJsonPathError
+from .json_backend import JsonBackend, get_json_backend
 
+DEFAULT_TRANSPORT_URL = "https://www.google-analytics.com"
 
-def open_json(json_path) -> dict:
-    """convert JSON file into a dict"""
+# hit types returned by :func:`GAUrlMatcher.hit_type`
+HIT_TYPE_UA = "ua"  # Universal Analytics, /collect
+HIT_TYPE_UA_J = "ua_j"  # Universal Analytics, /j/collect
+HIT_TYPE_GA4 = "ga4"  # Google Analytics 4, /g/collect
 
-    with open(json_path, "r", encoding="utf8") as f:
-        content = json.load(f)
-    return content
+
+def open_json(json_path, json_backend: JsonBackend = None) -> dict:
+    """convert JSON file into a dict (see :func:`gaunit.json_backend.get_json_backend`)"""
+
+    return get_json_backend(json_backend).load(json_path)
 
 
 def get_ga_requests_from_har(
@@ -27,8 +33,8 @@ def get_ga_requests_from_har(
 
     Args:
         har (dict): HAR from a test case
-        transport_url (str): custom transport URL for server side GTM.
-            Defaults to "https://www.google-analytics.com"
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
 
     Returns:
         list: list of requests from har (located in ``har["log"]["entries"]``)
@@ -38,9 +44,10 @@ def get_ga_requests_from_har(
     entries = har["log"]["entries"]
     requests = [e["request"] for e in entries]
     # extracting events from requests to Google Analytics domain only
+    matcher = get_ga_url_matcher(transport_url)
     ga_requests = []
     for r in requests:
-        if is_ga_url(r["url"], transport_url):
+        if matcher(r["url"]):
             ga_requests.append(r)
         pass
     return ga_requests
@@ -49,37 +56,43 @@ def get_ga_requests_from_har(
 def parse_ga_request(request: dict) -> list:
     """extract event params from GA requests (POST and GET)
 
+    URL params of a POST request are decoded once and shared by all events of its payload
+    (see :class:`~gaunit.events.LayeredParams`).
+
     Args:
         request (dict): a request extracted from har (located in ``har["log"]["entries"]``)
 
     Returns:
         list: list of GA events parameters
     """
-    events = []
-    r = request
-    params_url = parse_ga_url(r["url"])
-    if r["method"] == "GET":
-        events = [params_url]
-    if r["method"] == "POST":
+    params_url = parse_ga_url(request["url"])
+    method = request["method"]
+    if method == "GET":
+        return [params_url]
+    if method == "POST":
         try:
-            events = parse_postdata_events(r["postData"]["text"])
-            # must add url params (shared by all events in postData)
-            for e in events:
-                e.update(params_url)
+            data = request["postData"]["text"]
         except KeyError:
             # if no postData key, get url params anyway
-            events = [params_url]
-    return events
+            return [params_url]
+        # url params are shared by all events in postData (and override their params)
+        return parse_postdata_events(data, params_url)
+    return []
 
 
-def parse_postdata_events(data: str) -> list:
+def parse_postdata_events(data: str, shared: dict = None) -> list:
     """extract events params from POST data
 
+    Payload is read in one pass: each value is decoded once, empty values are dropped.
+
     Args:
         data (str): data string contained in GA POST request
+        shared (dict, optional): params shared by all events (URL params of request), which
+            override their params. Defaults to None.
 
     Returns:
-        dict: all events found in POST data
+        list: all events found in POST data (:class:`~gaunit.events.LayeredParams` over
+        ``shared`` if it is given)
     """
     # sample postdata: "en=page_view\r\nen=scroll&epn.percent_scrolled=90"
     # en=scroll
@@ -87,47 +100,99 @@ def parse_postdata_events(data: str) -> list:
     # ""
 
     events = []
-    # events delimited by :
-    for e in data.split("\r\n"):
+    # events delimited by "\r\n", params by "&", values may hold "="
+    for line in data.split("\r\n"):
         params = {}
-        # params delimited by :
-        for t in e.split("&"):
+        empty = False
+        for t in line.split("&"):
             if t:
-                p, v = t.split("=")
-                params.update({p: v})
-            pass
-        events.append(params)
-    return format_events(events)
+                p, _, v = t.partition("=")
+                if "%" in v:
+                    v = unquote(v)
+                params[p] = v
+                if not v:
+                    empty = True
+        if empty:
+            params = {p: v for p, v in params.items() if v}
+        events.append(params if shared is None else LayeredParams(params, shared))
+    return events
+
+
+def iter_ga_requests_from_browser_perf_log(
+    log: Iterable[dict],
+    transport_url: str = "https://www.google-analytics.com",
+    json_backend: JsonBackend = None,
+    seen: set = None,
+) -> Iterator[str]:
+    """yield URLs of GA requests found in a Performance Log, once per request
+
+    Entries which cannot be a GA request (``Page.*``, ``Network.dataReceived``, requests to
+    other hosts...) are skipped with a substring check on the raw message, before decoding
+    JSON. A request is only yielded once by CDP ``requestId`` (redirects send several
+    ``Network.requestWillBeSent`` for the same request).
+
+    Args:
+        log (Iterable[dict]): log entries from ``driver.get_log("performance")``, or streamed
+            from a file (see :func:`gaunit.perf_log.iter_perf_log_file`)
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        json_backend (Union[str, JsonBackend], optional): JSON backend decoding messages
+            (see :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+        seen (set, optional): CDP request ids already yielded, updated as requests are
+            yielded (to go on with new entries of the same log). Defaults to None.
+
+    Yields:
+        str: urls of GA requests
+    """
+    loads = get_json_backend(json_backend).loads
+    matcher = get_ga_url_matcher(transport_url)
+    hosts = matcher.hosts
+    if seen is None:
+        seen = set()  # CDP request ids
+    for entry in log:
+        raw = entry["message"]
+        if "Network.request" not in raw or not any(h in raw for h in hosts):
+            continue
+        try:
+            message = loads(raw)["message"]
+            if not message["method"].startswith("Network.request"):
+                continue
+            params = message["params"]
+            url = params["request"]["url"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        if not matcher(url):
+            continue
+        request_id = params.get("requestId")
+        if request_id is not None:
+            if request_id in seen:
+                continue
+            seen.add(request_id)
+        yield url
 
 
 def get_ga_requests_from_browser_perf_log(
-    log: list, transport_url: str = "https://www.google-analytics.com"
+    log: list,
+    transport_url: str = "https://www.google-analytics.com",
+    json_backend: JsonBackend = None,
 ) -> list:
     """returns a list of HTTP requests urls found in log
 
+    See :func:`iter_ga_requests_from_browser_perf_log`.
+
     Args:
         log (list): log entries from ``driver.get_log("performance")``.
-        transport_url (str): custom transport URL for server side GTM.
-            Defaults to "https://www.google-analytics.com"
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        json_backend (Union[str, JsonBackend], optional): JSON backend decoding messages.
+            Defaults to None.
 
     Returns:
         list: list of urls
     """
-    urls = []
-    for entry in log:
-        message = json.loads(entry["message"])["message"]
-        if (
-            "Network.response" in message["method"]  # not sure it is useful
-            or "Network.request" in message["method"]
-            or "Network.webSocket" in message["method"]  # same here
-        ):
-            try:
-                url = message["params"]["request"]["url"]
-                if is_ga_url(url, transport_url):
-                    urls.append(url)
-            except:
-                pass
-    return urls
+    return list(
+        iter_ga_requests_from_browser_perf_log(log, transport_url, json_backend)
+    )
 
 
 def load_dict_xor_json(d: dict, json_path: str) -> dict:
@@ -173,21 +238,108 @@ def parse_ga_url(url: str) -> dict:
     return event_params
 
 
+class GAUrlMatcher(object):
+    """Tells if URLs are GA hits sent to one of several transport URLs.
+
+    Transport URLs are compiled once into a ``host -> path -> hit type`` lookup table, so
+    matching a URL is a couple of dict lookups: no regex is involved.
+
+    Example:
+        >>> from gaunit import GAUrlMatcher
+        >>> m = GAUrlMatcher(["https://www.google-analytics.com", "https://sgtm.example.com/gtm"])
+        >>> m.hit_type("https://sgtm.example.com/gtm/g/collect?v=2&en=page_view")
+        'ga4'
+        >>> m("https://www.example.com/collect?v=1")
+        False
+
+    Args:
+        transport_urls (Union[str, Iterable[str]]): transport URL(s) (GA endpoints or server
+            side GTM). Scheme is optional and ignored, a path prefix can be given for custom
+            paths (ex: ``"https://sgtm.example.com/gtm"``).
+    """
+
+    ENDPOINTS = {
+        "/collect": HIT_TYPE_UA,
+        "/j/collect": HIT_TYPE_UA_J,
+        "/g/collect": HIT_TYPE_GA4,
+    }
+
+    def __init__(self, transport_urls: Union[str, Iterable[str]]):
+        if isinstance(transport_urls, str):
+            transport_urls = [transport_urls]
+        self.transport_urls = tuple(transport_urls)
+        self._lookup = {}  # {host: {path: hit_type}}
+        for t in self.transport_urls:
+            host, prefix = _split_url(t)
+            paths = self._lookup.setdefault(host, {})
+            prefix = prefix.rstrip("/")
+            for endpoint, hit_type in self.ENDPOINTS.items():
+                paths[prefix + endpoint] = hit_type
+
+    def hit_type(self, url: str) -> Optional[str]:
+        """Returns hit type of a URL (``"ua"``, ``"ua_j"`` or ``"ga4"``) or ``None`` if URL is
+        not a GA hit."""
+        host, path = _split_url(url)
+        paths = self._lookup.get(host)
+        if paths is None:
+            return None
+        return paths.get(path)
+
+    def __call__(self, url: str) -> bool:
+        return self.hit_type(url) is not None
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        """lower case hosts (with port) of transport URLs"""
+        return tuple(self._lookup)
+
+    def __repr__(self):
+        return "GAUrlMatcher(%r)" % (list(self.transport_urls),)
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """split URL (scheme is optional) into lower case host (with port) and path"""
+    i = url.find("://")
+    start = i + 3 if i != -1 else 0
+    end = len(url)
+    for c in "?#":
+        j = url.find(c, start)
+        if j != -1 and j < end:
+            end = j
+    slash = url.find("/", start, end)
+    if slash == -1:
+        return url[start:end].lower(), ""
+    return url[start:slash].lower(), url[slash:end]
+
+
+@lru_cache(maxsize=32)
+def _get_cached_matcher(transport_urls: Tuple[str, ...]) -> GAUrlMatcher:
+    return GAUrlMatcher(transport_urls)
+
+
+def get_ga_url_matcher(
+    transport_url: Union[str, Iterable[str], GAUrlMatcher] = DEFAULT_TRANSPORT_URL
+) -> GAUrlMatcher:
+    """returns a :class:`GAUrlMatcher` for given transport URL(s)
+
+    Matchers are cached: the same set of transport URLs is compiled only once.
+
+    Args:
+        transport_url (Union[str, Iterable[str], GAUrlMatcher]): transport URL, several transport
+            URLs or a matcher (returned as is).
+    """
+    if isinstance(transport_url, GAUrlMatcher):
+        return transport_url
+    if isinstance(transport_url, str):
+        transport_url = (transport_url,)
+    return _get_cached_matcher(tuple(transport_url))
+
+
 def is_ga_url(
     url: str, transport_url: str = "https://www.google-analytics.com"
 ) -> bool:
     # TODO check if rule is enough (no need of v=1 or v=2 params?)
-    # TODO return GA event type (GA or GA4)
-    # TODO no defaults for transport_url for all utils.py function?
-    # transport_url = "https://xxxx"  # transport_url for server-side
-    r = False
-    # GA
-    if re.search(transport_url + r"\/(j\/|)collect.*", url):
-        r = True
-    # GA4
-    if re.search(transport_url + r"\/g\/collect.*", url):
-        r = True
-    return r
+    return get_ga_url_matcher(transport_url)(url)
 
 
 def get_py_version() -> Tuple[int, int]:
@@ -0,0 +1,521 @@
+"""
+gaunit.watch
+
+This module implements the checking of a HAR file or a Performance Log file while it is being
+written (see ``ga watch``): only entries appended since last read are decoded, and their events
+are fed to incremental matchers, so that each update costs in proportion to new data, whatever
+the size of the file.
+
+Files are watched with inotify on Linux (through ``ctypes``) and polled elsewhere.
+"""
+import abc
+import io
+import os
+import select
+import struct
+import sys
+import time
+from typing import List, Optional, TextIO, Tuple
+
+from .events import PROPERTY_PARAM, compact_events
+from .har import _JsonStream, _read_entry
+from .json_backend import JsonBackend, get_json_backend
+from .matching import IncrementalMatcher
+from .models import TrackingPlan
+from .render import TextRenderer
+from .utils import (
+    get_ga_url_matcher,
+    iter_ga_requests_from_browser_perf_log,
+    parse_ga_request,
+    parse_ga_url,
+)
+
+POLL_INTERVAL = 0.5  # seconds between two checks of a polled file
+# bytes before resume offset compared at each read, to detect a rewritten file
+FINGERPRINT_SIZE = 4096
+# seconds a file may stay shorter than what was read before it is read again from the start
+SETTLE_TIME = 1.0
+
+# inotify (see inotify(7))
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+class FileTail(abc.ABC):
+    """Reads the entries appended to a JSON file since last read.
+
+    Only complete entries are returned: an entry still being written is read again on next
+    call. A file written again from the start (export of the same session with new entries)
+    is read on from last entry read, as long as bytes before it did not change. Otherwise
+    (another session), it is read again from the start.
+
+    Args:
+        path (str): path to file (it may not exist yet)
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+    """
+
+    def __init__(self, path: str, json_backend: JsonBackend = None):
+        self.path = path
+        self.json_backend = get_json_backend(json_backend)
+        self.reset()
+
+    def reset(self):
+        """Reads file from the start on next call"""
+        self.offset = None  # file offset after last entry read (None: before first one)
+        self._fingerprint = b""
+        self._shrunk = None  # when file was first seen shorter than offset
+
+    @property
+    def pending(self) -> bool:
+        """True if file is shorter than what was read: it is read again from the start if it
+        is still shorter after a while (see :data:`SETTLE_TIME`)"""
+        return self._shrunk is not None
+
+    def read(self) -> Tuple[List[dict], bool]:
+        """Reads new entries.
+
+        Returns:
+            Tuple[List[dict], bool]: new entries, and ``True`` if file was read again from
+            the start (entries are then all entries of the file)
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            f = None
+        size = 0 if f is None else os.fstat(f.fileno()).st_size
+        restarted = False
+        if self.offset is not None and size < self.offset:
+            # file is being written again, or was replaced by a shorter one: let it settle
+            now = time.monotonic()
+            if self._shrunk is None:
+                self._shrunk = now
+            if now - self._shrunk < SETTLE_TIME:
+                if f is not None:
+                    f.close()
+                return [], False
+            self.reset()
+            restarted = True
+        self._shrunk = None
+        if f is None:
+            return [], restarted
+        entries = []
+        with f:
+            if (
+                self.offset is not None
+                and self._read_fingerprint(f) != self._fingerprint
+            ):
+                self.reset()
+                restarted = True
+            if self.offset is None:
+                self.offset = self._read_header(f)
+                if self.offset is None:
+                    return entries, restarted
+            f.seek(self.offset)
+            self.offset = self._read_entries(f, entries)
+            self._fingerprint = self._read_fingerprint(f)
+        return entries, restarted
+
+    def _read_fingerprint(self, f) -> bytes:
+        start = max(0, self.offset - FINGERPRINT_SIZE)
+        f.seek(start)
+        return f.read(self.offset - start)
+
+    @abc.abstractmethod
+    def _read_header(self, f) -> Optional[int]:
+        """returns offset of first entry (None if it is not written yet)"""
+
+    @abc.abstractmethod
+    def _read_entries(self, f, entries: list) -> int:
+        """appends complete entries from current offset, returns offset after last one"""
+
+    def _read_array(self, f, entries: list, read) -> int:
+        """complete items of a JSON array (``read`` reads one item from a stream)"""
+        s = _JsonStream(f, json_backend=self.json_backend)
+        offset = self.offset
+        try:
+            while s.next_item(b"]"):
+                entries.append(read(s))
+                offset = s.tell()
+        except ValueError:
+            pass  # next item is still being written
+        return offset
+
+
+class HarTail(FileTail):
+    """Reads the entries appended to a HAR file, with their ``request`` only (see
+    :func:`gaunit.har.iter_har_entries`)."""
+
+    def _read_header(self, f) -> Optional[int]:
+        f.seek(0)
+        s = _JsonStream(f, json_backend=self.json_backend)
+        try:
+            s.expect(b"{")
+            while s.next_item(b"}"):
+                if s.read_key() != "log":
+                    s.skip_value()
+                    continue
+                s.expect(b"{")
+                while s.next_item(b"}"):
+                    if s.read_key() != "entries":
+                        s.skip_value()
+                        continue
+                    s.expect(b"[")
+                    return s.tell()
+        except ValueError:
+            pass  # header is still being written
+        return None
+
+    def _read_entries(self, f, entries: list) -> int:
+        return self._read_array(f, entries, _read_entry)
+
+
+class PerfLogTail(FileTail):
+    """Reads the entries appended to a Performance Log file: JSONL (one entry per line) or
+    JSON array (see :func:`gaunit.perf_log.iter_perf_log_file`).
+
+    Raises:
+        ValueError: if a complete line of a JSONL file is not valid JSON
+    """
+
+    def reset(self):
+        super().reset()
+        self._array = False
+
+    def _read_header(self, f) -> Optional[int]:
+        f.seek(0)
+        s = _JsonStream(f, json_backend=self.json_backend)
+        c = s.peek()
+        if not c:
+            return None
+        self._array = c == b"["
+        if self._array:
+            s.expect(b"[")
+            return s.tell()
+        return 0
+
+    def _read_entries(self, f, entries: list) -> int:
+        if self._array:
+            return self._read_array(f, entries, _JsonStream.read_value)
+        offset = self.offset
+        loads = self.json_backend.loads
+        for line in f:
+            if not line.endswith(b"\n"):
+                # last line: complete if it can be decoded, still being written otherwise
+                try:
+                    entry = loads(line) if line.strip() else None
+                except ValueError:
+                    break
+                if entry is not None:
+                    entries.append(entry)
+            elif line.strip():
+                entries.append(loads(line))
+            offset += len(line)
+        return offset
+
+
+class PollWaiter(object):
+    """Waits for changes of a file by checking its size and modification time at regular
+    intervals.
+
+    Args:
+        path (str): path to file (it may not exist yet)
+        interval (float, optional): time between two checks, in seconds. Defaults to 0.5.
+    """
+
+    def __init__(self, path: str, interval: float = POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits until file changes (written, replaced or removed).
+
+        Args:
+            timeout (float, optional): maximum time to wait, in seconds. Defaults to None
+                (no limit).
+
+        Returns:
+            bool: ``True`` if file changed, ``False`` if time is out
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                return True
+            delay = self.interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class InotifyWaiter(PollWaiter):
+    """Waits for changes of a file with inotify (Linux only), watching its directory so that
+    files created or replaced after the start are seen.
+
+    Raises:
+        OSError: if inotify is not available
+    """
+
+    def __init__(self, path: str, interval: float = POLL_INTERVAL):
+        import ctypes
+
+        self.path = path
+        self.interval = interval
+        self._name = os.path.basename(os.path.abspath(path)).encode()
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("inotify is not available")
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        directory = os.path.dirname(os.path.abspath(path)).encode()
+        if add_watch(self.fd, directory, _IN_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), directory.decode())
+
+    def wait(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return False
+            if self._read_events():
+                return True
+
+    def _read_events(self) -> bool:
+        """True if queued events include a change of watched file"""
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return False
+        changed = False
+        pos = 0
+        while pos < len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, pos)
+            pos += _INOTIFY_EVENT.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            if name == self._name or mask & _IN_Q_OVERFLOW:
+                changed = True
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def get_waiter(path: str, interval: float = POLL_INTERVAL) -> PollWaiter:
+    """Returns an :class:`InotifyWaiter` if inotify is available, a :class:`PollWaiter`
+    otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWaiter(path, interval)
+        except OSError:
+            pass
+    return PollWaiter(path, interval)
+
+
+class Watcher(object):
+    """Checks a HAR file or a Performance Log file against test cases while it is written.
+
+    New entries are read with a :class:`HarTail` or a :class:`PerfLogTail` and their events are
+    fed to one :class:`~gaunit.matching.IncrementalMatcher` per test case, as in
+    :class:`~gaunit.server.CollectServer`. Checking is started over if the file is truncated or
+    rewritten.
+
+    Example:
+        >>> from gaunit import TrackingPlan
+        >>> from gaunit.watch import Watcher
+        >>> tp = TrackingPlan.from_json("tracking_plan.json")
+        >>> Watcher("session.har", tp, ["home"]).run()  # until interrupted
+
+    Args:
+        path (str): path to HAR file or Performance Log file
+        tracking_plan (:class:`~gaunit.TrackingPlan`): tracking plan containing expected events
+        test_case_ids (List[str], optional): test cases to check. Defaults to None (all test
+            cases in tracking plan).
+        perf_log (bool, optional): file is a Performance Log (JSONL or JSON), not a HAR.
+            Defaults to False.
+        transport_url (str): custom transport URL for server side GTM, several transport URLs
+            or a :class:`~gaunit.GAUrlMatcher`. Defaults to "https://www.google-analytics.com"
+        ordered (bool, optional): True if events must respect tracking plan order.
+            Defaults to True.
+        strict (bool, optional): ordered: an actual event satisfies one expected event at
+            most (see :func:`gaunit.matching.check_ordered`). Defaults to True.
+        json_backend (Union[str, JsonBackend], optional): JSON backend (see
+            :func:`gaunit.json_backend.get_json_backend`). Defaults to None.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tracking_plan: TrackingPlan,
+        test_case_ids: List[str] = None,
+        perf_log: bool = False,
+        transport_url: str = "https://www.google-analytics.com",
+        ordered: bool = True,
+        strict: bool = True,
+        json_backend: JsonBackend = None,
+    ):
+        if test_case_ids is None:
+            test_case_ids = list(tracking_plan.content)
+        self.path = path
+        self.tracking_plan = tracking_plan
+        self.test_case_ids = test_case_ids
+        self.perf_log = perf_log
+        self.ordered = ordered
+        self.strict = strict
+        self.json_backend = get_json_backend(json_backend)
+        self.url_matcher = get_ga_url_matcher(transport_url)
+        tail = PerfLogTail if perf_log else HarTail
+        self.tail = tail(path, self.json_backend)
+        # property targeted by each test case: events sent to other ones are not fed
+        self.properties = {i: tracking_plan.get_property(i) for i in test_case_ids}
+        self._start()
+
+    def reset(self):
+        """Forgets all events read and starts checking from scratch (file is read again)"""
+        self.tail.reset()
+        self._start()
+
+    def _start(self):
+        self.events = 0  # number of events read
+        self.matchers = {
+            i: IncrementalMatcher(
+                self.tracking_plan.get_expected_events(i), self.ordered, self.strict
+            )
+            for i in self.test_case_ids
+        }
+        self._seen = set()  # Performance Log: CDP request ids already read
+
+    @property
+    def satisfied(self) -> bool:
+        """True when all test cases are satisfied"""
+        return all(m.satisfied for m in self.matchers.values())
+
+    def update(self) -> bool:
+        """Reads entries appended to file since last update and checks their events.
+
+        Returns:
+            bool: ``True`` if status changed (new events, or file read again from the start)
+        """
+        entries, restarted = self.tail.read()
+        if restarted:
+            self._start()
+        events = self._get_events(entries)
+        for event in events:
+            for test_case_id, m in self.matchers.items():
+                property_id = self.properties[test_case_id]
+                if property_id is not None and event.get(PROPERTY_PARAM) != property_id:
+                    continue  # sent to another property
+                m.feed(event)
+        self.events += len(events)
+        return restarted or bool(events)
+
+    def _get_events(self, entries: List[dict]) -> list:
+        events = []
+        if self.perf_log:
+            urls = iter_ga_requests_from_browser_perf_log(
+                entries, self.url_matcher, self.json_backend, self._seen
+            )
+            events.extend(compact_events(parse_ga_url(url) for url in urls))
+            return events
+        for entry in entries:
+            r = entry.get("request")
+            if r is not None and self.url_matcher(r["url"]):
+                events.extend(compact_events(parse_ga_request(r)))
+        return events
+
+    def format_status(self, color: bool = False) -> str:
+        """Returns the status of each test case (see :func:`TextRenderer.status`)"""
+        out = io.StringIO()
+        renderer = TextRenderer(out, color=color)
+        for test_case_id, m in self.matchers.items():
+            chklst_expected = [match is not None for match in m.matches]
+            renderer.status(test_case_id, m.expected, chklst_expected, self.events)
+        return out.getvalue()
+
+    def run(self, out: TextIO = None, interval: float = POLL_INTERVAL):
+        """Checks file and redraws status on each change, until interrupted (Ctrl+C).
+
+        Status is redrawn in place on a terminal, written again otherwise.
+
+        Args:
+            out (TextIO, optional): output stream. Defaults to None (``sys.stdout``).
+            interval (float, optional): time between two checks of file when it is polled,
+                in seconds. Defaults to 0.5.
+        """
+        display = _StatusDisplay(out)
+        try:
+            with get_waiter(self.path, interval) as waiter:
+                self.update()
+                display.show(self.format_status(display.isatty))
+                while True:
+                    timeout = SETTLE_TIME if self.tail.pending else None
+                    changed = waiter.wait(timeout)
+                    if (changed or self.tail.pending) and self.update():
+                        display.show(self.format_status(display.isatty))
+        except KeyboardInterrupt:
+            pass
+
+
+class _StatusDisplay(object):
+    """writes status text, over the previous one on a terminal"""
+
+    def __init__(self, out: TextIO = None):
+        self.out = sys.stdout if out is None else out
+        isatty = getattr(self.out, "isatty", None)
+        self.isatty = bool(isatty and isatty())
+        self._lines = 0  # lines of text written last
+
+    def show(self, text: str):
+        if self.isatty and self._lines:
+            # cursor up to first line written last, erase to end of screen
+            self.out.write("\x1b[%dA\r\x1b[J" % self._lines)
+        elif self._lines:
+            self.out.write("\n")
+        self.out.write(text)
+        self.out.flush()
+        self._lines = text.count("\n")
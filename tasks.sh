@@ -7,7 +7,7 @@ set -o pipefail
 
 TIMEFORMAT="Task completed in %3lR"
 SRC_FILES="./gaunit ./tests setup.py"
-FORMAT_FILES="./gaunit ./tests setup.py ./examples"
+FORMAT_FILES="./gaunit ./tests setup.py ./examples ./benchmarks"
 PACKAGE="gaunit"
 
 ##### Dev
@@ -100,6 +100,19 @@ format() {  ## * Format code
 	black $FORMAT_FILES
 }
 
+bench() {  ## Run benchmarks in current environment, results are stored for current commit
+	asv machine --yes
+	asv run --python=same --set-commit-hash="$(git rev-parse HEAD)" "$@"
+}
+
+bench-quick() {  ## Run benchmarks once each, without storing results
+	asv run --python=same --quick --show-stderr "$@"
+}
+
+bench-compare() {  ## Compare stored benchmark results of 2 commits: bench-compare [base] [head]
+	asv compare --split "$(git rev-parse "${1:-master}")" "$(git rev-parse "${2:-HEAD}")"
+}
+
 ##### Use & Deploy
 
 install-minimal() {  ## Install minimal usage requirements
@@ -48,5 +48,90 @@ class test_api_with_transport_url(unittest.TestCase):
         self.assertEqual([True, True, True], r.checklist_expected_events)
 
 
+class test_api_all_test_cases(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tp = gaunit.TrackingPlan()
+        self.tp.add_test_case("home_engie", [{"dp": "A"}, {"dp": "B"}])
+        self.tp.add_test_case("product_page", [{"dp": "C"}, {"dp": "D"}])
+
+    def test_check_har_all(self):
+        har = generate_mock_har("A", "B", "C")
+        results = gaunit.check_har_all(self.tp, har=har)
+        self.assertEqual(["home_engie", "product_page"], list(results))
+        self.assertTrue(results["home_engie"].was_successful())
+        self.assertEqual(
+            [False, False, True], results["product_page"].checklist_actual_events
+        )
+        self.assertEqual(
+            [True, False], results["product_page"].checklist_expected_events
+        )
+
+    def test_check_har_all_test_case_ids(self):
+        har = generate_mock_har("A", "B", "C")
+        results = gaunit.check_har_all(self.tp, har=har, test_case_ids=["home_engie"])
+        self.assertEqual(["home_engie"], list(results))
+
+    def test_check_har_all_same_as_check_har(self):
+        har = generate_mock_har("C", "A", "x", "D", "B")
+        results = gaunit.check_har_all(self.tp, har=har)
+        for test_case_id, r in results.items():
+            expected = gaunit.check_har(test_case_id, self.tp, har=har)
+            self.assertEqual(
+                expected.checklist_expected_events, r.checklist_expected_events
+            )
+            self.assertEqual(
+                expected.checklist_actual_events, r.checklist_actual_events
+            )
+
+    def test_check_perf_log_all(self):
+        perf_log = generate_mock_perf_log("A", "B", "C", "D")
+        results = gaunit.check_perf_log_all(self.tp, perf_log)
+        self.assertTrue(all(r.was_successful() for r in results.values()))
+
+    def test_check_har_all_missing_test_case(self):
+        har = generate_mock_har("A")
+        with self.assertRaises(gaunit.TrackingPlanError):
+            gaunit.check_har_all(self.tp, har=har, test_case_ids=["dummy"])
+
+
+class test_api_properties(unittest.TestCase):
+    def setUp(self) -> None:
+        url = "https://www.google-analytics.com/collect?v=1&tid=%s&dp=%s"
+        hits = [("UA-1-1", "A"), ("UA-2-1", "A"), ("UA-2-1", "B"), ("UA-1-1", "B")]
+        self.har = {
+            "log": {
+                "entries": [
+                    {"request": {"method": "GET", "url": url % hit}} for hit in hits
+                ]
+            }
+        }
+        self.tp = gaunit.TrackingPlan()
+        self.tp.add_test_case("site_1", [{"dp": "A"}, {"dp": "B"}], "UA-1-1")
+        self.tp.add_test_case("site_2", [{"dp": "B"}, {"dp": "A"}], "UA-2-1")
+        self.tp.add_test_case("all", [{"dp": "A"}, {"dp": "B"}, {"dp": "B"}])
+        self.tp.add_test_case("other", [{"dp": "A"}], "G-XYZ")
+
+    def test_check_har(self):
+        r = gaunit.check_har("site_2", self.tp, har=self.har)
+        self.assertEqual(2, len(r.actual_events))
+        self.assertEqual({"UA-2-1"}, {e["tid"] for e in r.actual_events})
+        # B is sent after A to this property
+        self.assertEqual([True, False], r.checklist_expected_events)
+
+    def test_check_har_all(self):
+        results = gaunit.check_har_all(self.tp, har=self.har)
+        self.assertTrue(results["site_1"].was_successful())
+        self.assertFalse(results["site_2"].was_successful())
+        self.assertTrue(results["all"].was_successful())
+        self.assertEqual(4, len(results["all"].actual_events))
+        self.assertEqual([], results["other"].actual_events)
+        for test_case_id, r in results.items():
+            expected = gaunit.check_har(test_case_id, self.tp, har=self.har)
+            self.assertEqual(
+                expected.checklist_expected_events, r.checklist_expected_events
+            )
+            self.assertEqual(expected.actual_events, r.actual_events)
+
+
 if __name__ == "__main__":
     unittest.main()
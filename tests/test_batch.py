@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+from os.path import dirname, join, realpath
+
+import gaunit
+from gaunit.batch import (
+    find_har_files,
+    get_test_case_id,
+    iter_check_har_files,
+    iter_extract_har_files,
+)
+
+from tests.utils import generate_mock_har
+
+
+class test_batch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tracking_plan = join(dirname(realpath(__file__)), "tracking_plan.json")
+        hars = {
+            "home_engie.har": generate_mock_har("A", "B", "C"),
+            "home_engie_ko.har": generate_mock_har("A", "C"),
+            "unknown.har": generate_mock_har("A"),
+        }
+        for name, har in hars.items():
+            with open(join(self.tmp.name, name), "w", encoding="utf8") as f:
+                json.dump(har, f)
+        self.paths = find_har_files(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_find_har_files(self):
+        self.assertEqual(
+            ["home_engie.har", "home_engie_ko.har", "unknown.har"],
+            [os.path.basename(p) for p in self.paths],
+        )
+        self.assertEqual(2, len(find_har_files(join(self.tmp.name, "home_*.har"))))
+
+    def test_get_test_case_id(self):
+        path = join("hars", "home_engie_ko.har")
+        self.assertEqual("home_engie_ko", get_test_case_id(path))
+        self.assertEqual(
+            "home_engie",
+            get_test_case_id(path, {"home_engie_ko.har": "home_engie"}),
+        )
+
+    def test_iter_check_har_files(self):
+        mapping = {"home_engie_ko.har": "home_engie"}
+        results = {
+            os.path.basename(r.path): r
+            for r in iter_check_har_files(
+                self.paths, self.tracking_plan, mapping, max_workers=2
+            )
+        }
+        self.assertEqual(3, len(results))
+        self.assertTrue(results["home_engie.har"].was_successful())
+        self.assertEqual(
+            [True, False, True],
+            results["home_engie_ko.har"].result.checklist_expected_events,
+        )
+        self.assertEqual("home_engie", results["home_engie_ko.har"].test_case_id)
+        self.assertIsInstance(results["unknown.har"].error, gaunit.TrackingPlanError)
+        self.assertFalse(results["unknown.har"].was_successful())
+        # index over actual events is not sent back by workers
+        r = results["home_engie_ko.har"].result
+        self.assertIsNone(r._index)
+        self.assertEqual([1], list(r.nearest_misses()))
+
+    def test_iter_check_har_files_invalid_tracking_plan(self):
+        path = join(self.tmp.name, "tracking_plan.json")
+        with open(path, "w", encoding="utf8") as f:
+            json.dump({"home_engie": []}, f)
+        with self.assertRaises(gaunit.TrackingPlanError):
+            list(iter_check_har_files(self.paths, path))
+        # no worker is started for files of unknown test cases
+        tp = gaunit.TrackingPlan.from_file(self.tracking_plan)
+        results = list(iter_check_har_files(self.paths[-1:], tp))
+        self.assertEqual(["unknown.har"], [os.path.basename(r.path) for r in results])
+        self.assertIsInstance(results[0].error, gaunit.TrackingPlanError)
+
+    def test_iter_extract_har_files(self):
+        results = {
+            os.path.basename(r.path): r.events
+            for r in iter_extract_har_files(self.paths, max_workers=2)
+        }
+        self.assertEqual(
+            [{"v": "1", "dp": "A"}, {"v": "1", "dp": "C"}],
+            results["home_engie_ko.har"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
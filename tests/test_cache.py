@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+import gaunit
+from gaunit.cache import EventCache, extract_har_events, extract_perf_log_events
+from gaunit.stats import Stats
+
+from tests.utils import generate_mock_har, generate_mock_perf_log
+
+
+class test_EventCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = EventCache(os.path.join(self.tmp.name, "cache"))
+        self.har_path = os.path.join(self.tmp.name, "test.har")
+        with open(self.har_path, "w", encoding="utf8") as f:
+            json.dump(generate_mock_har("A", "B"), f)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_get_events_from_har_decoded_once(self):
+        with unittest.mock.patch(
+            "gaunit.cache.get_events_from_har", wraps=gaunit.har.get_events_from_har
+        ) as extract:
+            events_1 = self.cache.get_events_from_har(self.har_path)
+            events_2 = self.cache.get_events_from_har(self.har_path)
+        self.assertEqual(1, extract.call_count)
+        self.assertEqual([{"v": "1", "dp": "A"}, {"v": "1", "dp": "B"}], events_1)
+        self.assertEqual(events_1, events_2)
+
+    def test_file_hash_changes_with_content(self):
+        h = self.cache.file_hash(self.har_path)
+        with open(self.har_path, "w", encoding="utf8") as f:
+            json.dump(generate_mock_har("C"), f)
+        os.utime(self.har_path, ns=(0, 0))  # make sure stat differs
+        self.assertNotEqual(h, self.cache.file_hash(self.har_path))
+        self.assertEqual(
+            [{"v": "1", "dp": "C"}], self.cache.get_events_from_har(self.har_path)
+        )
+
+    def test_key(self):
+        key = self.cache.key("hash", "https://www.google-analytics.com")
+        self.assertEqual(
+            key, self.cache.key("hash", ["https://www.google-analytics.com"])
+        )
+        self.assertNotEqual(key, self.cache.key("hash", "https://tracking.example.com"))
+        with unittest.mock.patch("gaunit.cache.PARSER_VERSION", -1):
+            self.assertNotEqual(
+                key, self.cache.key("hash", "https://www.google-analytics.com")
+            )
+
+    def test_get_events_from_browser_perf_log(self):
+        perf_log = generate_mock_perf_log("A")
+        events = self.cache.get_events_from_browser_perf_log(perf_log)
+        with unittest.mock.patch("gaunit.cache.get_events_from_perf_log") as m:
+            self.assertEqual(
+                events, self.cache.get_events_from_browser_perf_log(perf_log)
+            )
+        m.assert_not_called()
+
+    def test_get_invalid_entry(self):
+        self.cache.set("key", [{"dp": "A"}])
+        path = os.path.join(self.cache._events_dir, "key")
+        with open(path, "wb") as f:
+            f.write(b"\x80\x04cgaunit.missing\nEvent\n.")  # class not found
+        self.assertIsNone(self.cache.get("key"))
+        self.cache.set("key", [{"dp": "A"}])
+        with unittest.mock.patch("os.utime", side_effect=PermissionError):
+            self.assertEqual([{"dp": "A"}], self.cache.get("key"))
+
+    def test_prune_max_size(self):
+        self.cache.get_events_from_har(self.har_path)
+        removed, freed = self.cache.prune(max_size=0)
+        self.assertEqual(2, removed)  # events + stat entries
+        self.assertGreater(freed, 0)
+        self.assertEqual([], os.listdir(self.cache._events_dir))
+
+    def test_prune_max_age(self):
+        self.cache.set("old", [{"dp": "A"}])
+        self.cache.set("new", [{"dp": "B"}])
+        old = time.time() - 3600
+        os.utime(os.path.join(self.cache._events_dir, "old"), (old, old))
+        removed, _ = self.cache.prune(max_age=60)
+        self.assertEqual(1, removed)
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual([{"dp": "B"}], self.cache.get("new"))
+
+    def test_test_case_with_cache(self):
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}])
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        r = gaunit.check_har("home_engie", tp, har_path=self.har_path, cache=cache_dir)
+        self.assertTrue(r.was_successful())
+        with unittest.mock.patch("gaunit.cache.get_events_from_har") as m:
+            r = gaunit.check_har(
+                "home_engie", tp, har_path=self.har_path, cache=cache_dir
+            )
+        m.assert_not_called()
+        self.assertEqual([True, False], r.checklist_actual_events)
+
+    def test_extract_events(self):
+        har = generate_mock_har("A", "B")
+        events = extract_har_events(har_path=self.har_path, cache=self.cache)
+        self.assertEqual(events, extract_har_events(har=har, cache=self.cache))
+        self.assertEqual(1, len(os.listdir(self.cache._events_dir)))  # dicts not cached
+        perf_log = generate_mock_perf_log("A", "B")
+        events = extract_perf_log_events(perf_log, cache=self.cache)
+        self.assertEqual(events, extract_perf_log_events(perf_log))
+        self.assertEqual(2, len(os.listdir(self.cache._events_dir)))
+
+    def test_extract_events_stats(self):
+        miss, hit = Stats(), Stats()
+        extract_har_events(har_path=self.har_path, stats=miss, cache=self.cache)
+        extract_har_events(har_path=self.har_path, stats=hit, cache=self.cache)
+        self.assertEqual(
+            {"entries": 2, "requests": 2, "events": 2, "cache_misses": 1},
+            miss.counters,
+        )
+        self.assertIn("decode", miss.timings)
+        self.assertEqual({"events": 2, "cache_hits": 1}, hit.counters)
+        self.assertEqual(["cache"], list(hit.timings))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import gaunit
+from gaunit.compiled import FORMAT_VERSION, MAGIC, is_compiled
+from gaunit.events import Event
+
+from tests.utils import generate_mock_har
+
+here = os.path.dirname(os.path.realpath(__file__))
+
+
+class test_compiled(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "tracking_plan.json")
+        tp = gaunit.TrackingPlan.from_json(os.path.join(here, "tracking_plan.json"))
+        tp.add_test_case(
+            "add_to_cart", [{"t": "event", "ea": "add%20to%20cart"}], "UA-1-1"
+        )
+        tp.add_test_case("empty", [{"t": "pageview", "dp": ""}])
+        tp.to_json(self.source)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_compile_and_load(self):
+        path = gaunit.TrackingPlan.compile(self.source)
+        self.assertEqual(os.path.join(self.tmp.name, "tracking_plan.gaplan"), path)
+        self.assertTrue(is_compiled(path))
+        self.assertFalse(is_compiled(self.source))
+        tp = gaunit.TrackingPlan.load_compiled(path)
+        expected = gaunit.TrackingPlan.from_json(self.source)
+        self.assertEqual(expected.content, tp.content)
+        self.assertEqual(list(expected.content), list(tp.content))
+        self.assertEqual("VinceCabs", tp.content["home_engie"]["author"])
+        self.assertEqual("UA-1-1", tp.get_property("add_to_cart"))
+        # normalized, read-only events
+        events = tp.get_expected_events("add_to_cart")
+        self.assertIsInstance(events[0], Event)
+        self.assertEqual([{"t": "event", "ea": "add to cart"}], events)
+        self.assertEqual([{"t": "pageview"}], tp.get_expected_events("empty"))
+
+    def test_load_some_test_cases(self):
+        path = gaunit.TrackingPlan.compile(self.source)
+        tp = gaunit.TrackingPlan.load_compiled(path, ["empty", "home_engie"])
+        self.assertEqual(["home_engie", "empty"], list(tp.content))
+        with self.assertRaises(gaunit.TrackingPlanError):
+            gaunit.TrackingPlan.load_compiled(path, ["foo"])
+
+    def test_stale(self):
+        path = os.path.join(self.tmp.name, "plan.bin")
+        gaunit.TrackingPlan.compile(self.source, path)
+        # same content, new modification time: not stale
+        os.utime(self.source, ns=(0, 0))
+        gaunit.TrackingPlan.load_compiled(path)
+        # source changed
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "home"}])
+        tp.to_json(self.source)
+        with self.assertRaises(gaunit.StaleTrackingPlanError):
+            gaunit.TrackingPlan.load_compiled(path)
+        tp = gaunit.TrackingPlan.load_compiled(path, check_stale=False)
+        self.assertIn("home_engie", tp.content)
+        # other source given
+        with self.assertRaises(gaunit.StaleTrackingPlanError):
+            gaunit.TrackingPlan.load_compiled(path, source=self.source)
+        # source removed: artifact is used alone
+        os.remove(self.source)
+        gaunit.TrackingPlan.load_compiled(path)
+
+    def test_moved_source(self):
+        path = gaunit.TrackingPlan.compile(self.source)
+        moved = os.path.join(self.tmp.name, "moved.json")
+        shutil.copy(self.source, moved)
+        gaunit.TrackingPlan.load_compiled(path, source=moved)
+
+    def test_invalid_artifact(self):
+        path = os.path.join(self.tmp.name, "plan.gaplan")
+        with self.assertRaises(gaunit.TrackingPlanError):
+            gaunit.TrackingPlan.load_compiled(self.source)
+        with open(path, "wb") as f:
+            f.write(MAGIC + (FORMAT_VERSION + 1).to_bytes(2, "big"))
+        with self.assertRaisesRegex(gaunit.TrackingPlanError, "compile it again"):
+            gaunit.TrackingPlan.load_compiled(path)
+
+    def test_from_file(self):
+        path = gaunit.TrackingPlan.compile(self.source)
+        for p in (self.source, path):
+            with self.subTest(path=p):
+                tp = gaunit.TrackingPlan.from_file(p)
+                self.assertEqual(
+                    [{"dp": "A"}, {"dp": "B"}, {"dp": "C"}],
+                    tp.get_expected_events("home_engie"),
+                )
+
+    def test_check_and_to_json(self):
+        tp = gaunit.TrackingPlan.load_compiled(gaunit.TrackingPlan.compile(self.source))
+        har = generate_mock_har("A", "B", "C")
+        r = gaunit.check_har("home_engie", tp, har=har)
+        self.assertTrue(r.was_successful())
+        tc = gaunit.TestCase("home_engie", tp, har=har)
+        self.assertEqual(([True] * 3, [True] * 3), tc.check(ordered=False))
+        path = os.path.join(self.tmp.name, "exported.json")
+        tp.to_json(path)
+        self.assertEqual(tp.content, gaunit.TrackingPlan.from_json(path).content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import io
+import json
+import unittest
+
+import gaunit
+from unittest import mock
+
+from gaunit.diagnostics import nearest_misses
+from gaunit.matching import EventIndex
+from gaunit.render import JsonRenderer, TextRenderer
+
+
+class test_nearest_misses(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events = [
+            {"t": "pageview", "dp": "home"},
+            {"t": "event", "ea": "add", "ev": "44"},
+            {"t": "event", "ea": "add_to_cart", "ev": "45"},
+            {"t": "event", "ea": "remove", "ev": "44"},
+        ]
+        self.index = EventIndex(self.events)
+
+    def test_nearest_first(self):
+        expected = {"t": "event", "ea": "add_to_cart", "ev": "44"}
+        misses = nearest_misses(expected, self.index)
+        self.assertEqual([1, 2, 3], [m.position for m in misses])
+        self.assertEqual([2, 2, 2], [m.matched for m in misses])
+        self.assertEqual({"ea": ("add_to_cart", "add")}, misses[0].diff)
+        self.assertEqual({"ev": ("44", "45")}, misses[1].diff)
+        self.assertIs(self.events[2], misses[1].event)
+        self.assertEqual(1, len(nearest_misses(expected, self.index, k=1)))
+        self.assertEqual([], nearest_misses(expected, self.index, k=0))
+
+    def test_absent_param(self):
+        misses = nearest_misses(
+            {"t": "pageview", "dp": "home", "dt": "Home"}, self.index
+        )
+        self.assertEqual(0, misses[0].position)
+        self.assertEqual({"dt": ("Home", None)}, misses[0].diff)
+        self.assertEqual(
+            {
+                "position": 0,
+                "event": {"t": "pageview", "dp": "home"},
+                "matched": 2,
+                "diff": {"dt": {"expected": "Home", "actual": None}},
+            },
+            misses[0].as_dict(),
+        )
+
+    def test_common_pairs(self):
+        events = [{"v": "1", "t": "event", "ea": "add"}] * 8 + [
+            {"v": "1", "t": "event", "ea": "remove"},
+            {"v": "1", "t": "pageview", "ea": "remove"},
+        ]
+        expected = {"v": "1", "t": "event", "ea": "remove"}
+        with mock.patch("gaunit.diagnostics.COMMON_MIN", 0):
+            misses = nearest_misses(expected, EventIndex(events))
+            self.assertEqual(
+                [(8, 3), (0, 2), (1, 2)], [(m.position, m.matched) for m in misses]
+            )
+            # only common pairs are held
+            misses = nearest_misses(
+                {"v": "1", "t": "event", "ea": "x"}, EventIndex(events)
+            )
+            self.assertEqual(
+                [(0, 2), (1, 2), (2, 2)], [(m.position, m.matched) for m in misses]
+            )
+
+    def test_nearest_hold_common_pairs_only(self):
+        # each filler lacks one of the common pairs
+        fillers = [{"v": "1", "tid": "UA-1", "t": "pageview"} for _ in range(2000)]
+        for i, e in enumerate(fillers):
+            e.update([("v", "2"), ("tid", "UA-2"), ("t", "event")][i % 3 :][:1])
+            e["dp"] = "page_%d" % i
+        events = (
+            fillers
+            + [{"v": "1", "tid": "UA-1", "t": "pageview", "dp": "other"}] * 3
+            + [{"v": "2", "dp": "home"}]
+        )
+        expected = {"v": "1", "tid": "UA-1", "t": "pageview", "dp": "home"}
+        misses = nearest_misses(expected, EventIndex(events))
+        self.assertEqual(
+            [(2000, 3), (2001, 3), (2002, 3)],
+            [(m.position, m.matched) for m in misses],
+        )
+        self.assertEqual({"dp": ("home", "other")}, misses[0].diff)
+
+    def test_no_param_in_common(self):
+        self.assertEqual([], nearest_misses({"t": "exception"}, self.index))
+
+    def test_result(self):
+        tp = gaunit.TrackingPlan.from_events(
+            "cart", [{"t": "event", "ea": "add"}, {"t": "event", "ea": "add"}]
+        )
+        tc = gaunit.TestCase("cart", tp)
+        tc.load_events(self.events)
+        r = tc.result()
+        misses = r.nearest_misses()
+        # second expected event: only matching event was already found
+        self.assertEqual([1], list(misses))
+        self.assertEqual((1, {}), (misses[1][0].position, misses[1][0].diff))
+        self.assertIs(misses, r.nearest_misses())
+
+        out = io.StringIO()
+        TextRenderer(out).result(r)
+        self.assertIn(
+            "    closest event #1: 2/2 params (out of order or already found)\n"
+            "    closest event #2: 1/2 params\n"
+            "        ea: expected 'add', found 'add_to_cart'\n",
+            out.getvalue(),
+        )
+        out = io.StringIO()
+        TextRenderer(out).result(r, nearest=0)
+        self.assertNotIn("closest", out.getvalue())
+
+        out = io.StringIO()
+        JsonRenderer(out).result(r, nearest=1)
+        events = json.loads(out.getvalue())["expected_events"]
+        self.assertNotIn("nearest", events[0])
+        self.assertEqual([1], [m["position"] for m in events[1]["nearest"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import gc
+import pickle
+import unittest
+
+from gaunit import events
+from gaunit.events import (
+    Event,
+    LayeredParams,
+    compact_event,
+    compact_events,
+    partition_events,
+)
+from gaunit.matching import check_index, check_scan
+
+
+class test_Event(unittest.TestCase):
+    def setUp(self) -> None:
+        self.d = {"v": "1", "t": "pageview", "dp": "home"}
+        self.e = compact_event(self.d)
+
+    def test_mapping(self):
+        self.assertEqual("pageview", self.e["t"])
+        self.assertEqual("home", self.e.get("dp"))
+        self.assertIsNone(self.e.get("ea"))
+        self.assertIn("v", self.e)
+        self.assertEqual(3, len(self.e))
+        self.assertEqual(["v", "t", "dp"], list(self.e))
+        self.assertEqual(list(self.d.items()), list(self.e.items()))
+        with self.assertRaises(KeyError):
+            self.e["ea"]
+
+    def test_equality(self):
+        self.assertEqual(self.d, self.e)
+        self.assertEqual(self.e, self.d)
+        self.assertEqual(self.e, compact_event(dict(self.d)))
+        self.assertNotEqual(self.e, {"v": "1"})
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.e["v"] = "2"
+        with self.assertRaises(AttributeError):
+            self.e.x = 1
+
+    def test_items_subset(self):
+        self.assertTrue({"t": "pageview"}.items() <= self.e.items())
+        self.assertFalse({"t": "event"}.items() <= self.e.items())
+
+    def test_shared_schema_and_interned_values(self):
+        e1, e2 = compact_events(
+            [{"v": "1", "dp": "".join(["ho", "me"])}, {"v": "1", "dp": "home"}]
+        )
+        self.assertIs(e1._schema, e2._schema)
+        self.assertIs(e1["dp"], e2["dp"])
+
+    def test_unused_schemas_released(self):
+        keys = ("v", "ep.unused_schema")
+        e = compact_event(dict.fromkeys(keys, "1"))
+        self.assertIs(e._schema, events._schemas[keys])
+        del e
+        gc.collect()
+        self.assertNotIn(keys, events._schemas)
+
+    def test_pickle(self):
+        e = pickle.loads(pickle.dumps(self.e))
+        self.assertIsInstance(e, Event)
+        self.assertEqual(self.e, e)
+        self.assertIs(self.e._schema, e._schema)
+
+    def test_repr(self):
+        self.assertEqual(repr(self.d), repr(self.e))
+
+    def test_matching_engines(self):
+        expected = [{"t": "pageview"}, {"dp": "home", "v": "1"}]
+        actual = compact_events([{"t": "event"}, self.d])
+        self.assertEqual(
+            ([True, True], [False, True]), check_index(expected, actual, strict=False)
+        )
+        self.assertEqual(check_scan(expected, actual), check_index(expected, actual))
+
+
+class test_LayeredParams(unittest.TestCase):
+    def setUp(self) -> None:
+        self.shared = {"v": "2", "tid": "G-XYZ"}
+
+    def test_mapping(self):
+        e = LayeredParams({"en": "scroll", "v": "1"}, self.shared)
+        # same as params.update(shared)
+        self.assertEqual(
+            [("en", "scroll"), ("v", "2"), ("tid", "G-XYZ")], list(e.items())
+        )
+        self.assertEqual(3, len(e))
+        self.assertIn("tid", e)
+        self.assertIsNone(e.get("dp"))
+        self.assertEqual("{'en': 'scroll', 'v': '2', 'tid': 'G-XYZ'}", repr(e))
+
+    def test_compact(self):
+        events = [
+            LayeredParams({"en": "page_view"}, self.shared),
+            LayeredParams({"en": "scroll", "v": "1"}, self.shared),
+        ]
+        compacted = compact_events(events)
+        self.assertEqual(events, compacted)
+        self.assertEqual(("en", "v", "tid"), tuple(compacted[0]))
+        self.assertEqual([compact_event(e) for e in events], compacted)
+
+
+class test_partition_events(unittest.TestCase):
+    def test_partition(self):
+        events = compact_events(
+            [
+                {"tid": "UA-1-1", "dp": "A"},
+                {"tid": "G-XYZ", "en": "page_view"},
+                {"dp": "B"},
+                {"tid": "UA-1-1", "dp": "C"},
+            ]
+        )
+        partitions = partition_events(events)
+        self.assertEqual(["UA-1-1", "G-XYZ", None], list(partitions))
+        self.assertEqual([events[0], events[3]], partitions["UA-1-1"])
+        self.assertEqual([events[2]], partitions[None])
+        self.assertEqual({}, partition_events([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
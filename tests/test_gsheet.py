@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+
+import gaunit
+from gaunit.gsheet import _to_records, get_worksheets_records
+
+from tests.utils import FakeSpreadsheet
+
+WORKSHEETS = {
+    "home": [["t", "dp", "ev"], ["pageview", "home"], ["event", "home", "3"]],
+    "add_to_cart": [["t", "ea", "pr1pr"], ["event", "add", "1,000.50"]],
+    "it's empty": [],
+}
+
+
+class test_gsheet(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_one_batched_request(self):
+        sheet = FakeSpreadsheet(WORKSHEETS)
+        records = get_worksheets_records(sheet)
+        self.assertEqual(list(WORKSHEETS), list(records))
+        self.assertEqual(
+            [
+                {"t": "pageview", "dp": "home", "ev": ""},
+                {"t": "event", "dp": "home", "ev": 3},
+            ],
+            records["home"],
+        )
+        self.assertEqual([], records["it's empty"])
+        self.assertEqual(
+            ["worksheets", "values_batch_get"], [m for m, _ in sheet.requests]
+        )
+        self.assertEqual(
+            ["'home'", "'add_to_cart'", "'it''s empty'"], sheet.requests[1][1]
+        )
+
+    def test_same_records_as_gspread(self):
+        try:
+            from gspread.utils import fill_gaps, numericise_all, to_records
+        except ImportError:
+            self.skipTest("gspread is not installed")
+        for title, values in WORKSHEETS.items():
+            if not values:
+                continue
+            with self.subTest(worksheet=title):
+                rows = fill_gaps(values)
+                expected = to_records(rows[0], [numericise_all(r) for r in rows[1:]])
+                self.assertEqual(expected, _to_records(values, title))
+
+    def test_subset(self):
+        sheet = FakeSpreadsheet(WORKSHEETS)
+        records = get_worksheets_records(sheet, ["add_to_cart", "home"])
+        self.assertEqual(["home", "add_to_cart"], list(records))
+        self.assertEqual(["'home'", "'add_to_cart'"], sheet.requests[1][1])
+        with self.assertRaises(gaunit.TrackingPlanError):
+            get_worksheets_records(sheet, ["foo"])
+
+    def test_cache_by_revision(self):
+        sheet = FakeSpreadsheet(WORKSHEETS)
+        records = get_worksheets_records(sheet, ["home"], cache=self.tmp.name)
+        sheet.requests = []
+        # unchanged spreadsheet: only revision is requested
+        self.assertEqual(
+            records, get_worksheets_records(sheet, ["home"], cache=self.tmp.name)
+        )
+        self.assertEqual(["get_lastUpdateTime"], [m for m, _ in sheet.requests])
+        # other worksheets are fetched once
+        sheet.requests = []
+        get_worksheets_records(sheet, cache=self.tmp.name)
+        self.assertEqual(
+            [
+                ("get_lastUpdateTime", None),
+                ("values_batch_get", ["'add_to_cart'", "'it''s empty'"]),
+            ],
+            sheet.requests,
+        )
+        # new revision: values are fetched again
+        sheet.values = dict(WORKSHEETS, home=[["t", "dp"], ["pageview", "new_home"]])
+        sheet.revision = "2021-01-02T00:00:00.000Z"
+        records = get_worksheets_records(sheet, ["home"], cache=self.tmp.name)
+        self.assertEqual([{"t": "pageview", "dp": "new_home"}], records["home"])
+
+    def test_duplicate_headers(self):
+        sheet = FakeSpreadsheet({"home": [["t", "dp", "t"], ["pageview", "home", "x"]]})
+        with self.assertRaises(gaunit.TrackingPlanError):
+            get_worksheets_records(sheet)
+
+    def test_from_spreadsheet(self):
+        sheet = FakeSpreadsheet(WORKSHEETS)
+        tp = gaunit.TrackingPlan.from_spreadsheet(sheet, ["home", "add_to_cart"])
+        self.assertEqual(
+            [{"t": "pageview", "dp": "home"}, {"t": "event", "dp": "home", "ev": "3"}],
+            tp.get_expected_events("home"),
+        )
+        self.assertEqual(
+            [{"t": "event", "ea": "add", "pr1pr": "1000.5"}],
+            tp.get_expected_events("add_to_cart"),
+        )
+        self.assertEqual(["home", "add_to_cart"], list(tp.content))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+import unittest.mock
+
+import gaunit
+from gaunit.har import (
+    get_events_from_har,
+    get_ga_requests_from_har_mmap,
+    iter_ga_requests_from_har_file,
+    iter_har_entries,
+)
+
+from tests.utils import generate_mock_har
+
+
+class test_har(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.har")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _dump(self, har, **kwargs):
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump(har, f, **kwargs)
+
+    def test_iter_har_entries_skips_other_fields(self):
+        har = {
+            "log": {
+                "version": "1.2",
+                "pages": [{"id": "page_1", "title": 'a "quoted" [title] {}'}],
+                "entries": [
+                    {
+                        "startedDateTime": "2021-01-04T22:08:48.162+01:00",
+                        "time": 12.5,
+                        "cache": {},
+                        "request": {"method": "GET", "url": "https://domain.com"},
+                        "response": {
+                            "status": 200,
+                            "content": {"text": 'QUJD\\"}]' * 1000, "size": None},
+                        },
+                        "_fromCache": False,
+                    }
+                ],
+            },
+        }
+        self._dump(har, indent=4)
+        entries = list(iter_har_entries(self.path))
+        self.assertEqual(
+            [{"request": {"method": "GET", "url": "https://domain.com"}}], entries
+        )
+
+    def test_iter_har_entries_small_chunks(self):
+        har = generate_mock_har("A", "B", "C")
+        har["log"]["entries"][1]["response"] = {"content": {"text": "x" * 100}}
+        self._dump(har)
+        with unittest.mock.patch("gaunit.har.CHUNK_SIZE", 7):
+            entries = list(iter_har_entries(self.path))
+        self.assertEqual(
+            [{"request": e["request"]} for e in har["log"]["entries"]], entries
+        )
+
+    def test_iter_har_entries_deeply_nested(self):
+        har = generate_mock_har("A", "B")
+        nested = "x"
+        for i in range(20):
+            nested = [{"k": nested, "s": '}]"\\'}] if i % 2 else {"k": [nested]}
+        har["log"]["entries"][0]["response"] = nested
+        self._dump(har)
+        for chunk_size in (7, 1 << 20):
+            with unittest.mock.patch("gaunit.har.CHUNK_SIZE", chunk_size):
+                entries = list(iter_har_entries(self.path))
+            self.assertEqual(
+                [{"request": e["request"]} for e in har["log"]["entries"]], entries
+            )
+
+    def test_iter_har_entries_invalid(self):
+        with open(self.path, "w", encoding="utf8") as f:
+            f.write('{"log": {"entries": [{"request": {"url": "https://domain.com"}')
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_har_entries(self.path))
+
+    def test_iter_ga_requests_from_har_file(self):
+        har = {
+            "log": {
+                "entries": [
+                    {"request": {"url": "https://domain.com"}},
+                    {"request": {"url": "https://www.google-analytics.com/collect"}},
+                    {"request": {"url": "https://domain.com"}},
+                ]
+            }
+        }
+        self._dump(har)
+        requests = list(iter_ga_requests_from_har_file(self.path))
+        self.assertEqual(
+            [{"url": "https://www.google-analytics.com/collect"}], requests
+        )
+
+    def test_same_requests_as_get_ga_requests_from_har(self):
+        here = os.path.dirname(os.path.realpath(__file__))
+        path = os.path.join(here, "test_cli_mock.har")
+        har = gaunit.utils.open_json(path)
+        self.assertEqual(
+            gaunit.utils.get_ga_requests_from_har(har),
+            list(iter_ga_requests_from_har_file(path)),
+        )
+
+    def test_check_har_path(self):
+        self._dump(generate_mock_har("A", "B", "C"))
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}, {"dp": "C"}])
+        r = gaunit.check_har("home_engie", tp, har_path=self.path)
+        self.assertEqual([True, True], r.checklist_expected_events)
+        self.assertEqual([True, False, True], r.checklist_actual_events)
+
+    def _assert_same_requests_mmap(self, fallback=False, **kwargs):
+        """raw scan finds the same requests as the full parser"""
+        expected = list(iter_ga_requests_from_har_file(self.path, **kwargs))
+        with unittest.mock.patch(
+            "gaunit.har.iter_ga_requests_from_har_file",
+            wraps=iter_ga_requests_from_har_file,
+        ) as full_parser:
+            requests = get_ga_requests_from_har_mmap(self.path, **kwargs)
+        self.assertEqual(expected, requests)
+        self.assertEqual(fallback, full_parser.called)
+        return requests
+
+    def test_get_ga_requests_from_har_mmap(self):
+        ga = "https://www.google-analytics.com"
+        har = generate_mock_har("A", "B", "C")
+        entries = har["log"]["entries"]
+        entries[0]["request"]["headers"] = [
+            {"name": ":authority", "value": "www.google-analytics.com"}
+        ]
+        entries[0]["response"] = {"content": {"text": '{"url": "%s/collect"}' % ga}}
+        entries[1]["_initiator"] = {"type": "script", "url": ga + "/analytics.js"}
+        entries[1]["request"]["postData"] = {"text": "en=page_view\r\nen=scroll"}
+        entries.insert(1, {"request": {"url": "https://domain.com/?r=" + ga}})
+        har["log"]["pages"] = [{"id": "page_1", "title": ga + "/collect"}]
+        self._dump(har)
+        self.assertEqual(3, len(self._assert_same_requests_mmap()))
+        # other layouts
+        self._dump(har, indent=4)
+        self._assert_same_requests_mmap()
+        with open(self.path, "w", encoding="utf8") as f:
+            f.write(json.dumps(har).replace("/", "\\/"))
+        self._assert_same_requests_mmap()
+
+    def test_get_ga_requests_from_har_mmap_chrome(self):
+        ga = "https://www.google-analytics.com"
+        har = generate_mock_har("A", "B")
+        for entry in har["log"]["entries"]:
+            request = entry.pop("request")
+            # entries exported by Chrome DevTools: request after private fields
+            entry["_initiator"] = {
+                "type": "script",
+                "stack": {"callFrames": [{"url": ga + "/analytics.js"}]},
+            }
+            entry["_priority"] = "Low"
+            entry["_resourceType"] = "ping"
+            entry["request"] = request
+        har["log"]["entries"].append(
+            {"request": {"url": 'https://domain.com/?q="x"&r=' + ga + "/collect"}}
+        )
+        self._dump(har, indent=2)
+        self.assertEqual(2, len(self._assert_same_requests_mmap()))
+
+    def test_get_ga_requests_from_har_mmap_real_hars(self):
+        here = os.path.dirname(os.path.realpath(__file__))
+        for name in ("test_cli_mock.har", "test_cli_ss_mock.har"):
+            with self.subTest(har=name):
+                self.path = os.path.join(here, name)
+                self._assert_same_requests_mmap()
+                self._assert_same_requests_mmap(
+                    transport_url=["https://www.google-analytics.com", "https://ss.com"]
+                )
+
+    def test_get_ga_requests_from_har_mmap_fallback(self):
+        # "url" not in a request object
+        self._dump({"log": {"pages": [{"url": "https://www.google-analytics.com/"}]}})
+        self._assert_same_requests_mmap(fallback=True)
+        # request nested too deep to be skipped by regex
+        har = generate_mock_har("A")
+        nested = []
+        for _ in range(10):
+            nested = [nested]
+        har["log"]["entries"][0]["request"]["headers"] = nested
+        self._dump(har)
+        self._assert_same_requests_mmap(fallback=True)
+        # not a HAR object
+        self._dump([])
+        with self.assertRaises(json.JSONDecodeError):
+            get_ga_requests_from_har_mmap(self.path)
+        # empty file
+        open(self.path, "w").close()
+        with self.assertRaises(json.JSONDecodeError):
+            get_ga_requests_from_har_mmap(self.path)
+
+    def test_get_events_from_har_mmap(self):
+        self._dump(generate_mock_har("A", "B", "C"))
+        stats = gaunit.stats.Stats()
+        events = get_events_from_har(har_path=self.path, use_mmap=True, stats=stats)
+        self.assertEqual(get_events_from_har(har_path=self.path), events)
+        self.assertEqual(3, stats.counters["requests"])
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}, {"dp": "C"}])
+        r = gaunit.check_har("home_engie", tp, har_path=self.path, use_mmap=True)
+        self.assertEqual([True, True], r.checklist_expected_events)
+
+
+if __name__ == "__main__":
+    unittest.main()
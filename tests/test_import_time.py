@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+import unittest
+
+import gaunit
+
+from tests.utils import FakeSpreadsheet
+
+# `ga` is called thousands of times in CI: importing gaunit must stay cheap
+IMPORT_BUDGET = 0.15  # seconds, cumulative import time of gaunit package
+
+# heavy modules only imported by the features which need them
+LAZY_MODULES = (
+    "gspread",  # TrackingPlan.from_spreadsheet (optional)
+    "colorama",  # colored output
+    "pprint",  # printing results
+    "numpy",  # EventTable (optional)
+    "asyncio",  # collect server
+    "concurrent.futures",  # check-dir / extract-dir
+)
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def _imported_modules(module: str) -> list:
+    code = "import sys, json, %s; print(json.dumps(list(sys.modules)))" % module
+    return json.loads(_run(code).stdout)
+
+
+def _import_time(module: str) -> float:
+    """cumulative import time of module, in seconds (from ``python -X importtime``)"""
+    for line in _run("import %s" % module).stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e6
+    raise ValueError("module '%s' not found in import times" % module)
+
+
+class test_import_time(unittest.TestCase):
+    def test_lazy_modules(self):
+        for module in ("gaunit", "gaunit.cli"):
+            with self.subTest(module=module):
+                imported = _imported_modules(module)
+                self.assertEqual([], [m for m in LAZY_MODULES if m in imported])
+
+    def test_import_budget(self):
+        # best of 3 runs, to be robust to a busy CI runner
+        best = min(_import_time("gaunit") for _ in range(3))
+        self.assertLess(best, IMPORT_BUDGET)
+
+    def test_from_spreadsheet_without_gspread(self):
+        sheet = FakeSpreadsheet({"home": [["t", "dp"], ["pageview", "home"]]})
+        tp = gaunit.TrackingPlan.from_spreadsheet(sheet)
+        self.assertEqual(
+            [{"t": "pageview", "dp": "home"}], tp.get_expected_events("home")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
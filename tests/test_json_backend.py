@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import unittest.mock
+
+import gaunit
+from gaunit.har import get_events_from_har, iter_har_entries
+from gaunit.json_backend import (
+    BACKENDS,
+    ENV_VAR,
+    JsonBackend,
+    _load_backend,
+    get_json_backend,
+)
+from gaunit.perf_log import get_events_from_perf_log
+
+from tests.utils import generate_mock_har, generate_mock_perf_log
+
+
+class test_json_backend(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _backend(self, name) -> JsonBackend:
+        try:
+            return get_json_backend(name)
+        except ImportError:
+            self.skipTest("JSON backend '%s' is not installed" % name)
+
+    def _path(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf8") as f:
+            f.write(content)
+        return path
+
+    def test_get_json_backend(self):
+        backend = get_json_backend("json")
+        self.assertEqual("json", backend.name)
+        self.assertIs(backend, get_json_backend(backend))
+        self.assertIs(backend, get_json_backend("JSON"))
+        self.assertIn(get_json_backend().name, BACKENDS)
+
+    def test_get_json_backend_env_var(self):
+        with unittest.mock.patch.dict(os.environ, {ENV_VAR: "json"}):
+            self.assertEqual("json", get_json_backend().name)
+        with unittest.mock.patch.dict(os.environ, {ENV_VAR: "foo"}):
+            with self.assertRaises(ValueError):
+                get_json_backend()
+
+    def test_get_json_backend_not_installed(self):
+        _load_backend.cache_clear()
+        try:
+            with unittest.mock.patch.dict("sys.modules", {"ujson": None}):
+                with self.assertRaisesRegex(ImportError, "pip install ujson"):
+                    get_json_backend("ujson")
+        finally:
+            _load_backend.cache_clear()
+
+    def test_backends_loads(self):
+        obj = {"t": "pageview", "dt": "Accueil é 🚀", "ev": 1.5, "ni": None}
+        data = json.dumps(obj, ensure_ascii=False).encode("utf8")
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = self._backend(name)
+                self.assertEqual(obj, backend.loads(data))
+                self.assertEqual(obj, backend.loads(data.decode("utf8")))
+                with self.assertRaises(ValueError):
+                    backend.loads(b'{"t": ')
+
+    def test_backends_same_har_events(self):
+        har = generate_mock_har("Accueil é", "A\\B", '"C"')
+        har["log"]["entries"][1]["response"] = {"content": {"text": "é" * 100}}
+        path = self._path("test.har", json.dumps(har, ensure_ascii=False))
+        expected = get_events_from_har(har)
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = self._backend(name)
+                # small chunks: multibyte chars are split between chunks
+                with unittest.mock.patch("gaunit.har.CHUNK_SIZE", 5):
+                    self.assertEqual(
+                        [{"request": e["request"]} for e in har["log"]["entries"]],
+                        list(iter_har_entries(path, backend)),
+                    )
+                events = get_events_from_har(har_path=path, json_backend=backend)
+                self.assertEqual(expected, events)
+
+    def test_backends_same_perf_log_events(self):
+        log = generate_mock_perf_log("Accueil é", "B")
+        path = self._path(
+            "perf_log.jsonl", "\n".join(json.dumps(e, ensure_ascii=False) for e in log)
+        )
+        expected = get_events_from_perf_log(log)
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = self._backend(name)
+                self.assertEqual(
+                    expected, get_events_from_perf_log(log, json_backend=backend)
+                )
+                self.assertEqual(
+                    expected,
+                    get_events_from_perf_log(perf_log_path=path, json_backend=backend),
+                )
+
+    def test_tracking_plan_json(self):
+        path = os.path.join(self.tmp.name, "tracking_plan.json")
+        tp = gaunit.TrackingPlan.from_events("home", [{"t": "pageview", "dp": "é"}])
+        tp.to_json(path)
+        with open(path, encoding="utf8") as f:
+            self.assertEqual(  # same output as before JSON backends
+                '{"test_cases": {"home": {"events": [{"t": "pageview", "dp": "\\u00e9"}]}}}',
+                f.read(),
+            )
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = self._backend(name)
+                tp2 = gaunit.TrackingPlan.from_json(path, json_backend=backend)
+                self.assertEqual(tp.content, tp2.content)
+
+
+if __name__ == "__main__":
+    unittest.main()
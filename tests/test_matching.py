@@ -0,0 +1,289 @@
+import random
+import unittest
+
+import gaunit
+from gaunit.matching import (
+    EventIndex,
+    IncrementalMatcher,
+    _hopcroft_karp,
+    check_index,
+    check_matching,
+    check_ordered,
+    check_scan,
+)
+from gaunit.stats import Stats
+
+from tests.utils import generate_mock_har
+
+
+class test_EventIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events = [
+            {"t": "pageview", "dp": "A"},
+            {"t": "event", "dp": "A", "ea": "click"},
+            {"t": "pageview", "dp": "B"},
+            {"t": "event", "dp": "B", "ea": "click"},
+        ]
+        self.index = EventIndex(self.events)
+
+    def test_postings(self):
+        self.assertEqual([0, 2], self.index.postings[("t", "pageview")])
+        self.assertEqual([1, 3], self.index.postings[("ea", "click")])
+
+    def test_find(self):
+        self.assertEqual(1, self.index.find({"ea": "click"}))
+        self.assertEqual(3, self.index.find({"ea": "click"}, start=2))
+        self.assertEqual(3, self.index.find({"ea": "click", "dp": "B"}))
+        self.assertIsNone(self.index.find({"ea": "click", "dp": "C"}))
+        self.assertIsNone(self.index.find({"t": "pageview"}, start=3))
+
+    def test_find_empty_expected_event(self):
+        self.assertEqual(2, self.index.find({}, start=2))
+        self.assertIsNone(self.index.find({}, start=4))
+
+
+class test_engines(unittest.TestCase):
+    def test_same_checklists_as_scan(self):
+        rnd = random.Random(42)
+        params = {"t": ["pageview", "event"], "dp": list("ABCD"), "ea": ["x", "y"]}
+
+        def random_event(max_params):
+            keys = rnd.sample(sorted(params), rnd.randint(0, max_params))
+            return {k: rnd.choice(params[k]) for k in keys}
+
+        for _ in range(200):
+            expected = [random_event(2) for _ in range(rnd.randint(0, 8))]
+            actual = [random_event(3) for _ in range(rnd.randint(0, 20))]
+            for ordered in (True, False):
+                self.assertEqual(
+                    check_scan(expected, actual, ordered),
+                    check_index(expected, actual, ordered),
+                )
+            self.assertEqual(
+                check_scan(expected, actual, strict=False),
+                check_index(expected, actual, strict=False),
+            )
+
+    def test_test_case_check_engines(self):
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}, {"dp": "C"}])
+        tc = gaunit.TestCase("home_engie", tp, har=generate_mock_har("C", "A", "C"))
+        self.assertEqual(
+            tc.check(engine="scan"),
+            tc.check(engine="index"),
+        )
+
+    def test_test_case_check_unknown_engine(self):
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}])
+        tc = gaunit.TestCase("home_engie", tp, har=generate_mock_har("A"))
+        with self.assertRaises(ValueError):
+            tc.check(engine="dummy")
+
+
+class test_check_ordered(unittest.TestCase):
+    def test_strict(self):
+        expected = [{"dp": "A"}, {"dp": "A"}, {"dp": "B"}]
+        actual = [{"dp": "A"}, {"dp": "B"}, {"dp": "A"}, {"dp": "B"}]
+        # each event satisfies one expected event at most
+        self.assertEqual(
+            ([True, True, True], [True, False, True, True]),
+            check_ordered(expected, actual),
+        )
+        self.assertEqual(
+            ([True, True, False], [True, False, True]),
+            check_ordered(expected, actual[:3]),
+        )
+        # original behavior: first event satisfies both expected "A"
+        self.assertEqual(
+            ([True, True, True], [True, True, False, False]),
+            check_ordered(expected, actual, strict=False),
+        )
+
+    def test_test_case_check_strict(self):
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}, {"dp": "A"}])
+        har = generate_mock_har("A", "B")
+        r = gaunit.check_har("home", tp, har=har)
+        self.assertEqual([True, False], r.checklist_expected_events)
+        r = gaunit.check_har("home", tp, har=har, strict=False)
+        self.assertEqual([True, True], r.checklist_expected_events)
+        tc = gaunit.TestCase("home", tp, har=har)
+        self.assertEqual(tc.check(engine="scan"), tc.check())
+
+    def test_each_candidate_tested_once(self):
+        actual = [{"en": "page_view", "k": "a"}, {"en": "scroll", "k": "b"}] * 10000
+        # never found: all events holding one of its params are tested, but only once
+        expected = [{"en": "page_view", "k": "b"}, {"en": "page_view"}] * 5000
+        stats = Stats()
+        found, used = check_ordered(expected, actual, stats=stats)
+        self.assertEqual([False, True] * 5000, found)
+        self.assertEqual(5000, sum(used))
+        self.assertLessEqual(stats.counters["comparisons"], len(actual) + len(expected))
+
+
+def _assert_one_to_one(test, expected, actual, matches):
+    """each expected event is matched with a distinct actual event holding its params"""
+    positions = [p for p in matches if p is not None]
+    test.assertEqual(len(positions), len(set(positions)))
+    for t, p in zip(expected, matches):
+        if p is not None:
+            test.assertLessEqual(t.items(), actual[p].items())
+
+
+def _maximum_matching_size(adjacency: list) -> int:
+    """brute force: best of all assignments"""
+    best = 0
+
+    def assign(u, used, size):
+        nonlocal best
+        best = max(best, size)
+        if u == len(adjacency):
+            return
+        assign(u + 1, used, size)
+        for v in adjacency[u]:
+            if v not in used:
+                assign(u + 1, used | {v}, size + 1)
+
+    assign(0, frozenset(), 0)
+    return best
+
+
+class test_check_matching(unittest.TestCase):
+    def test_one_to_one(self):
+        expected = [{"t": "pageview"}, {"t": "pageview"}, {"dp": "A"}]
+        actual = [{"t": "pageview", "dp": "A"}, {"t": "event"}]
+        self.assertEqual(
+            ([True, False, False], [True, False]), check_matching(expected, actual)
+        )
+        actual.append({"t": "pageview", "dp": "B"})
+        self.assertEqual(
+            ([True, True, False], [True, False, True]), check_matching(expected, actual)
+        )
+
+    def test_maximum(self):
+        # first-fit would use first actual event for first expected event
+        expected = [{"dp": "A"}, {"dp": "A", "t": "event"}]
+        actual = [{"dp": "A", "t": "event"}, {"dp": "A", "t": "pageview"}]
+        self.assertEqual(([True, True], [True, True]), check_matching(expected, actual))
+        self.assertEqual(
+            ([True, True], [True, False]), check_scan(expected, actual, False)
+        )
+
+    def test_hopcroft_karp_is_maximum(self):
+        rnd = random.Random(3)
+        for _ in range(300):
+            right = rnd.randint(0, 7)
+            groups = rnd.randint(1, 4)
+            candidates = [
+                sorted(rnd.sample(range(right), rnd.randint(0, right)))
+                for _ in range(groups)
+            ]
+            group_of = [rnd.randrange(groups) for _ in range(rnd.randint(0, 7))]
+            adjacency = [candidates[g] for g in group_of]
+            match_left, match_right = _hopcroft_karp(adjacency, group_of, groups, right)
+            self.assertEqual(
+                _maximum_matching_size(adjacency),
+                sum(v != -1 for v in match_left),
+            )
+            for u, v in enumerate(match_left):
+                if v != -1:
+                    self.assertIn(v, adjacency[u])
+                    self.assertEqual(u, match_right[v])
+
+    def test_large_sessions(self):
+        actual = [
+            {"t": "event", "ea": str(i % 50), "dp": str(i % 7)} for i in range(20000)
+        ]
+        expected = (
+            [{"t": "event"}] * 3000
+            + [{"ea": str(i % 50)} for i in range(5000)]
+            + [{"ea": "1", "dp": str(i % 7)} for i in range(2000)]
+        )
+        found, used = check_matching(expected, actual)
+        # 400 events hold "ea": "1", shared by 2100 expected events
+        self.assertEqual(8300, sum(found))
+        self.assertEqual(8300, sum(used))
+
+    def test_test_case_check_unordered(self):
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}, {"dp": "A"}])
+        har = generate_mock_har("A", "B")
+        r = gaunit.check_har("home", tp, har=har, ordered=False)
+        self.assertEqual([True, False], r.checklist_expected_events)
+        # original engine: one event satisfies both expected events
+        tc = gaunit.TestCase("home", tp, har=har)
+        self.assertEqual(([True, True], [True, False]), tc.check(False, "scan"))
+
+
+class test_IncrementalMatcher(unittest.TestCase):
+    def test_same_checklists_as_batch_check(self):
+        rnd = random.Random(7)
+        params = {"t": ["pageview", "event"], "dp": list("ABCD"), "ea": ["x", "y"]}
+
+        def random_event(max_params):
+            keys = rnd.sample(sorted(params), rnd.randint(0, max_params))
+            return {k: rnd.choice(params[k]) for k in keys}
+
+        for _ in range(200):
+            expected = [random_event(2) for _ in range(rnd.randint(0, 8))]
+            actual = [random_event(3) for _ in range(rnd.randint(0, 15))]
+            m = IncrementalMatcher(expected)
+            for i, event in enumerate(actual):
+                m.feed(event)
+                checklists = check_scan(expected, actual[: i + 1])
+                self.assertEqual(checklists, m.checklists())
+                self.assertEqual(all(checklists[0]), m.satisfied)
+
+    def test_not_strict(self):
+        rnd = random.Random(11)
+        params = {"t": ["pageview", "event"], "dp": list("ABC")}
+
+        def random_event(max_params):
+            keys = rnd.sample(sorted(params), rnd.randint(0, max_params))
+            return {k: rnd.choice(params[k]) for k in keys}
+
+        for _ in range(100):
+            expected = [random_event(2) for _ in range(rnd.randint(0, 8))]
+            actual = [random_event(2) for _ in range(rnd.randint(0, 15))]
+            m = IncrementalMatcher(expected, strict=False)
+            for event in actual:
+                m.feed(event)
+            self.assertEqual(check_scan(expected, actual, strict=False), m.checklists())
+
+    def test_unordered_matches_stay_maximum(self):
+        rnd = random.Random(7)
+        params = {"t": ["pageview", "event"], "dp": list("ABCD"), "ea": ["x", "y"]}
+
+        def random_event(max_params):
+            keys = rnd.sample(sorted(params), rnd.randint(0, max_params))
+            return {k: rnd.choice(params[k]) for k in keys}
+
+        for _ in range(200):
+            expected = [random_event(2) for _ in range(rnd.randint(0, 8))]
+            actual = [random_event(3) for _ in range(rnd.randint(0, 15))]
+            m = IncrementalMatcher(expected, ordered=False)
+            for i, event in enumerate(actual):
+                m.feed(event)
+                found, _ = check_matching(expected, actual[: i + 1])
+                self.assertEqual(sum(found), sum(m.checklists()[0]))
+                self.assertEqual(all(found), m.satisfied)
+            _assert_one_to_one(self, expected, actual, m.matches)
+
+    def test_unordered_new_event_moves_matches(self):
+        m = IncrementalMatcher([{"dp": "A"}, {"dp": "A", "t": "event"}], ordered=False)
+        m.feed({"dp": "A", "t": "event"})
+        self.assertEqual([0, None], m.matches)
+        m.feed({"dp": "A"})  # only satisfies first expected event
+        self.assertEqual([1, 0], m.matches)
+        self.assertTrue(m.satisfied)
+
+    def test_later_match_revokes_following_matches(self):
+        m = IncrementalMatcher([{"dp": "A"}, {"dp": "B"}])
+        m.feed({"dp": "B"})
+        self.assertEqual(([False, True], [True]), m.checklists())
+        m.feed({"dp": "A"})  # "B" was sent before "A"
+        self.assertEqual(([True, False], [False, True]), m.checklists())
+        self.assertFalse(m.satisfied)
+        m.feed({"dp": "B"})
+        self.assertTrue(m.satisfied)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -43,6 +43,22 @@ class test_TrackingPlan(unittest.TestCase):
         tp.add_test_case("home_engie", [{"dp": "X"}])
         self.assertEqual(tp.content, {"home_engie": {"events": [{"dp": "X"}]}})
 
+    def test_update_test_case_keeps_property(self):
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}], "UA-1")
+        tp.update_test_case("home", [{"dp": "B"}])
+        self.assertEqual("UA-1", tp.get_property("home"))
+        self.assertEqual([{"dp": "B"}], tp.get_expected_events("home"))
+        tp.update_test_case("home", [{"dp": "B"}], "G-XYZ")
+        self.assertEqual("G-XYZ", tp.get_property("home"))
+
+    def test_add_test_case_with_property(self):
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}], "G-XYZ")
+        self.assertEqual("G-XYZ", tp.get_property("home"))
+        tp.add_test_case("product", [{"dp": "B"}])
+        self.assertIsNone(tp.get_property("product"))
+        with self.assertRaises(gaunit.TrackingPlanError):
+            tp.get_property("dummy")
+
     def test_get_expected_events_missing_test_case(self):
         events = []
         tp = gaunit.TrackingPlan()
@@ -178,6 +194,83 @@ class test_TestCase(unittest.TestCase):
             self.tc.check()
 
 
+class test_TestCase_feed(unittest.TestCase):
+    def setUp(self) -> None:
+        tp = gaunit.TrackingPlan()
+        tp.add_test_case("home_engie", [{"dp": "A"}, {"dp": "B"}, {"dp": "C"}])
+        self.tp = tp
+        self.tc = gaunit.TestCase("home_engie", tp)
+
+    def test_feed_events(self):
+        for dp in ("A", "x", "B"):
+            self.assertEqual(1, self.tc.feed({"dp": dp}))
+            self.assertFalse(self.tc.satisfied)
+        self.tc.feed({"dp": "C"})
+        self.assertTrue(self.tc.satisfied)
+        self.assertEqual(
+            ([True, True, True], [True, False, True, True]), self.tc.check()
+        )
+
+    def test_feed_requests(self):
+        url = "https://www.google-analytics.com/collect?v=1&t=pageview&dp=%s"
+        self.assertEqual(1, self.tc.feed(url % "A"))
+        self.assertEqual(0, self.tc.feed("https://example.com/?dp=B"))
+        post = {
+            "method": "POST",
+            "url": "https://www.google-analytics.com/g/collect?v=2",
+            "postData": {"text": "dp=B\r\ndp=C"},
+        }
+        self.assertEqual(2, self.tc.feed(post))
+        self.assertEqual(
+            [{"v": "1", "t": "pageview", "dp": "A"}, {"dp": "B", "v": "2"}],
+            self.tc.actual_events[:2],
+        )
+        self.assertTrue(self.tc.satisfied)
+
+    def test_feed_other_property(self):
+        tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}], "UA-1-1")
+        tc = gaunit.TestCase("home", tp)
+        self.assertEqual(0, tc.feed({"tid": "UA-2-1", "dp": "A"}))
+        self.assertFalse(tc.satisfied)
+        self.assertEqual(1, tc.feed({"tid": "UA-1-1", "dp": "A"}))
+        self.assertTrue(tc.satisfied)
+        self.assertEqual(1, len(tc.actual_events))
+
+    def test_same_result_as_batch_check(self):
+        events = [{"dp": dp} for dp in ("C", "A", "x", "B", "A", "C")]
+        tc = gaunit.TestCase("home_engie", self.tp)
+        tc.load_events(events)
+        for event in events:
+            self.tc.feed(event)
+        self.assertEqual(tc.check(), self.tc.check())
+        self.assertEqual(tc.check(ordered=False), self.tc.check(ordered=False))
+        r = self.tc.result()
+        self.assertEqual(tc.result().checklist_actual_events, r.checklist_actual_events)
+        self.assertEqual(events, r.actual_events)
+
+    def test_feed_after_load(self):
+        events = [{"dp": "A"}, {"dp": "B"}]
+        self.tc.load_events(events)
+        self.assertFalse(self.tc.satisfied)
+        self.tc.feed({"dp": "C"})
+        self.assertTrue(self.tc.satisfied)
+        self.assertEqual(2, len(events))  # loaded events are not modified
+        self.tc.load_events([{"dp": "C"}])
+        self.assertFalse(self.tc.satisfied)
+
+    def test_wait_until_satisfied(self):
+        polls = iter([[{"dp": "A"}], [], [{"dp": "B"}, {"dp": "C"}], [{"dp": "D"}]])
+        self.assertTrue(self.tc.wait_until_satisfied(lambda: next(polls), interval=0))
+        self.assertEqual([{"dp": "D"}], next(polls))  # stopped as soon as satisfied
+
+    def test_wait_until_satisfied_timeout(self):
+        self.assertFalse(
+            self.tc.wait_until_satisfied(
+                lambda: [{"dp": "A"}], timeout=0.05, interval=0
+            )
+        )
+
+
 class test_TestCase_with_transport_url(unittest.TestCase):
     def setUp(self) -> None:
         events = [{"dp": "A"}, {"dp": "B"}, {"dp": "C"}]
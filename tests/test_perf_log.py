@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+
+import gaunit
+from gaunit.perf_log import get_events_from_perf_log, iter_perf_log_file
+from gaunit.utils import iter_ga_requests_from_browser_perf_log
+
+from tests.utils import generate_mock_perf_log
+
+
+def _entry(method, params):
+    message = {"message": {"method": method, "params": params}}
+    return {"level": "INFO", "message": json.dumps(message)}
+
+
+class test_perf_log(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "perf_log.jsonl")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_iter_ga_requests_dedupe_by_request_id(self):
+        url = "https://www.google-analytics.com/collect?v=1&dp=A"
+        log = [
+            _entry(
+                "Network.requestWillBeSent", {"requestId": "1", "request": {"url": url}}
+            ),
+            # redirect: same request id
+            _entry(
+                "Network.requestWillBeSent",
+                {"requestId": "1", "request": {"url": url + "&z=1"}},
+            ),
+            _entry(
+                "Network.responseReceived", {"requestId": "1", "response": {"url": url}}
+            ),
+            _entry(
+                "Network.requestWillBeSent", {"requestId": "2", "request": {"url": url}}
+            ),
+        ]
+        self.assertEqual([url, url], list(iter_ga_requests_from_browser_perf_log(log)))
+
+    def test_iter_ga_requests_skips_noise(self):
+        log = [
+            _entry("Page.frameNavigated", {"url": "https://www.google-analytics.com/"}),
+            _entry("Network.dataReceived", {"requestId": "1"}),
+            _entry(
+                "Network.requestWillBeSent",
+                {
+                    "requestId": "2",
+                    "request": {"url": "https://www.example.com/collect"},
+                },
+            ),
+            {"message": "Network.request www.google-analytics.com, not JSON"},
+        ]
+        self.assertEqual([], list(iter_ga_requests_from_browser_perf_log(log)))
+
+    def test_iter_perf_log_file_jsonl(self):
+        log = generate_mock_perf_log("A", "B")
+        with open(self.path, "w", encoding="utf8") as f:
+            for entry in log:
+                f.write(json.dumps(entry) + "\n")
+            f.write("\n")
+        self.assertEqual(log, list(iter_perf_log_file(self.path)))
+
+    def test_iter_perf_log_file_json(self):
+        log = generate_mock_perf_log("A", "B")
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump(log, f, indent=2)
+        self.assertEqual(log, list(iter_perf_log_file(self.path)))
+
+    def test_iter_perf_log_file_empty(self):
+        open(self.path, "w").close()
+        self.assertEqual([], list(iter_perf_log_file(self.path)))
+
+    def test_get_events_from_perf_log_path(self):
+        log = generate_mock_perf_log("A", "B")
+        with open(self.path, "w", encoding="utf8") as f:
+            f.write("\n".join(json.dumps(entry) for entry in log))
+        self.assertEqual(
+            get_events_from_perf_log(perf_log=log),
+            get_events_from_perf_log(perf_log_path=self.path),
+        )
+
+    def test_get_events_from_perf_log_xor(self):
+        with self.assertRaises(gaunit.DictXORJsonPathError):
+            get_events_from_perf_log()
+        with self.assertRaises(gaunit.DictXORJsonPathError):
+            get_events_from_perf_log(generate_mock_perf_log("A"), self.path)
+
+    def test_check_perf_log_path(self):
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}, {"dp": "B"}])
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump(generate_mock_perf_log("A", "B"), f)
+        r = gaunit.check_perf_log("home_engie", tp, perf_log_path=self.path)
+        self.assertTrue(r.was_successful())
+        cache = os.path.join(self.tmp.name, "cache")
+        results = gaunit.check_perf_log_all(tp, perf_log_path=self.path, cache=cache)
+        self.assertTrue(results["home_engie"].was_successful())
+
+
+if __name__ == "__main__":
+    unittest.main()
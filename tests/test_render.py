@@ -0,0 +1,133 @@
+import contextlib
+import io
+import json
+import unittest
+
+import gaunit
+from gaunit.render import (
+    JsonRenderer,
+    NdjsonRenderer,
+    Renderer,
+    TextRenderer,
+    get_renderer,
+)
+
+from tests.utils import generate_mock_har
+
+
+class _Tty(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class test_render(unittest.TestCase):
+    def setUp(self) -> None:
+        tp = gaunit.TrackingPlan()
+        tp.add_test_case("home", [{"dp": "A"}, {"dp": "B"}])
+        tp.add_test_case("search", [{"dp": "A"}, {"dp": "Z"}])
+        self.results = gaunit.check_har_all(tp, har=generate_mock_har("A", "B", "C"))
+
+    def test_text(self):
+        out = io.StringIO()
+        TextRenderer(out).result(self.results["search"])
+        expected = [
+            "events in tracking plan: 2",
+            80 * "=",
+            "{'dp': 'Z'}",
+            67 * " " + "  ... missing",
+            80 * "-",
+            "GA events found: total:3 / ok:1 / missing:1",
+            "\N{CROSS MARK} FAILED: events missing",
+        ]
+        self.assertEqual("\n".join(expected) + "\n", out.getvalue())
+        # same as print_result
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.results["search"].print_result()
+        self.assertEqual(out.getvalue(), stdout.getvalue())
+
+    def test_color_only_on_tty(self):
+        out = io.StringIO()
+        TextRenderer(out).result(self.results["search"])
+        self.assertNotIn("\x1b[", out.getvalue())
+        out = _Tty()
+        TextRenderer(out).result(self.results["search"])
+        self.assertIn("\x1b[31mmissing\x1b[0m", out.getvalue())
+
+    def test_long_event_pretty_printed(self):
+        event = {"dp": "x" * 100, "t": "pageview"}
+        self.assertEqual(
+            "{'dp': '%s',\n 't': 'pageview'}" % ("x" * 100),
+            TextRenderer(io.StringIO()).format_event(event),
+        )
+
+    def test_json(self):
+        out = io.StringIO()
+        JsonRenderer(out).result(self.results["search"], "search", stats=True)
+        record = json.loads(out.getvalue())
+        # same bytes whatever JSON backends are installed
+        self.assertIn('{"event": {"dp": "A"}, "found": true}', out.getvalue())
+        self.assertEqual("search", record["test_case"])
+        self.assertFalse(record["successful"])
+        self.assertEqual((3, 1, 1), (record["total"], record["ok"], record["missing"]))
+        self.assertEqual(
+            [
+                {"event": {"dp": "A"}, "found": True},
+                {"event": {"dp": "Z"}, "found": False, "nearest": []},
+            ],
+            record["expected_events"],
+        )
+        self.assertEqual(
+            [True, False, False], [e["expected"] for e in record["actual_events"]]
+        )
+        self.assertIn("timings", record["stats"])
+
+    def test_json_results(self):
+        out = io.StringIO()
+        JsonRenderer(out).results(self.results)
+        doc = json.loads(out.getvalue())
+        self.assertEqual(2, doc["total"])
+        self.assertEqual(1, doc["failed"])
+        self.assertEqual(
+            ["home", "search"], [r["test_case"] for r in doc["test_cases"]]
+        )
+
+    def test_ndjson(self):
+        out = io.StringIO()
+        NdjsonRenderer(out).results(self.results)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        types = [r["type"] for r in records]
+        self.assertEqual(
+            ["expected_event"] * 2 + ["actual_event"] * 3 + ["result"], types[:6]
+        )
+        self.assertEqual({"type": "summary", "total": 2, "failed": 1}, records[-1])
+        self.assertEqual(13, len(records))
+        self.assertEqual(
+            {
+                "type": "result",
+                "test_case": "search",
+                "successful": False,
+                "total": 3,
+                "ok": 1,
+                "missing": 1,
+            },
+            records[-2],
+        )
+
+    def test_get_renderer(self):
+        self.assertIsInstance(get_renderer("ndjson"), NdjsonRenderer)
+        self.assertIsInstance(get_renderer(), TextRenderer)
+        with self.assertRaises(ValueError):
+            get_renderer("xml")
+
+    def test_incomplete_renderer(self):
+        class XmlRenderer(Renderer):
+            def _result(self, r, test_case_id, display_ok, nearest):
+                pass
+
+        with self.assertRaises(TypeError):
+            XmlRenderer(io.StringIO())
+
+
+if __name__ == "__main__":
+    unittest.main()
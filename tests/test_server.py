@@ -0,0 +1,153 @@
+import asyncio
+import json
+import unittest
+
+import gaunit
+from gaunit.server import CollectServer
+
+
+async def _request(port, raw: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+class test_CollectServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tp = gaunit.TrackingPlan()
+        self.tp.add_test_case("home_engie", [{"dp": "A"}, {"dp": "B"}, {"dp": "C"}])
+        self.tp.add_test_case("product_page", [{"dp": "D"}])
+
+    def test_handle_hit_get(self):
+        server = CollectServer(self.tp)
+        self.assertEqual(1, server.handle_hit("GET", "/collect?v=1&dp=A"))
+        self.assertEqual([{"v": "1", "dp": "A"}], server.events)
+        status = server.status()["test_cases"]["home_engie"]
+        self.assertEqual([True, False, False], status["checklist"])
+        self.assertFalse(status["satisfied"])
+
+    def test_handle_hit_post_ga4(self):
+        server = CollectServer(self.tp)
+        count = server.handle_hit("POST", "/g/collect?v=2", "dp=A\r\ndp=B&en=x\r\ndp=C")
+        self.assertEqual(3, count)
+        self.assertEqual({"v": "2", "dp": "B", "en": "x"}, server.events[1])
+        self.assertTrue(server.status()["test_cases"]["home_engie"]["satisfied"])
+
+    def test_handle_hit_batch(self):
+        server = CollectServer(self.tp)
+        count = server.handle_hit("POST", "/batch", "v=1&dp=D\nv=1&dp=E\n")
+        self.assertEqual(2, count)
+        self.assertTrue(server.status()["test_cases"]["product_page"]["satisfied"])
+
+    def test_properties(self):
+        self.tp.add_test_case("ga4", [{"dp": "A"}, {"dp": "B"}], "G-XYZ")
+        server = CollectServer(self.tp)
+        server.handle_hit("POST", "/g/collect?v=2&tid=G-ABC", "dp=A\r\ndp=B")
+        self.assertFalse(server.status()["test_cases"]["ga4"]["satisfied"])
+        server.handle_hit("POST", "/g/collect?v=2&tid=G-XYZ", "dp=A\r\ndp=B")
+        self.assertTrue(server.status()["test_cases"]["ga4"]["satisfied"])
+
+    def test_same_checklists_as_check(self):
+        server = CollectServer(self.tp)
+        for dp in ("C", "A", "x", "B", "C"):
+            server.handle_hit("GET", "/custom/path/collect?v=1&dp=%s" % dp)
+        results = gaunit.check_events_all(self.tp, server.events)
+        for test_case_id, r in results.items():
+            self.assertEqual(
+                r.checklist_expected_events,
+                server.status()["test_cases"][test_case_id]["checklist"],
+            )
+
+    def test_reset(self):
+        server = CollectServer(self.tp, test_case_ids=["product_page"])
+        server.handle_hit("GET", "/collect?v=1&dp=D")
+        server.reset()
+        self.assertEqual(
+            {
+                "hits": 0,
+                "events": 0,
+                "test_cases": {
+                    "product_page": {
+                        "satisfied": False,
+                        "found": 0,
+                        "expected": 1,
+                        "checklist": [False],
+                    }
+                },
+            },
+            server.status(),
+        )
+
+    def test_http(self):
+        server = CollectServer(self.tp, port=0)
+
+        async def scenario():
+            s = await server.start()
+            async with s:
+                port = server.port
+                gif = await _request(
+                    port, b"GET /collect?v=1&dp=D HTTP/1.1\r\nConnection: close\r\n\r\n"
+                )
+                body = b"dp=A\r\ndp=B\r\ndp=C"
+                post = await _request(
+                    port,
+                    b"POST /g/collect?v=2 HTTP/1.1\r\nContent-Length: %d\r\n"
+                    b"Connection: close\r\n\r\n%s" % (len(body), body),
+                )
+                status = await _request(port, b"GET /_gaunit/status HTTP/1.0\r\n\r\n")
+                not_found = await _request(port, b"GET /dummy HTTP/1.0\r\n\r\n")
+                return gif, post, status, not_found
+
+        gif, post, status, not_found = asyncio.run(scenario())
+        self.assertTrue(gif.startswith(b"HTTP/1.1 200 OK"))
+        self.assertIn(b"GIF89a", gif)
+        self.assertTrue(post.startswith(b"HTTP/1.1 204"))
+        self.assertTrue(not_found.startswith(b"HTTP/1.1 404"))
+        status = json.loads(status.split(b"\r\n\r\n", 1)[1])
+        self.assertEqual(2, status["hits"])
+        self.assertTrue(status["test_cases"]["home_engie"]["satisfied"])
+        self.assertTrue(status["test_cases"]["product_page"]["satisfied"])
+
+    def test_http_keep_alive(self):
+        server = CollectServer(self.tp, port=0)
+
+        async def scenario():
+            s = await server.start()
+            async with s:
+                raw = b"".join(
+                    b"GET /collect?v=1&dp=%s HTTP/1.1\r\nHost: x\r\n\r\n" % dp
+                    for dp in (b"A", b"B")
+                )
+                raw += b"GET /collect?v=1&dp=C HTTP/1.1\r\nConnection: close\r\n\r\n"
+                return await _request(server.port, raw)
+
+        response = asyncio.run(scenario())
+        self.assertEqual(3, response.count(b"HTTP/1.1 200 OK"))
+        self.assertEqual(3, len(server.events))
+
+    def test_http_line_too_long(self):
+        server = CollectServer(self.tp, port=0)
+        long_url = b"GET /collect?v=1&dp=%s HTTP/1.1\r\n\r\n" % (b"A" * 100000)
+        long_header = b"GET /collect?v=1&dp=A HTTP/1.1\r\nX: %s\r\n\r\n" % (
+            b"A" * 100000
+        )
+
+        async def scenario():
+            s = await server.start()
+            async with s:
+                return (
+                    await _request(server.port, long_url),
+                    await _request(server.port, long_header),
+                )
+
+        url_response, header_response = asyncio.run(scenario())
+        self.assertTrue(url_response.startswith(b"HTTP/1.1 414"))
+        self.assertTrue(header_response.startswith(b"HTTP/1.1 431"))
+        self.assertEqual(0, len(server.events))
+
+
+if __name__ == "__main__":
+    unittest.main()
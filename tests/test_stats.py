@@ -0,0 +1,135 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import gaunit
+import gaunit.stats
+from gaunit.stats import Stats
+
+from tests.utils import generate_mock_har
+
+
+class test_Stats(unittest.TestCase):
+    def test_stage_timings(self):
+        stats = Stats()
+        with stats.stage("match"):
+            pass
+        with stats.stage("match"):
+            stats.count("comparisons", 2)
+        stats.count("comparisons")
+        self.assertEqual(["match"], list(stats.timings))
+        self.assertGreaterEqual(stats.timings["match"], 0)
+        self.assertEqual({"comparisons": 3}, stats.counters)
+
+    def test_timed(self):
+        stats = Stats()
+        self.assertEqual([1, 2, 3], list(stats.timed([1, 2, 3], "decode", "entries")))
+        self.assertIn("decode", stats.timings)
+        self.assertEqual({"entries": 3}, stats.counters)
+
+    def test_update(self):
+        a, b = Stats(), Stats()
+        a.add_time("extract", 1.0)
+        a.count("events", 2)
+        b.add_time("extract", 0.5)
+        b.count("events", 1)
+        b.count("entries", 4)
+        a.update(b)
+        self.assertEqual({"extract": 1.5}, a.timings)
+        self.assertEqual({"events": 3, "entries": 4}, a.counters)
+
+    def test_hooks(self):
+        calls = []
+
+        @contextlib.contextmanager
+        def hook(stage, stats):
+            calls.append(("enter", stage))
+            yield
+            calls.append(("exit", stage))
+
+        gaunit.stats.register_hook(hook)
+        try:
+            tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}])
+            r = gaunit.check_har("home_engie", tp, har=generate_mock_har("A"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                r.print_result()
+        finally:
+            gaunit.stats.unregister_hook(hook)
+        self.assertEqual(
+            [
+                ("enter", "extract"),
+                ("exit", "extract"),
+                ("enter", "match"),
+                ("exit", "match"),
+                ("enter", "report"),
+                ("exit", "report"),
+            ],
+            calls,
+        )
+
+    def test_print_stats(self):
+        stats = Stats()
+        stats.add_time("match", 0.002)
+        stats.add_time("extract", 0.01)
+        stats.add_time("decode", 0.008)
+        stats.count("events", 9)
+        stats.count("entries", 12)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            stats.print_stats()
+        self.assertEqual(
+            "stats:\n"
+            "  extract            10.0 ms\n"
+            "    decode            8.0 ms\n"
+            "  match               2.0 ms\n"
+            "  entries: 12 / events: 9\n",
+            out.getvalue(),
+        )
+
+
+class test_Result_stats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tp = gaunit.TrackingPlan.from_events(
+            "home_engie", [{"dp": "A"}, {"dp": "B"}, {"dp": "C"}]
+        )
+        har = generate_mock_har("A", "x", "B", "C")
+        har["log"]["entries"].append(
+            {"request": {"method": "GET", "url": "https://www.example.com/"}}
+        )
+        self.har = har
+
+    def test_check_har(self):
+        r = gaunit.check_har("home_engie", self.tp, har=self.har)
+        self.assertEqual(
+            {"entries": 5, "requests": 4, "events": 4, "comparisons": 3},
+            r.stats.counters,
+        )
+        for name in ("extract", "filter", "parse", "match"):
+            self.assertIn(name, r.stats.timings)
+
+    def test_check_har_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "test.har")
+            with open(path, "w", encoding="utf8") as f:
+                json.dump(self.har, f)
+            r = gaunit.check_har("home_engie", self.tp, har_path=path)
+        self.assertEqual(5, r.stats.counters["entries"])
+        self.assertIn("decode", r.stats.timings)
+
+    def test_check_scan_comparisons(self):
+        tc = gaunit.TestCase("home_engie", self.tp, har=self.har)
+        tc.check(engine="scan")
+        # A: 1, B: 2 (x, B), C: 1 (C)
+        self.assertEqual(4, tc.stats.counters["comparisons"])
+
+    def test_check_har_all(self):
+        results = gaunit.check_har_all(self.tp, har=self.har)
+        self.assertEqual(4, results["home_engie"].stats.counters["events"])
+        self.assertIn("extract", results["home_engie"].stats.timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import gaunit
+from gaunit.events import compact_events
+from gaunit.utils import filter_keys
+
+from tests.utils import generate_mock_har
+
+try:
+    import numpy  # noqa: F401
+
+    from gaunit.table import EventTable
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class test_EventTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events = compact_events(
+            [
+                {"t": "pageview", "dt": "Home"},
+                {"t": "event", "ea": "view_item", "dt": "Home"},
+                {"t": "pageview", "dt": "Product"},
+                {"t": "event", "ea": "add_to_cart", "dt": "Product", "ev": "44"},
+                {"t": "event", "ea": "view_item", "dt": "Product"},
+            ]
+        )
+        self.table = EventTable.from_events(self.events)
+
+    def test_from_events(self):
+        self.assertEqual(5, len(self.table))
+        self.assertEqual(["t", "dt", "ea", "ev"], self.table.columns)
+        self.assertEqual(self.events, self.table.to_events())
+
+    def test_column(self):
+        self.assertEqual(
+            [None, "view_item", None, "add_to_cart", "view_item"],
+            self.table.column("ea").tolist(),
+        )
+        self.assertEqual([None] * 5, self.table.column("dummy").tolist())
+
+    def test_mask_and_eq(self):
+        self.assertEqual(
+            [False, False, False, True, False], self.table.mask("ev").tolist()
+        )
+        self.assertEqual(
+            [True, False, True, False, False], self.table.eq("t", "pageview").tolist()
+        )
+        self.assertFalse(self.table.eq("t", "dummy").any())
+        self.assertEqual(
+            [False, True, False, True, True],
+            self.table.isin("ea", ["view_item", "add_to_cart"]).tolist(),
+        )
+
+    def test_where(self):
+        t = self.table.where(t="event", dt="Product")
+        self.assertEqual(
+            [
+                {"t": "event", "ea": "add_to_cart", "dt": "Product", "ev": "44"},
+                {"t": "event", "ea": "view_item", "dt": "Product"},
+            ],
+            t.to_events(),
+        )
+
+    def test_select_same_as_filter_keys(self):
+        params = ["ea", "ev", "dummy"]
+        self.assertEqual(
+            [filter_keys(e, params) for e in self.events],
+            self.table.select(params).to_events(),
+        )
+
+    def test_value_counts(self):
+        self.assertEqual({"event": 3, "pageview": 2}, self.table.value_counts("t"))
+        self.assertEqual(
+            ["event", "pageview"], list(self.table.value_counts("t"))
+        )  # most frequent first
+        self.assertEqual(
+            {"view_item": 1, "add_to_cart": 1},
+            self.table.where(dt="Product").value_counts("ea"),
+        )
+        self.assertEqual({}, self.table.value_counts("dummy"))
+
+    def test_test_case_events_table(self):
+        tp = gaunit.TrackingPlan.from_events("home_engie", [{"dp": "A"}])
+        tc = gaunit.TestCase("home_engie", tp, har=generate_mock_har("A", "B", "A"))
+        self.assertEqual({"A": 2, "B": 1}, tc.events_table().value_counts("dp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -98,6 +98,28 @@ class test_utils(unittest.TestCase):
         events = gaunit.utils.parse_ga_request(request)
         self.assertEqual([{"v": "2"}], events)
 
+    def test_parse_ga_request_POST_shared_url_params(self):
+        request = {
+            "method": "POST",
+            "url": "https://www.google-analytics.com/g/collect?v=2&tid=G-XYZ",
+            "postData": {"text": "en=page_view&v=1\r\nen=scroll"},
+        }
+        events = gaunit.utils.parse_ga_request(request)
+        # url params override params of events
+        self.assertEqual(
+            [
+                {"en": "page_view", "v": "2", "tid": "G-XYZ"},
+                {"en": "scroll", "v": "2", "tid": "G-XYZ"},
+            ],
+            events,
+        )
+        self.assertIs(events[0].shared, events[1].shared)
+
+    def test_parse_postdata_events_equal_sign_in_value(self):
+        data = "dl=https%3A%2F%2Fexample.com%2F%3Fa%3D1&dr=/?b=2&empty=&flag"
+        events = gaunit.utils.parse_postdata_events(data)
+        self.assertEqual([{"dl": "https://example.com/?a=1", "dr": "/?b=2"}], events)
+
     def test_parse_postdata_events_1(self):
         data = "p=v"
         events = gaunit.utils.parse_postdata_events(data)
@@ -184,6 +206,66 @@ class test_utils(unittest.TestCase):
             )
         )
 
+    def test_is_ga_url_transport_url_is_escaped(self):
+        self.assertFalse(
+            gaunit.utils.is_ga_url("https://wwwXgoogle-analytics.com/collect?v=1")
+        )
+
+    def test_ga_url_matcher_hit_type(self):
+        m = gaunit.GAUrlMatcher(
+            [
+                "https://www.google-analytics.com",
+                "https://region1.google-analytics.com",
+                "https://sgtm.example.com/custom/path/",
+            ]
+        )
+        self.assertEqual(
+            "ua", m.hit_type("https://www.google-analytics.com/collect?v=1")
+        )
+        self.assertEqual(
+            "ua_j", m.hit_type("https://www.google-analytics.com/j/collect?v=1")
+        )
+        self.assertEqual(
+            "ga4", m.hit_type("https://region1.google-analytics.com/g/collect?v=2")
+        )
+        self.assertEqual(
+            "ga4", m.hit_type("https://SGTM.example.com/custom/path/g/collect?v=2")
+        )
+        self.assertIsNone(m.hit_type("https://sgtm.example.com/g/collect?v=2"))
+        self.assertIsNone(m.hit_type("https://www.google-analytics.com/analytics.js"))
+        self.assertIsNone(
+            m.hit_type("https://domain.com/?u=www.google-analytics.com/collect")
+        )
+
+    def test_ga_url_matcher_without_scheme(self):
+        m = gaunit.GAUrlMatcher("tracking.example.com")
+        self.assertTrue(m("https://tracking.example.com/g/collect?v=2"))
+
+    def test_get_ga_url_matcher_cached(self):
+        urls = ["https://a.example.com", "https://b.example.com"]
+        m = gaunit.utils.get_ga_url_matcher(urls)
+        self.assertIs(m, gaunit.utils.get_ga_url_matcher(list(urls)))
+        self.assertIs(m, gaunit.utils.get_ga_url_matcher(m))
+
+    def test_get_ga_requests_from_har_several_transport_urls(self):
+        har = {
+            "log": {
+                "entries": [
+                    {"request": {"url": "https://domain.com"}},
+                    {"request": {"url": "https://tracking.example.com/collect"}},
+                    {"request": {"url": "https://www.google-analytics.com/collect"}},
+                ]
+            }
+        }
+        requests = gaunit.utils.get_ga_requests_from_har(
+            har,
+            transport_url=[
+                "https://tracking.example.com",
+                "https://www.google-analytics.com",
+            ],
+        )
+        self.assertEqual(2, len(requests))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,194 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import gaunit
+from gaunit.watch import HarTail, InotifyWaiter, PerfLogTail, PollWaiter, Watcher
+
+from tests.utils import generate_mock_har, generate_mock_perf_log
+
+
+class test_tail(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "session.har")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _write(self, data: bytes):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def _read_while_written(self, tail, data: bytes, step: int = 7) -> list:
+        """entries read while data is written a few bytes at a time"""
+        entries = []
+        for end in list(range(0, len(data), step)) + [len(data)]:
+            self._write(data[:end])
+            new, restarted = tail.read()
+            self.assertFalse(restarted)
+            entries.extend(new)
+        return entries
+
+    def test_har_tail(self):
+        har = generate_mock_har("A", "B", "C")
+        har["log"]["version"] = "1.2"
+        har["log"]["entries"][1]["response"] = {"content": {"text": "]}\\"}}
+        data = json.dumps(har, indent=1).encode()
+        entries = self._read_while_written(HarTail(self.path), data)
+        self.assertEqual(
+            [{"request": e["request"]} for e in har["log"]["entries"]], entries
+        )
+
+    def test_har_tail_missing_file(self):
+        tail = HarTail(self.path)
+        self.assertEqual(([], False), tail.read())
+        self._write(json.dumps(generate_mock_har("A")).encode())
+        self.assertEqual(1, len(tail.read()[0]))
+        os.remove(self.path)
+        self.assertEqual(([], False), tail.read())  # may be written again
+        self.assertTrue(tail.pending)
+        with mock.patch("gaunit.watch.SETTLE_TIME", 0):
+            self.assertEqual(([], True), tail.read())
+        self.assertFalse(tail.pending)
+
+    def test_har_tail_rewritten(self):
+        tail = HarTail(self.path)
+        self._write(json.dumps(generate_mock_har("A", "B")).encode())
+        self.assertEqual(2, len(tail.read()[0]))
+        # new export of same session, with more entries: only new ones are read
+        self._write(json.dumps(generate_mock_har("A", "B", "C")).encode())
+        entries, restarted = tail.read()
+        self.assertFalse(restarted)
+        self.assertEqual(["C"], [e["request"]["url"][-1] for e in entries])
+        # exported again in place: truncated, then written
+        self._write(b"")
+        self.assertEqual(([], False), tail.read())
+        self._write(json.dumps(generate_mock_har("A", "B", "C", "D")).encode())
+        self.assertEqual((1, False), (len(tail.read()[0]), tail.pending))
+        # another session
+        self._write(json.dumps(generate_mock_har("X")).encode())
+        with mock.patch("gaunit.watch.SETTLE_TIME", 0):
+            entries, restarted = tail.read()
+        self.assertTrue(restarted)
+        self.assertEqual(["X"], [e["request"]["url"][-1] for e in entries])
+
+    def test_perf_log_tail_jsonl(self):
+        log = generate_mock_perf_log("A", "B", "C")
+        data = b"".join(json.dumps(e).encode() + b"\n" for e in log)
+        self.assertEqual(log, self._read_while_written(PerfLogTail(self.path), data))
+
+    def test_perf_log_tail_jsonl_without_last_newline(self):
+        log = generate_mock_perf_log("A", "B")
+        tail = PerfLogTail(self.path)
+        self._write(json.dumps(log[0]).encode())
+        self.assertEqual([log[0]], tail.read()[0])
+        self._write(json.dumps(log[0]).encode() + b"\n" + json.dumps(log[1]).encode())
+        self.assertEqual([log[1]], tail.read()[0])
+
+    def test_perf_log_tail_json(self):
+        log = generate_mock_perf_log("A", "B", "C")
+        data = json.dumps(log).encode()
+        self.assertEqual(log, self._read_while_written(PerfLogTail(self.path), data))
+
+
+class test_Watcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "session.har")
+        self.tp = gaunit.TrackingPlan.from_events("home", [{"dp": "A"}, {"dp": "B"}])
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _write(self, data):
+        with open(self.path, "w") as f:
+            f.write(data)
+
+    def test_update(self):
+        w = Watcher(self.path, self.tp)
+        self.assertFalse(w.update())
+        self._write(json.dumps(generate_mock_har("A", "X")))
+        self.assertTrue(w.update())
+        self.assertEqual((2, False), (w.events, w.satisfied))
+        self.assertFalse(w.update())  # nothing new
+        self._write(json.dumps(generate_mock_har("A", "X", "B")))
+        self.assertTrue(w.update())
+        self.assertEqual((3, True), (w.events, w.satisfied))
+        # new session: checked from scratch
+        self._write(json.dumps(generate_mock_har("B")))
+        with mock.patch("gaunit.watch.SETTLE_TIME", 0):
+            self.assertTrue(w.update())
+        self.assertEqual((1, False), (w.events, w.satisfied))
+
+    def test_same_checklists_as_check(self):
+        har = generate_mock_har("B", "A", "A", "B", "X", "B")
+        self._write(json.dumps(har))
+        w = Watcher(self.path, self.tp)
+        w.update()
+        r = gaunit.check_har("home", self.tp, har=har)
+        matches = w.matchers["home"].matches
+        self.assertEqual(r.checklist_expected_events, [m is not None for m in matches])
+
+    def test_perf_log(self):
+        self.path = os.path.join(self.tmp.name, "perf_log.jsonl")
+        log = generate_mock_perf_log("A", "B")
+        for e in log:
+            e["message"] = e["message"].replace(
+                '{"request"', '{"requestId":"1","request"'
+            )
+        w = Watcher(self.path, self.tp, perf_log=True)
+        self._write(json.dumps(log[0]) + "\n")
+        w.update()
+        # same CDP request id as a request already read: not a new request
+        self._write(json.dumps(log[0]) + "\n" + json.dumps(log[1]) + "\n")
+        w.update()
+        self.assertEqual((1, False), (w.events, w.satisfied))
+
+    def test_format_status(self):
+        self._write(json.dumps(generate_mock_har("A")))
+        w = Watcher(self.path, self.tp)
+        w.update()
+        self.assertEqual(
+            "test case: home\n"
+            "  OK      {'dp': 'A'}\n"
+            "  missing {'dp': 'B'}\n"
+            "GA events found: total:1 / ok:1 / missing:1\n",
+            w.format_status(),
+        )
+
+
+class test_waiters(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "session.har")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _check_waiter(self, waiter):
+        with waiter:
+            self.assertFalse(waiter.wait(timeout=0.05))
+            # other files of directory are ignored
+            with open(os.path.join(self.tmp.name, "other.har"), "w") as f:
+                f.write("{}")
+            self.assertFalse(waiter.wait(timeout=0.05))
+            timer = threading.Timer(0.05, lambda: open(self.path, "w").write("{}"))
+            timer.start()
+            self.assertTrue(waiter.wait(timeout=5))
+            timer.join()
+
+    def test_poll_waiter(self):
+        self._check_waiter(PollWaiter(self.path, interval=0.01))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_waiter(self):
+        self._check_waiter(InotifyWaiter(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -58,3 +58,41 @@ def generate_mock_perf_log(
     ]
     # fmt: on
     return perf_log
+
+
+class FakeWorksheet(object):
+    def __init__(self, title: str):
+        self.title = title
+
+
+class FakeSpreadsheet(object):
+    """fake ``gspread.Spreadsheet`` (no network), counting requests
+
+    Args:
+        worksheets (dict): values (list of rows) by worksheet title
+    """
+
+    def __init__(self, worksheets: dict, revision: str = "2021-01-01T00:00:00.000Z"):
+        self.id = "fake_spreadsheet_id"
+        self.values = worksheets
+        self.revision = revision
+        self.requests = []  # (method, args)
+
+    def worksheets(self):
+        self.requests.append(("worksheets", None))
+        return [FakeWorksheet(t) for t in self.values]
+
+    def get_lastUpdateTime(self):
+        self.requests.append(("get_lastUpdateTime", None))
+        return self.revision
+
+    def values_batch_get(self, ranges, params=None):
+        self.requests.append(("values_batch_get", ranges))
+        value_ranges = []
+        for r in ranges:
+            title = r[1:-1].replace("''", "'")
+            value_range = {"range": "%s!A1:Z1000" % r, "majorDimension": "ROWS"}
+            if self.values[title]:
+                value_range["values"] = self.values[title]  # omitted if sheet is empty
+            value_ranges.append(value_range)
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}